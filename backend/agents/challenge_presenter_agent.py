@@ -1,5 +1,8 @@
 from crewai import Agent
+from services.llm_governor import LLMUnavailableError
 from services.llm_service import llm_service
+from services.prompt_budget import prompt_budget
+from services.challenge_prefetcher import ChallengePrefetcher
 from models.scenario import AdaptedChallenge
 from typing import Dict, Any
 import logging
@@ -7,6 +10,25 @@ import uuid
 
 logger = logging.getLogger(__name__)
 
+# Complexity adjustments per skill level
+COMPLEXITY_MAP = {
+    "beginner": {
+        "level": "Basic",
+        "constraints": ["Step-by-step guidance provided", "Basic requirements only"],
+        "time_limit": "2 hours"
+    },
+    "intermediate": {
+        "level": "Intermediate", 
+        "constraints": ["Some guidance provided", "Additional requirements"],
+        "time_limit": "1.5 hours"
+    },
+    "advanced": {
+        "level": "Advanced",
+        "constraints": ["Minimal guidance", "Complex requirements", "Performance optimization needed"],
+        "time_limit": "1 hour"
+    }
+}
+
 class ChallengePresenterAgent:
     def __init__(self):
         self.agent = Agent(
@@ -16,6 +38,8 @@ class ChallengePresenterAgent:
             verbose=True,
             allow_delegation=False
         )
+        # Adaptations computed right after scenario generation, before the student picks one
+        self.prefetcher = ChallengePrefetcher(self.adapt_challenge, self.default_challenge)
     
     def adapt_challenge(self, scenario: Dict[str, Any], student_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -23,36 +47,21 @@ class ChallengePresenterAgent:
         Input: scenario, student_profile
         Output: Adapted challenge details
         """
+        skill_level = student_profile.get("skill_level", "beginner")
+        role = student_profile.get("role", "")
+        complexity = COMPLEXITY_MAP.get(skill_level, COMPLEXITY_MAP["beginner"])
         try:
-            skill_level = student_profile.get("skill_level", "beginner")
-            role = student_profile.get("role", "")
-            
-            # Define complexity adjustments
-            complexity_map = {
-                "beginner": {
-                    "level": "Basic",
-                    "constraints": ["Step-by-step guidance provided", "Basic requirements only"],
-                    "time_limit": "2 hours"
-                },
-                "intermediate": {
-                    "level": "Intermediate", 
-                    "constraints": ["Some guidance provided", "Additional requirements"],
-                    "time_limit": "1.5 hours"
-                },
-                "advanced": {
-                    "level": "Advanced",
-                    "constraints": ["Minimal guidance", "Complex requirements", "Performance optimization needed"],
-                    "time_limit": "1 hour"
-                }
-            }
+            if not llm_service.is_available():
+                logger.warning("LLM unavailable, using default challenge")
+                return self._default_challenge(scenario, skill_level, role, complexity)
             
-            complexity = complexity_map.get(skill_level, complexity_map["beginner"])
+            original_task, task_budget = prompt_budget.fit(scenario.get('task', ''), "challenge_scenario")
             
             # Create adaptation prompt
             adaptation_prompt = f"""
             Adapt this scenario for a {skill_level} {role} developer:
             
-            Original Task: {scenario.get('task', '')}
+            Original Task: {original_task}
             Original Requirements: {scenario.get('requirements', [])}
             
             Adjust the complexity to {complexity['level']} level.
@@ -81,25 +90,42 @@ class ChallengePresenterAgent:
                     "instructions": parsed_response.get("instructions", ""),
                     "output_format": parsed_response.get("output_format", ""),
                     "success_criteria": parsed_response.get("success_criteria", []),
-                    "time_limit": complexity["time_limit"]
+                    "time_limit": complexity["time_limit"],
+                    "prompt_budget": task_budget,
+                    "adapted": True
                 }
                 
                 logger.info(f"Challenge adapted for {skill_level} {role}")
                 return adapted_challenge
             else:
                 # Return original scenario if adaptation fails
-                return {
-                    "scenario_id": scenario.get("id", ""),
-                    "adapted_task": scenario.get("task", ""),
-                    "complexity_level": skill_level,
-                    "constraints": complexity["constraints"],
-                    "format_type": "code" if role in ["frontend", "backend", "fullstack"] else "document",
-                    "instructions": "Complete the given task according to requirements",
-                    "time_limit": complexity["time_limit"]
-                }
+                return self._default_challenge(scenario, skill_level, role, complexity)
                 
+        except LLMUnavailableError as e:
+            # Shed by the governor: serve the original scenario straight away
+            logger.warning(f"Challenge adaptation shed: {e}")
+            return self._default_challenge(scenario, skill_level, role, complexity)
         except Exception as e:
             logger.error(f"Challenge adaptation failed: {e}")
-            return {}
+            return self._default_challenge(scenario, skill_level, role, complexity)
+    
+    def default_challenge(self, scenario: Dict[str, Any], student_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """The scenario as an unadapted challenge for this student's level and role"""
+        skill_level = student_profile.get("skill_level", "beginner")
+        complexity = COMPLEXITY_MAP.get(skill_level, COMPLEXITY_MAP["beginner"])
+        return self._default_challenge(scenario, skill_level, student_profile.get("role", ""), complexity)
+    
+    def _default_challenge(self, scenario: Dict[str, Any], skill_level: str, role: str, complexity: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the original scenario as a challenge when LLM adaptation is unavailable"""
+        return {
+            "scenario_id": scenario.get("id", ""),
+            "adapted_task": scenario.get("task", ""),
+            "complexity_level": skill_level,
+            "constraints": complexity["constraints"],
+            "format_type": "code" if role in ["frontend", "backend", "fullstack"] else "document",
+            "instructions": "Complete the given task according to requirements",
+            "time_limit": complexity["time_limit"],
+            "adapted": False
+        }
 
 challenge_presenter_agent = ChallengePresenterAgent()
\ No newline at end of file
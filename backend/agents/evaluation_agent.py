@@ -1,5 +1,6 @@
 from crewai import Agent
 from services.llm_service import llm_service
+from services.prompt_budget import prompt_budget
 from config.prompts import EVALUATION_PROMPT
 from models.response import Evaluation
 from typing import Dict, Any
@@ -24,6 +25,10 @@ class EvaluationAgent:
         Input: response_data, scenario_data
         Output: Evaluation scores and feedback
         """
+        if not llm_service.is_available():
+            logger.warning("LLM unavailable, using default evaluation")
+            return self._default_evaluation(response_data)
+        
         try:
             # Prepare evaluation context
             scenario_context = f"""
@@ -33,7 +38,14 @@ class EvaluationAgent:
             Success Criteria: {scenario_data.get('criteria', [])}
             """
             
-            student_response = response_data.get('content', '')
+            # Bound the prompt: oversized answers and uploads are compacted to excerpts
+            student_response, response_budget = prompt_budget.fit(response_data.get('content', ''), "evaluation_response")
+            files_section, files_budget = prompt_budget.compact_files(
+                response_data.get('files', []),
+                prompt_budget.budgets["evaluation_files"]
+            )
+            if files_section:
+                student_response += f"\n\nAttached Files:\n{files_section}"
             response_type = response_data.get('response_type', 'text')
             
             # Create evaluation prompt
@@ -80,7 +92,12 @@ class EvaluationAgent:
                     "percentage": (total_score / 100) * 100,
                     "grade": self._calculate_grade(total_score),
                     "evaluation_time": response_data.get("submission_time", ""),
-                    "response_type": response_type
+                    "response_type": response_type,
+                    "prompt_budget": {
+                        "truncated": response_budget["truncated"] or files_budget["truncated"],
+                        "response": response_budget,
+                        "files": files_budget
+                    }
                 }
                 
                 logger.info(f"Response evaluated with total score: {total_score}/100")
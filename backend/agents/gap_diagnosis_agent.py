@@ -1,5 +1,8 @@
 from crewai import Agent
 from services.llm_service import llm_service
+from services.prompt_budget import prompt_budget
+from services.content_analyzer import content_analyzer
+from services.gap_vocabulary import gap_vocabulary
 from config.prompts import GAP_ANALYSIS_PROMPT
 from models.response import GapAnalysis
 from typing import Dict, Any, List
@@ -8,6 +11,30 @@ import uuid
 
 logger = logging.getLogger(__name__)
 
+# Below 18/25 on a criterion indicates a gap
+SCORE_GAP_THRESHOLD = 18
+
+# Gaps implied by a low score on each rubric criterion: (category, gaps)
+SCORE_BASED_GAPS = {
+    "clarity": ("process", ["Communication and documentation skills", "Code/content organization"]),
+    "relevance": ("conceptual", ["Understanding of requirements", "Problem analysis skills"]),
+    "correctness": ("technical", ["Implementation accuracy", "Solution validation"]),
+    "scalability": ("technical", ["Performance optimization", "Scalable design patterns"])
+}
+
+# Gaps added for code responses and by the fallback analysis
+RESPONSE_TYPE_GAPS = {"technical": "Module management and imports", "process": "Code documentation practices"}
+BASIC_GAPS = {
+    "technical": ["Implementation skills need improvement"],
+    "conceptual": ["Problem understanding needs work"],
+    "process": ["Documentation and presentation skills"]
+}
+
+# Known gaps get the lowest ids, so they always list first and in this order
+gap_vocabulary.register(gap for _, gaps in SCORE_BASED_GAPS.values() for gap in gaps)
+gap_vocabulary.register(RESPONSE_TYPE_GAPS.values())
+gap_vocabulary.register(gap for gaps in BASIC_GAPS.values() for gap in gaps)
+
 class GapDiagnosisAgent:
     def __init__(self):
         self.agent = Agent(
@@ -24,12 +51,18 @@ class GapDiagnosisAgent:
         Input: evaluation_data, response_data
         Output: Categorized gap analysis
         """
+        if not llm_service.is_available():
+            logger.warning("LLM unavailable, using basic gap analysis")
+            return self._basic_gap_analysis(evaluation_data, response_data)
+        
         try:
+            feedback, feedback_budget = prompt_budget.fit(str(evaluation_data.get('feedback', {})), "gap_feedback")
+            
             # Prepare gap analysis context
             evaluation_summary = f"""
             Total Score: {evaluation_data.get('total_score', 0)}/100
             Scores: {evaluation_data.get('scores', {})}
-            Feedback: {evaluation_data.get('feedback', {})}
+            Feedback: {feedback}
             Grade: {evaluation_data.get('grade', 'Unknown')}
             """
             
@@ -59,15 +92,19 @@ class GapDiagnosisAgent:
                 scores = evaluation_data.get('scores', {})
                 additional_gaps = self._identify_score_based_gaps(scores, response_data)
                 
-                # Merge gaps
-                technical_gaps.extend(additional_gaps.get("technical", []))
-                conceptual_gaps.extend(additional_gaps.get("conceptual", []))
-                process_gaps.extend(additional_gaps.get("process", []))
-                
-                # Remove duplicates
-                technical_gaps = list(set(technical_gaps))
-                conceptual_gaps = list(set(conceptual_gaps))
-                process_gaps = list(set(process_gaps))
+                # Merge and de-duplicate through the interned vocabulary (deterministic order);
+                # gaps the vocabulary does not know stay free text after the known ones
+                merged = {
+                    "technical_gaps": technical_gaps + additional_gaps.get("technical", []),
+                    "conceptual_gaps": conceptual_gaps + additional_gaps.get("conceptual", []),
+                    "process_gaps": process_gaps + additional_gaps.get("process", [])
+                }
+                gap_lists = gap_vocabulary.to_lists(
+                    gap_vocabulary.profile_from_analysis(merged), gap_vocabulary.free_text(merged)
+                )
+                technical_gaps = gap_lists["technical_gaps"]
+                conceptual_gaps = gap_lists["conceptual_gaps"]
+                process_gaps = gap_lists["process_gaps"]
                 
                 gap_analysis = {
                     "id": str(uuid.uuid4()),
@@ -75,9 +112,10 @@ class GapDiagnosisAgent:
                     "technical_gaps": technical_gaps,
                     "conceptual_gaps": conceptual_gaps,
                     "process_gaps": process_gaps,
-                    "total_gaps": len(technical_gaps) + len(conceptual_gaps) + len(process_gaps),
+                    "total_gaps": sum(len(gaps) for gaps in gap_lists.values()),
                     "priority_areas": self._prioritize_gaps(technical_gaps, conceptual_gaps, process_gaps),
-                    "improvement_urgency": self._calculate_urgency(evaluation_data.get('total_score', 0))
+                    "improvement_urgency": self._calculate_urgency(evaluation_data.get('total_score', 0)),
+                    "prompt_budget": feedback_budget
                 }
                 
                 logger.info(f"Gap analysis completed with {gap_analysis['total_gaps']} identified gaps")
@@ -94,36 +132,54 @@ class GapDiagnosisAgent:
         """Identify gaps based on low scores in specific areas"""
         gaps = {"technical": [], "conceptual": [], "process": []}
         
-        # Define score thresholds for gap identification
-        threshold = 18  # Below 18/25 indicates a gap
-        
-        if scores.get("clarity", 25) < threshold:
-            gaps["process"].append("Communication and documentation skills")
-            gaps["process"].append("Code/content organization")
-        
-        if scores.get("relevance", 25) < threshold:
-            gaps["conceptual"].append("Understanding of requirements")
-            gaps["conceptual"].append("Problem analysis skills")
-        
-        if scores.get("correctness", 25) < threshold:
-            gaps["technical"].append("Implementation accuracy")
-            gaps["technical"].append("Solution validation")
-        
-        if scores.get("scalability", 25) < threshold:
-            gaps["technical"].append("Performance optimization")
-            gaps["technical"].append("Scalable design patterns")
+        for criterion, (category, criterion_gaps) in SCORE_BASED_GAPS.items():
+            if scores.get(criterion, 25) < SCORE_GAP_THRESHOLD:
+                gaps[category].extend(criterion_gaps)
         
         # Add response-type specific gaps
-        response_type = response_data.get("response_type", "")
-        if response_type == "code":
-            content_stats = response_data.get("content_stats", {})
-            if not content_stats.get("has_imports", False):
-                gaps["technical"].append("Module management and imports")
-            if content_stats.get("comment_lines", 0) < 2:
-                gaps["process"].append("Code documentation practices")
+        # The collector's analysis of this content is cached; reading it does not rescan the text
+        analysis = content_analyzer.analyze(response_data.get("content", ""))
+        if analysis["response_type"] == "code":
+            if not analysis["has_imports"]:
+                gaps["technical"].append(RESPONSE_TYPE_GAPS["technical"])
+            if analysis["comment_lines"] < 2:
+                gaps["process"].append(RESPONSE_TYPE_GAPS["process"])
         
         return gaps
     
+    def threshold_crossings(self, old_scores: Dict[str, int], new_scores: Dict[str, int]) -> List[str]:
+        """Criteria whose score moved across the gap threshold between two evaluations"""
+        return [
+            criterion for criterion in SCORE_BASED_GAPS
+            if (old_scores.get(criterion, 25) < SCORE_GAP_THRESHOLD) != (new_scores.get(criterion, 25) < SCORE_GAP_THRESHOLD)
+        ]
+    
+    def revise_gaps(self, gap_analysis: Dict[str, Any], old_scores: Dict[str, int], evaluation_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Update a gap analysis made from `old_scores` to match a newer evaluation
+        Only the score-based gaps of criteria that crossed the threshold change
+        """
+        new_scores = evaluation_data.get("scores", {})
+        profile = gap_vocabulary.profile_from_analysis(gap_analysis)
+        
+        for criterion in self.threshold_crossings(old_scores, new_scores):
+            category, criterion_gaps = SCORE_BASED_GAPS[criterion]
+            criterion_profile = gap_vocabulary.profile(**{category: criterion_gaps})
+            if new_scores.get(criterion, 25) < SCORE_GAP_THRESHOLD:
+                profile = profile.union(criterion_profile)
+            else:
+                profile = profile.without(criterion_profile)
+        
+        revised = {**gap_analysis, **gap_vocabulary.to_lists(profile, gap_vocabulary.free_text(gap_analysis))}
+        technical, conceptual, process = revised["technical_gaps"], revised["conceptual_gaps"], revised["process_gaps"]
+        revised.update({
+            "evaluation_id": evaluation_data.get("id", ""),
+            "total_gaps": len(technical) + len(conceptual) + len(process),
+            "priority_areas": self._prioritize_gaps(technical, conceptual, process),
+            "improvement_urgency": self._calculate_urgency(evaluation_data.get("total_score", 0))
+        })
+        return revised
+    
     def _prioritize_gaps(self, technical: List[str], conceptual: List[str], process: List[str]) -> List[str]:
         """Prioritize gaps based on impact and importance"""
         priority_gaps = []
@@ -157,18 +213,12 @@ class GapDiagnosisAgent:
         """Return basic gap analysis when LLM analysis fails"""
         total_score = evaluation_data.get('total_score', 0)
         
-        basic_gaps = {
-            "technical": ["Implementation skills need improvement"],
-            "conceptual": ["Problem understanding needs work"],
-            "process": ["Documentation and presentation skills"]
-        }
-        
         return {
             "id": str(uuid.uuid4()),
             "evaluation_id": evaluation_data.get("id", ""),
-            "technical_gaps": basic_gaps["technical"] if total_score < 70 else [],
-            "conceptual_gaps": basic_gaps["conceptual"] if total_score < 60 else [],
-            "process_gaps": basic_gaps["process"] if total_score < 80 else [],
+            "technical_gaps": BASIC_GAPS["technical"] if total_score < 70 else [],
+            "conceptual_gaps": BASIC_GAPS["conceptual"] if total_score < 60 else [],
+            "process_gaps": BASIC_GAPS["process"] if total_score < 80 else [],
             "total_gaps": 3 if total_score < 70 else 1,
             "priority_areas": ["General skill improvement needed"],
             "improvement_urgency": self._calculate_urgency(total_score),
@@ -1,6 +1,7 @@
 from crewai import Agent
 from models.response import StudentResponse
-from typing import Dict, Any, List
+from services.content_analyzer import content_analyzer
+from typing import Dict, Any, List, Mapping
 import logging
 import uuid
 from datetime import datetime
@@ -30,12 +31,13 @@ class ResponseCollectorAgent:
                 if field not in submission_data or not submission_data[field]:
                     raise ValueError(f"Missing required field: {field}")
             
-            # Determine response type based on content
+            # Analyze the content once; later stages read the same cached record
             content = submission_data["content"]
-            response_type = self._determine_response_type(content)
+            analysis = content_analyzer.analyze(content)
+            response_type = analysis["response_type"]
             
             # Validate content based on type
-            validation_result = self._validate_content(content, response_type)
+            validation_result = self._validate_content(analysis)
             
             if not validation_result["valid"]:
                 return {
@@ -51,7 +53,7 @@ class ResponseCollectorAgent:
                 "content": content,
                 "files": submission_data.get("files", []),
                 "submission_time": datetime.now().isoformat(),
-                "content_stats": self._analyze_content(content, response_type),
+                "content_stats": content_analyzer.content_stats(analysis),
                 "validation": validation_result
             }
             
@@ -62,60 +64,21 @@ class ResponseCollectorAgent:
             logger.error(f"Response collection failed: {e}")
             return {"error": str(e)}
     
-    def _determine_response_type(self, content: str) -> str:
-        """Determine the type of response based on content analysis"""
-        content_lower = content.lower()
-        
-        # Check for code indicators
-        code_indicators = ["function", "class", "def ", "const ", "let ", "var ", "import", "return", "{", "}", "//", "/*"]
-        if any(indicator in content_lower for indicator in code_indicators):
-            return "code"
-        
-        # Check for document structure
-        doc_indicators = ["introduction", "analysis", "conclusion", "summary", "recommendation"]
-        if any(indicator in content_lower for indicator in doc_indicators):
-            return "document"
-        
-        # Check for design elements
-        design_indicators = ["schema", "diagram", "architecture", "database", "table", "relationship"]
-        if any(indicator in content_lower for indicator in design_indicators):
-            return "design"
-        
-        return "text"
-    
-    def _validate_content(self, content: str, response_type: str) -> Dict[str, Any]:
+    def _validate_content(self, analysis: Mapping[str, Any]) -> Dict[str, Any]:
         """Validate content based on its type"""
-        if not content or len(content.strip()) < 10:
+        if analysis["stripped_length"] < 10:
             return {"valid": False, "message": "Content too short or empty"}
         
-        if response_type == "code":
+        if analysis["response_type"] == "code":
             # Basic code validation
-            if len(content) < 50:
+            if analysis["length"] < 50:
                 return {"valid": False, "message": "Code submission too short"}
             
-        elif response_type == "document":
+        elif analysis["response_type"] == "document":
             # Document validation
-            if len(content.split()) < 20:
+            if analysis["words"] < 20:
                 return {"valid": False, "message": "Document submission too short"}
         
         return {"valid": True, "message": "Content validated successfully"}
-    
-    def _analyze_content(self, content: str, response_type: str) -> Dict[str, Any]:
-        """Analyze content and return statistics"""
-        stats = {
-            "word_count": len(content.split()),
-            "character_count": len(content),
-            "line_count": len(content.split('\n')),
-            "response_type": response_type
-        }
-        
-        if response_type == "code":
-            stats.update({
-                "function_count": content.lower().count("function") + content.count("def "),
-                "comment_lines": content.count("//") + content.count("#"),
-                "has_imports": "import" in content.lower()
-            })
-        
-        return stats
 
 response_collector_agent = ResponseCollectorAgent()
\ No newline at end of file
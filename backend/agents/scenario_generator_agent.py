@@ -1,11 +1,16 @@
 from crewai import Agent, Task
 from services.llm_service import llm_service
+from services.llm_governor import LLMUnavailableError
+from services.scenario_pool import ScenarioPool
+from services.csv_processor import scenario_id
+from services.role_taxonomy import role_taxonomy
+from services.scenario_enrichment import derived, enrich_scenario, is_outdated
 from database.vector_store import vector_store
 from config.prompts import SCENARIO_GENERATION_PROMPT
 from models.scenario import Role
 from typing import Dict, Any, List
 import logging
-import uuid
+import threading
 import time
 
 logger = logging.getLogger(__name__)
@@ -19,6 +24,10 @@ class ScenarioGeneratorAgent:
             verbose=True,
             allow_delegation=False
         )
+        # Pre-generated LLM scenarios so students rarely wait on synchronous generation
+        self.pool = ScenarioPool(self._generate_pool_batch, self._is_valid_generated_scenario, llm_service.is_available)
+        self._pool_batches = 0
+        self._pool_batches_lock = threading.Lock()
     
     def generate_scenarios(self, role: str, student_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -64,9 +73,12 @@ class ScenarioGeneratorAgent:
                     scenarios.append(scenario)
                     
             else:
-                # Generate scenarios using LLM if insufficient CSV data
-                logger.warning(f"Insufficient scenarios in CSV for role {role}, generating with LLM")
-                scenarios = self._generate_scenarios_with_llm(role, student_profile, target_count)
+                # Serve pre-generated scenarios; only a cold pool falls back to synchronous generation
+                skill_level = student_profile.get("skill_level", "beginner")
+                scenarios = self.pool.take(role, skill_level, target_count)
+                if not scenarios:
+                    logger.warning(f"Insufficient scenarios in CSV for role {role} and empty pool, generating with LLM")
+                    scenarios = self._generate_scenarios_with_llm(role, student_profile, target_count)
             
             # Ensure we have exactly 3 scenarios
             while len(scenarios) < target_count:
@@ -95,11 +107,11 @@ class ScenarioGeneratorAgent:
     def _filter_scenarios_by_difficulty(self, scenarios: List[Dict], skill_level: str, role: str) -> List[Dict]:
         """Filter scenarios based on difficulty and role match"""
         filtered = []
+        compatible_mask = role_taxonomy.compatible_mask(role)
         
         for scenario in scenarios:
-            # Check role match (exact or compatible)
-            scenario_role = scenario.get("role", "").lower()
-            if scenario_role == role.lower() or self._is_compatible_role(scenario_role, role):
+            # Check role match: family bit (precomputed at ingest) against the role's compatible set
+            if role_taxonomy.bit(derived(scenario)["role_family"]) & compatible_mask:
                 # Check difficulty match
                 scenario_difficulty = scenario.get("difficulty", "").lower()
                 if scenario_difficulty == skill_level.lower() or skill_level.lower() == "beginner":
@@ -107,37 +119,50 @@ class ScenarioGeneratorAgent:
         
         return filtered
     
-    def _is_compatible_role(self, scenario_role: str, target_role: str) -> bool:
-        """Check if roles are compatible"""
-        compatibility_map = {
-            "frontend": ["frontend", "fullstack", "web"],
-            "backend": ["backend", "fullstack", "api"],
-            "fullstack": ["frontend", "backend", "fullstack", "web"],
-            "data_analyst": ["data", "analyst", "analytics"]
-        }
-        
-        compatible_roles = compatibility_map.get(target_role.lower(), [target_role.lower()])
-        return any(role in scenario_role for role in compatible_roles)
-    
     def _convert_csv_to_scenario_format(self, csv_scenario: Dict, student_profile: Dict, scenario_num: int) -> Dict[str, Any]:
         """Convert CSV scenario data to required format"""
+        fields = derived(csv_scenario)
         return {
-            "id": str(uuid.uuid4()),
+            "id": csv_scenario.get("id") or scenario_id(csv_scenario),
             "role": csv_scenario.get("role", ""),
             "title": f"Scenario {scenario_num}: {csv_scenario.get('title', 'Untitled')}",
             "task": csv_scenario.get("task", ""),
-            "requirements": self._parse_requirements_from_task(csv_scenario.get("task", "")),
-            "deliverables": self._generate_deliverables_from_context(csv_scenario.get("context", "")),
-            "criteria": self._generate_criteria_from_task(csv_scenario.get("task", "")),
+            "requirements": fields["requirements"],
+            "deliverables": fields["deliverables"],
+            "criteria": fields["criteria"],
+            "role_family": fields["role_family"],
+            "outdated": fields["outdated"],
             "difficulty": csv_scenario.get("difficulty", student_profile.get("skill_level", "beginner")),
             "context": csv_scenario.get("context", ""),
             "source": "csv_data"
         }
     
-    def _generate_scenarios_with_llm(self, role: str, student_profile: Dict, count: int) -> List[Dict[str, Any]]:
+    def _generate_pool_batch(self, role: str, skill_level: str, count: int) -> List[Dict[str, Any]]:
+        """Generate a batch for the scenario pool, rotating through the prompt contexts"""
+        # Refills for different keys run on concurrent pool threads
+        with self._pool_batches_lock:
+            self._pool_batches += 1
+            batch = self._pool_batches
+        return self._generate_scenarios_with_llm(role, {"skill_level": skill_level}, count, context_offset=batch)
+    
+    def _is_valid_generated_scenario(self, scenario: Dict[str, Any]) -> bool:
+        """Pool admission check: complete, non-outdated scenario"""
+        required_lists = ("requirements", "deliverables", "criteria")
+        return (
+            bool(scenario.get("task", "").strip())
+            and all(isinstance(scenario.get(key), list) and scenario.get(key) for key in required_lists)
+            and not self._is_outdated(scenario)
+        )
+    
+    def _generate_scenarios_with_llm(self, role: str, student_profile: Dict, count: int, context_offset: int = 0) -> List[Dict[str, Any]]:
         """Generate scenarios using LLM when CSV data insufficient"""
         scenarios = []
         
+        if not llm_service.is_available():
+            # Caller tops up with fallback scenarios
+            logger.warning("LLM unavailable, skipping scenario generation")
+            return scenarios
+        
         default_contexts = {
             "frontend": [
                 "Build a responsive web application component",
@@ -162,17 +187,23 @@ class ScenarioGeneratorAgent:
         }
         
         contexts = default_contexts.get(role, default_contexts["frontend"])
+        skill_level = student_profile.get("skill_level", "beginner")
         
         for i in range(count):
-            context = contexts[i % len(contexts)]
-            prompt = SCENARIO_GENERATION_PROMPT.format(role=role, context=context)
+            context = contexts[(context_offset + i) % len(contexts)]
+            # The level is part of the prompt, so coalescing never shares scenarios across levels
+            prompt = SCENARIO_GENERATION_PROMPT.format(role=role, context=context, skill_level=skill_level)
             
-            response = llm_service.generate_response(prompt)
+            try:
+                response = llm_service.generate_response(prompt)
+            except LLMUnavailableError as e:
+                # Keep what we have; remaining slots are filled with fallbacks
+                logger.warning(f"Stopping LLM scenario generation: {e}")
+                break
             parsed_response = llm_service.parse_json_response(response)
             
             if "error" not in parsed_response:
                 scenario = {
-                    "id": str(uuid.uuid4()),
                     "role": role,
                     "title": f"Scenario {i+1}: {parsed_response.get('task', 'Generated Scenario')[:50]}",
                     "task": parsed_response.get("task", ""),
@@ -183,6 +214,10 @@ class ScenarioGeneratorAgent:
                     "context": context,
                     "source": "llm_generated"
                 }
+                scenario["id"] = scenario_id(scenario)
+                # Flags only: incomplete LLM output must still fail pool validation
+                scenario["role_family"] = role_taxonomy.family(role)
+                scenario["outdated"] = is_outdated(scenario)
                 scenarios.append(scenario)
         
         return scenarios
@@ -196,8 +231,7 @@ class ScenarioGeneratorAgent:
             "fullstack": f"Develop a {['task management', 'social media', 'e-learning'][scenario_num % 3]} application"
         }
         
-        return {
-            "id": str(uuid.uuid4()),
+        scenario = {
             "role": role,
             "title": f"Fallback Scenario {scenario_num}",
             "task": fallback_tasks.get(role, f"Complete a {role} development task"),
@@ -208,6 +242,8 @@ class ScenarioGeneratorAgent:
             "context": f"Basic {role} development task",
             "source": "fallback"
         }
+        scenario["id"] = scenario_id(scenario)
+        return enrich_scenario(scenario)
     
     def _generate_fallback_scenarios(self, role: str, student_profile: Dict) -> List[Dict[str, Any]]:
         """Generate exactly 3 fallback scenarios in case of complete failure"""
@@ -216,23 +252,15 @@ class ScenarioGeneratorAgent:
             for i in range(3)
         ]
     
+    def _is_outdated(self, scenario: Dict[str, Any]) -> bool:
+        """Outdated flag computed at ingest; only rows without it are scanned now"""
+        return derived(scenario)["outdated"]
+    
     def _filter_outdated_scenarios(self, scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Filter out outdated or irrelevant scenarios"""
-        current_year = 2025
-        outdated_keywords = [
-            "flash", "internet explorer", "jquery", "php4", "python2", 
-            "angularjs", "bootstrap3", "mysql5", "node8"
-        ]
-        
         filtered_scenarios = []
         for scenario in scenarios:
-            task_lower = scenario.get("task", "").lower()
-            context_lower = scenario.get("context", "").lower()
-            
-            # Check for outdated technologies
-            is_outdated = any(keyword in task_lower or keyword in context_lower for keyword in outdated_keywords)
-            
-            if not is_outdated:
+            if not self._is_outdated(scenario):
                 filtered_scenarios.append(scenario)
             else:
                 logger.info(f"Filtered outdated scenario: {scenario.get('title', 'Unknown')}")
@@ -242,52 +270,5 @@ class ScenarioGeneratorAgent:
             filtered_scenarios = scenarios[:3]
         
         return filtered_scenarios
-    
-    def _parse_requirements_from_task(self, task: str) -> List[str]:
-        """Extract requirements from task description"""
-        # Basic requirement extraction
-        requirements = []
-        if "responsive" in task.lower():
-            requirements.append("Mobile responsive design")
-        if "api" in task.lower():
-            requirements.append("RESTful API design")
-        if "database" in task.lower():
-            requirements.append("Database integration")
-        if "secure" in task.lower() or "auth" in task.lower():
-            requirements.append("Security implementation")
-        
-        # Add default requirements if none found
-        if not requirements:
-            requirements = ["Follow industry best practices", "Clean code structure"]
-        
-        return requirements
-    
-    def _generate_deliverables_from_context(self, context: str) -> List[str]:
-        """Generate deliverables based on context"""
-        deliverables = ["Working solution"]
-        
-        if "web" in context.lower():
-            deliverables.append("Deployed web application")
-        if "api" in context.lower():
-            deliverables.append("API documentation")
-        if "data" in context.lower():
-            deliverables.append("Data analysis report")
-        
-        deliverables.append("Code documentation")
-        return deliverables
-    
-    def _generate_criteria_from_task(self, task: str) -> List[str]:
-        """Generate evaluation criteria from task"""
-        criteria = ["Functionality", "Code quality"]
-        
-        if "ui" in task.lower() or "frontend" in task.lower():
-            criteria.append("User interface design")
-        if "performance" in task.lower():
-            criteria.append("Performance optimization")
-        if "scale" in task.lower():
-            criteria.append("Scalability")
-        
-        criteria.append("Documentation quality")
-        return criteria
 
 scenario_generator_agent = ScenarioGeneratorAgent()
\ No newline at end of file
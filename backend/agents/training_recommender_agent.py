@@ -2,6 +2,8 @@ from crewai import Agent
 from services.llm_service import llm_service
 from database.vector_store import vector_store
 from config.prompts import TRAINING_RECOMMENDATION_PROMPT
+from services.learning_path_planner import learning_path_planner
+from services.validation import resource_hours
 from models.response import TrainingRecommendation
 from typing import Dict, Any, List
 import logging
@@ -52,8 +54,12 @@ class TrainingRecommenderAgent:
                 gap_analysis_data
             )
             
+            # Cover every gap the resources can cover at the fewest estimated hours
+            plan = learning_path_planner.plan_resources(training_resources, all_gaps)
+            planned = [training_resources[index] for index in plan["positions"]]
+            
             # Create training path with progression
-            training_path = self._create_learning_path(categorized_recommendations, gap_analysis_data)
+            training_path = self._create_learning_path(categorized_recommendations, gap_analysis_data, planned)
             
             recommendation = {
                 "id": str(uuid.uuid4()),
@@ -61,7 +67,8 @@ class TrainingRecommenderAgent:
                 "student_role": student_role,
                 "recommendations": categorized_recommendations,
                 "learning_path": training_path,
-                "estimated_duration": self._estimate_duration(training_resources),
+                "estimated_duration": self._estimate_duration(planned or training_resources),
+                "gap_coverage": {key: value for key, value in plan.items() if key != "positions"},
                 "priority_order": self._prioritize_recommendations(categorized_recommendations),
                 "urgency": gap_analysis_data.get("improvement_urgency", "Medium")
             }
@@ -75,6 +82,10 @@ class TrainingRecommenderAgent:
     
     def _generate_recommendations_with_llm(self, gap_analysis_data: Dict[str, Any], student_role: str) -> List[Dict[str, Any]]:
         """Generate recommendations using LLM when vector store is empty"""
+        if not llm_service.is_available():
+            logger.warning("LLM unavailable, using fallback recommendations")
+            return self._fallback_recommendations(student_role)
+        
         try:
             gaps_summary = {
                 "technical": gap_analysis_data.get("technical_gaps", []),
@@ -127,9 +138,20 @@ class TrainingRecommenderAgent:
         
         return categorized
     
-    def _create_learning_path(self, categorized_recs: Dict[str, List], gap_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _create_learning_path(self, categorized_recs: Dict[str, List], gap_analysis: Dict[str, Any],
+                              planned: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Create a structured learning path with progression"""
         learning_path = []
+        if planned:
+            # Keep exactly the resources the coverage plan chose, each in its phase
+            chosen = {id(resource) for resource in planned}
+            categorized_recs = {
+                category: [resource for resource in resources if id(resource) in chosen]
+                for category, resources in categorized_recs.items()
+            }
+        
+        def take(resources: List, count: int) -> List:
+            return resources if planned else resources[:count]
         
         # Phase 1: Immediate/Critical skills
         if categorized_recs["immediate"]:
@@ -137,7 +159,7 @@ class TrainingRecommenderAgent:
                 "phase": 1,
                 "title": "Critical Skills Development",
                 "duration": "1-2 weeks",
-                "resources": categorized_recs["immediate"][:2],
+                "resources": take(categorized_recs["immediate"], 2),
                 "goal": "Address most urgent skill gaps"
             })
         
@@ -147,7 +169,7 @@ class TrainingRecommenderAgent:
                 "phase": 2,
                 "title": "Foundation Building",
                 "duration": "2-3 weeks", 
-                "resources": categorized_recs["foundational"][:3],
+                "resources": take(categorized_recs["foundational"], 3),
                 "goal": "Strengthen core concepts and understanding"
             })
         
@@ -157,7 +179,7 @@ class TrainingRecommenderAgent:
                 "phase": 3,
                 "title": "Practical Application",
                 "duration": "2-4 weeks",
-                "resources": categorized_recs["practical"][:2],
+                "resources": take(categorized_recs["practical"], 2),
                 "goal": "Apply knowledge through hands-on practice"
             })
         
@@ -167,7 +189,7 @@ class TrainingRecommenderAgent:
                 "phase": 4,
                 "title": "Advanced Development",
                 "duration": "3-4 weeks",
-                "resources": categorized_recs["advanced"][:2],
+                "resources": take(categorized_recs["advanced"], 2),
                 "goal": "Develop advanced skills and expertise"
             })
         
@@ -178,19 +200,8 @@ class TrainingRecommenderAgent:
         total_hours = 0
         
         for resource in resources:
-            resource_type = resource.get("type", "course").lower()
-            
             # Estimate hours based on resource type
-            type_hours = {
-                "course": 20,
-                "tutorial": 5,
-                "documentation": 3,
-                "project": 15,
-                "practice": 8,
-                "book": 30
-            }
-            
-            total_hours += type_hours.get(resource_type, 10)
+            total_hours += resource_hours(resource)
         
         if total_hours <= 20:
             return "2-3 weeks"
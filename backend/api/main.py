@@ -1,12 +1,22 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse
+from starlette.background import BackgroundTask
 from config.settings import settings
 from database.weaviate_client import weaviate_client
-from services.csv_processor import csv_processor
+from services.csv_processor import csv_processor, file_hash, SUPPORTED_SUFFIXES
 from database.vector_store import vector_store
 from crew.simulator_crew import simulator_crew
-from typing import Dict, Any, List
+from agents.scenario_generator_agent import scenario_generator_agent
+from agents.challenge_presenter_agent import challenge_presenter_agent
+from services.llm_service import llm_service
+from services.evaluation_cascade import evaluation_cascade
+from services.code_analysis import code_analysis_engine
+from services.content_analyzer import content_analyzer
+from services.sandbox_runner import sandbox_runner
+from services.student_roster import student_roster
+from typing import Dict, Any, List, Optional
+import asyncio
 import logging
 import json
 import tempfile
@@ -44,6 +54,12 @@ async def startup_event():
         weaviate_client.create_schema()
         logger.info("Application startup completed with Weaviate Cloud")
         
+        # Pre-generate scenarios for the role/level pairs we expect
+        warm_keys = [tuple(pair.split(":", 1)) for pair in settings.scenario_pool_warm_keys.split(",") if ":" in pair]
+        if warm_keys:
+            scenario_generator_agent.pool.warm(warm_keys)
+            logger.info(f"Warming scenario pool for {len(warm_keys)} role/level pairs")
+        
     except Exception as e:
         logger.error(f"Startup failed: {e}")
         # Don't raise here to allow API to start even if Weaviate has issues
@@ -52,6 +68,7 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     try:
+        code_analysis_engine.shutdown()
         if hasattr(weaviate_client, 'close'):
             weaviate_client.close()
         logger.info("Weaviate Cloud connection closed")
@@ -66,38 +83,61 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+def _catalog_file_suffix(filename: str) -> str:
+    """Validate an uploaded catalog file name and return its suffix"""
+    suffix = os.path.splitext(filename or "")[1].lower()
+    if suffix not in SUPPORTED_SUFFIXES:
+        raise HTTPException(status_code=400, detail="File must be a CSV or Parquet file")
+    if suffix == ".parquet" and not csv_processor.parquet_available:
+        raise HTTPException(status_code=400, detail="Parquet uploads require pyarrow on the server")
+    return suffix
+
 @app.post("/upload-scenarios")
 async def upload_scenarios(file: UploadFile = File(...)):
     """Upload and process scenario CSV file"""
     try:
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="File must be a CSV")
+        suffix = _catalog_file_suffix(file.filename)
+        
+        content = await file.read()
+        digest = file_hash(content)
+        if simulator_crew.is_file_ingested("scenarios", digest):
+            logger.info(f"Scenario file {file.filename} already uploaded, skipping")
+            return {"message": "File already uploaded, nothing changed", "count": 0, "skipped": True}
         
         # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-            content = await file.read()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
         
         # Process CSV and load to vector store
-        scenarios = csv_processor.load_scenarios_from_csv(tmp_file_path)
+        try:
+            scenarios, validation = csv_processor.load_file("scenarios", tmp_file_path)
+        finally:
+            os.unlink(tmp_file_path)  # Clean up temp file
         
         if scenarios:
-            vector_store.add_scenarios(scenarios)
-            # CRITICAL: Add scenarios to simulator storage
-            simulator_crew.add_scenarios_to_storage(scenarios)
-            os.unlink(tmp_file_path)  # Clean up temp file
+            # CRITICAL: Add scenarios to simulator storage; only new or changed rows reach the vector store
+            delta = simulator_crew.add_scenarios_to_storage(scenarios)
+            changed = delta["added"] + delta["updated"]
+            if changed:
+                vector_store.add_scenarios(changed)
+            simulator_crew.mark_file_ingested("scenarios", digest)
             
-            logger.info(f"Successfully uploaded {len(scenarios)} scenarios to both vector store and simulator")
+            logger.info(f"Successfully uploaded {len(changed)} new or changed scenarios to both vector store and simulator")
             
             return {
-                "message": f"Successfully uploaded {len(scenarios)} scenarios",
-                "count": len(scenarios)
+                "message": f"Successfully uploaded {len(changed)} scenarios",
+                "count": len(changed),
+                "added": len(delta["added"]),
+                "updated": len(delta["updated"]),
+                "unchanged": delta["unchanged"],
+                "validation": validation
             }
         else:
-            os.unlink(tmp_file_path)
-            raise HTTPException(status_code=400, detail="No valid scenarios found in CSV")
+            raise HTTPException(status_code=400, detail={"message": "No valid scenarios found in file", "validation": validation})
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Scenario upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -106,40 +146,136 @@ async def upload_scenarios(file: UploadFile = File(...)):
 async def upload_training_resources(file: UploadFile = File(...)):
     """Upload and process training resources CSV file"""
     try:
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="File must be a CSV")
+        suffix = _catalog_file_suffix(file.filename)
+        
+        content = await file.read()
+        digest = file_hash(content)
+        if simulator_crew.is_file_ingested("training_resources", digest):
+            logger.info(f"Training resources file {file.filename} already uploaded, skipping")
+            return {"message": "File already uploaded, nothing changed", "count": 0, "skipped": True}
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as tmp_file:
-            content = await file.read()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
         
-        resources = csv_processor.load_training_resources_from_csv(tmp_file_path)
+        try:
+            resources, validation = csv_processor.load_file("training_resources", tmp_file_path)
+        finally:
+            os.unlink(tmp_file_path)
         
         if resources:
-            vector_store.add_training_resources(resources)
-            # CRITICAL: Add resources to simulator storage
-            simulator_crew.add_training_resources_to_storage(resources)
-            os.unlink(tmp_file_path)
+            # CRITICAL: Add resources to simulator storage; only new or changed rows reach the vector store
+            delta = simulator_crew.add_training_resources_to_storage(resources)
+            changed = delta["added"] + delta["updated"]
+            if changed:
+                vector_store.add_training_resources(changed)
+            simulator_crew.mark_file_ingested("training_resources", digest)
             
-            logger.info(f"Successfully uploaded {len(resources)} training resources to both vector store and simulator")
+            logger.info(f"Successfully uploaded {len(changed)} new or changed training resources to both vector store and simulator")
             
             return {
-                "message": f"Successfully uploaded {len(resources)} training resources",
-                "count": len(resources)
+                "message": f"Successfully uploaded {len(changed)} training resources",
+                "count": len(changed),
+                "added": len(delta["added"]),
+                "updated": len(delta["updated"]),
+                "unchanged": delta["unchanged"],
+                "validation": validation
             }
         else:
-            os.unlink(tmp_file_path)
-            raise HTTPException(status_code=400, detail="No valid training resources found in CSV")
+            raise HTTPException(status_code=400, detail={"message": "No valid training resources found in file", "validation": validation})
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Training resources upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/upload-students")
+async def upload_students(file: UploadFile = File(...)):
+    """Bulk import the student roster from a CSV or Parquet file"""
+    try:
+        suffix = _catalog_file_suffix(file.filename)
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+            tmp_file.write(await file.read())
+            tmp_file_path = tmp_file.name
+        
+        try:
+            students, validation = csv_processor.load_file("students", tmp_file_path)
+        finally:
+            os.unlink(tmp_file_path)
+        
+        if not students:
+            raise HTTPException(status_code=400, detail={"message": "No valid students found in file", "validation": validation})
+        
+        delta = student_roster.upsert(students)
+        return {
+            "message": f"Successfully imported {delta['added'] + delta['updated']} students",
+            **delta,
+            "total": len(student_roster),
+            "validation": validation
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Student roster upload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/students/{student_id}")
+async def get_student(student_id: str):
+    """Look up a student profile in the roster"""
+    student = student_roster.get(student_id)
+    if student is None:
+        raise HTTPException(status_code=404, detail=f"Unknown student: {student_id}")
+    return student
+
+def _resolve_student(student_id: Optional[str], student_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Student profile from the roster by id, or the profile sent inline"""
+    if student_id:
+        student = student_roster.get(student_id)
+        if student is None:
+            raise HTTPException(status_code=404, detail=f"Unknown student: {student_id}")
+        return student
+    if isinstance(student_data, dict) and student_data:
+        return student_data
+    raise HTTPException(status_code=400, detail="student_id or student_data is required")
+
+@app.get("/export-scenarios")
+async def export_scenarios():
+    """Download the current scenario catalog as Parquet"""
+    return _export_catalog(simulator_crew.catalog.snapshot.scenarios, "scenarios")
+
+@app.get("/export-training-resources")
+async def export_training_resources():
+    """Download the current training resource catalog as Parquet"""
+    return _export_catalog(simulator_crew.catalog.snapshot.training_resources, "training_resources")
+
+def _export_catalog(table, name: str):
+    if not csv_processor.parquet_available:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.parquet') as tmp_file:
+            tmp_file_path = tmp_file.name
+        csv_processor.export_to_parquet(table, tmp_file_path)
+        return FileResponse(
+            tmp_file_path,
+            media_type="application/vnd.apache.parquet",
+            filename=f"{name}.parquet",
+            background=BackgroundTask(os.unlink, tmp_file_path)
+        )
+    except Exception as e:
+        logger.error(f"Export of {name} failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/generate-scenarios")
-async def generate_scenarios(student_data: Dict[str, Any]):
-    """Generate scenarios for a student"""
+async def generate_scenarios(student_data: Dict[str, Any], background_tasks: BackgroundTasks):
+    """Generate scenarios for a student (full profile, or a student_id from the roster plus optional overrides)"""
     try:
+        if student_data.get("student_id"):
+            overrides = {key: value for key, value in student_data.items() if key != "student_id"}
+            student_data = {**_resolve_student(student_data["student_id"], None), **overrides}
+        
         required_fields = ["role", "skill_level"]
         for field in required_fields:
             if field not in student_data:
@@ -150,26 +286,90 @@ async def generate_scenarios(student_data: Dict[str, Any]):
         if not scenarios:
             raise HTTPException(status_code=500, detail="Failed to generate scenarios")
         
+        # Adapt every returned scenario after the response is sent, before the student picks one
+        background_tasks.add_task(challenge_presenter_agent.prefetcher.prefetch, scenarios, student_data)
+        
         return {
             "scenarios": scenarios,
             "count": len(scenarios)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Scenario generation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/select-challenge")
+async def select_challenge(selection: Dict[str, Any]):
+    """Return the adapted challenge for a chosen scenario, usually straight from the prefetch cache"""
+    try:
+        scenario_id = selection.get("scenario_id")
+        if not scenario_id:
+            raise HTTPException(status_code=400, detail="scenario_id is required")
+        student_data = _resolve_student(selection.get("student_id"), selection.get("student_data"))
+        
+        prefetcher = challenge_presenter_agent.prefetcher
+        adapted = prefetcher.get_cached(scenario_id, student_data)
+        if adapted is None:
+            scenario = selection.get("scenario") or simulator_crew.find_scenario(scenario_id, student_data)
+            # A cache miss adapts with the LLM, which blocks; keep it off the event loop
+            # A shed or failed adaptation comes back as the unadapted challenge (adapted=False), still a valid answer
+            adapted = await asyncio.to_thread(prefetcher.get, {**scenario, "id": scenario_id}, student_data)
+        
+        return {"adapted_challenge": adapted}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Challenge selection failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/recommend-cohort")
+async def recommend_cohort(cohort: Dict[str, Any]):
+    """Training recommendations for a list of students' gap analyses, scored together"""
+    try:
+        students = cohort.get("students")
+        if not isinstance(students, list) or not students:
+            raise HTTPException(status_code=400, detail="students must be a non-empty list")
+        
+        entries = []
+        for student in students:
+            if not isinstance(student, dict):
+                raise HTTPException(status_code=400, detail="Each student must be an object")
+            if student.get("student_id") and not student.get("role"):
+                profile = _resolve_student(student["student_id"], None)
+                student = {**student, "role": profile.get("role", "")}
+            entries.append(student)
+        
+        recommendations = simulator_crew.recommend_for_cohort(entries)
+        return {
+            "results": [
+                {"student_id": student.get("student_id"), "role": student.get("role", ""), "recommendations": recommended}
+                for student, recommended in zip(entries, recommendations)
+            ],
+            "count": len(recommendations)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Cohort recommendation failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/submit-response")
 async def submit_response(
-    student_data: str = Form(...),
     scenario_id: str = Form(...),
     response_content: str = Form(...),
-    files: List[UploadFile] = File(None)
+    files: List[UploadFile] = File(None),
+    evaluation_mode: Optional[str] = Form(None),
+    student_id: Optional[str] = Form(None),
+    student_data: Optional[str] = Form(None)
 ):
     """Submit student response and run complete simulation"""
     try:
-        # Parse student data
-        student_info = json.loads(student_data)
+        # Rostered students only send their id; inline JSON profiles are still accepted
+        student_info = _resolve_student(student_id, None if student_id else json.loads(student_data or "{}"))
         
         # Handle file uploads
         file_contents = []
@@ -190,10 +390,11 @@ async def submit_response(
             "files": file_contents
         }
         
-        # Run complete simulation
-        results = simulator_crew.run_full_simulation(
+        # Run complete simulation (identical resubmissions are served from cache)
+        results = await simulator_crew.simulate(
             student_data=student_info,
-            submission_data=submission_data
+            submission_data=submission_data,
+            evaluation_mode=evaluation_mode
         )
         
         if "error" in results:
@@ -203,6 +404,8 @@ async def submit_response(
         
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid student data JSON")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Response submission failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -217,9 +420,10 @@ async def get_simulation_results(simulation_id: str):
 async def debug_scenarios():
     """Debug endpoint to see stored scenarios"""
     try:
+        scenarios = simulator_crew.scenarios_storage
         return {
-            "scenarios": simulator_crew.scenarios_storage, 
-            "count": len(simulator_crew.scenarios_storage)
+            "scenarios": [dict(scenario) for scenario in scenarios], 
+            "count": len(scenarios)
         }
     except Exception as e:
         logger.error(f"Debug scenarios failed: {e}")
@@ -229,9 +433,10 @@ async def debug_scenarios():
 async def debug_resources():
     """Debug endpoint to see stored training resources"""
     try:
+        resources = simulator_crew.training_resources_storage
         return {
-            "resources": simulator_crew.training_resources_storage, 
-            "count": len(simulator_crew.training_resources_storage)
+            "resources": [dict(resource) for resource in resources], 
+            "count": len(resources)
         }
     except Exception as e:
         logger.error(f"Debug resources failed: {e}")
@@ -241,10 +446,22 @@ async def debug_resources():
 async def debug_status():
     """Debug endpoint to check system status"""
     try:
+        catalog = simulator_crew.catalog.snapshot
         return {
             "weaviate_connected": weaviate_client.client is not None and weaviate_client.client.is_ready() if weaviate_client.client else False,
-            "scenarios_loaded": len(simulator_crew.scenarios_storage),
-            "resources_loaded": len(simulator_crew.training_resources_storage),
+            "scenarios_loaded": len(catalog.scenarios),
+            "resources_loaded": len(catalog.training_resources),
+            "catalog_version": catalog.version,
+            "catalog_memory": catalog.memory_usage(),
+            "llm": llm_service.stats(),
+            "evaluation_cascade": evaluation_cascade.stats(),
+            "evaluation_cache": simulator_crew.evaluation_cache.stats(),
+            "content_analysis": content_analyzer.stats(),
+            "code_analysis": code_analysis_engine.stats(),
+            "sandbox": sandbox_runner.stats(),
+            "scenario_pool": scenario_generator_agent.pool.stats(),
+            "challenge_prefetch": challenge_presenter_agent.prefetcher.stats(),
+            "student_roster": student_roster.stats(),
             "api_status": "running"
         }
     except Exception as e:
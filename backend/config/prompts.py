@@ -1,9 +1,11 @@
 SCENARIO_GENERATION_PROMPT = """
 You are an expert in creating realistic job scenarios for students. 
-Based on the role '{role}' and the provided context, generate a practical scenario that tests real-world skills.
+Based on the role '{role}' and the provided context, generate a practical scenario that tests real-world skills
+at a difficulty suited to a {skill_level} student.
 
 Context: {context}
 Role: {role}
+Skill level: {skill_level}
 
 Generate a scenario with:
 1. Clear task description
@@ -7,6 +7,82 @@ class Settings(BaseSettings):
     weaviate_api_key: str
     cors_origins: str = "http://localhost:5173"
     
+    # LLM governor (rate limits, concurrency, retries, circuit breaker)
+    llm_requests_per_minute: int = 60
+    llm_tokens_per_minute: int = 1000000
+    llm_max_concurrency: int = 4
+    llm_max_retries: int = 3
+    llm_request_deadline_seconds: float = 30.0
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_recovery_seconds: float = 30.0
+    
+    # Prompt budgets in approximate tokens per agent input
+    prompt_budget_response_tokens: int = 6000
+    prompt_budget_files_tokens: int = 8000
+    prompt_budget_scenario_tokens: int = 1500
+    prompt_budget_feedback_tokens: int = 1500
+    
+    # Evaluation mode: "heuristic", "cascade" (heuristic, LLM only for borderline cases),
+    # "map_reduce" (per-chunk scoring with "heuristic" or "llm"), "agents" (the full agent pipeline)
+    # or "speculative" (agent pipeline with gap diagnosis started from heuristic scores)
+    evaluation_mode: str = "heuristic"
+    cascade_uncertainty_band: int = 3
+    cascade_min_confidence: float = 0.6
+    map_reduce_scorer: str = "heuristic"
+    map_reduce_chunk_tokens: int = 4000
+    map_reduce_max_workers: int = 8
+    map_reduce_max_llm_chunks: int = 8  # Larger submissions are graded on these chunks only and marked partial
+    
+    # Cache of completed simulations keyed by scenario and normalized submission
+    evaluation_cache_size: int = 2048
+    evaluation_cache_ttl_seconds: float = 3600.0
+    
+    # Feature records of analyzed submissions, shared by every stage that reads the text
+    content_analysis_cache_size: int = 1024
+    content_analysis_cache_ttl_seconds: float = 600.0
+    
+    # Structure analysis of code submissions in worker processes
+    code_analysis_workers: int = 2
+    code_analysis_timeout_seconds: float = 5.0
+    code_analysis_max_ast_chars: int = 200000  # Larger submissions are tokenized without building an AST
+    code_analysis_cache_size: int = 1024
+    code_analysis_cache_ttl_seconds: float = 3600.0
+    
+    # Sandboxed execution of scenario test cases against Python submissions.
+    # Each case runs under bubblewrap (bwrap) as uid 65534 with no network and no view of the
+    # backend directory; without bwrap no submission is executed. rlimits cap CPU, memory and file size,
+    # but the process count is only capped when the API itself does not run as root
+    sandbox_enabled: bool = False
+    sandbox_bwrap_path: str = "bwrap"
+    sandbox_workers: int = 0  # 0 = one per CPU core
+    sandbox_cpu_seconds: int = 2
+    sandbox_memory_mb: int = 256
+    sandbox_wall_seconds: float = 5.0
+    sandbox_runtime_budget_ms: float = 1000.0  # Per-case budget unless the case sets max_ms; includes interpreter start
+    sandbox_max_tests: int = 50
+    
+    # Background pool of pre-generated LLM scenarios per (role, skill_level)
+    scenario_pool_capacity: int = 9
+    scenario_pool_low_water: int = 3
+    scenario_pool_batch_size: int = 3
+    scenario_pool_warm_keys: str = ""  # Comma-separated role:skill_level pairs filled at startup
+    
+    # Background adaptation of returned scenarios, cached per (scenario id, skill level)
+    challenge_prefetch_enabled: bool = True
+    challenge_prefetch_ttl_seconds: float = 1800.0
+    challenge_prefetch_cache_size: int = 4096
+    challenge_prefetch_workers: int = 4
+    
+    # Training resources recommended per learning path category
+    recommendation_top_k: int = 5
+    
+    # Student roster (SQLite file, loaded into memory on first use; relative to the backend directory)
+    student_roster_path: str = "data/students.db"
+    
+    # Agent pipeline time limits
+    pipeline_stage_timeout_seconds: float = 45.0
+    pipeline_deadline_seconds: float = 120.0
+    
     class Config:
         env_file = ".env"
 
@@ -1,30 +1,118 @@
+from agents.challenge_presenter_agent import challenge_presenter_agent
+from agents.evaluation_agent import evaluation_agent
+from agents.gap_diagnosis_agent import gap_diagnosis_agent, SCORE_BASED_GAPS, SCORE_GAP_THRESHOLD
+from agents.response_collector_agent import response_collector_agent
+from agents.scenario_generator_agent import scenario_generator_agent
+from agents.training_recommender_agent import training_recommender_agent
+from config.prompts import EVALUATION_PROMPT, GAP_ANALYSIS_PROMPT, TRAINING_RECOMMENDATION_PROMPT
+from config.settings import settings
+from crew.tasks import STAGE_DEPENDENCIES, SPECULATIVE_STAGE_DEPENDENCIES
+from services.cache import EvaluationCache, TTLCache, rubric_version
+from services.catalog import Catalog
+from services.code_analysis import code_analysis_engine
+from services.csv_processor import scenario_id
+from services.evaluation_cascade import evaluation_cascade
+from services.gap_vocabulary import GAP_CATEGORIES, gap_vocabulary
+from services import heuristic_scorer as heuristic_rules
+from services.heuristic_scorer import heuristic_scorer
+from services.learning_path_planner import learning_path_planner
+from services.map_reduce_evaluator import map_reduce_evaluator
+from services.orchestrator import Stage, orchestrator
+from services.relevance_matrix import RECOMMENDATION_CATEGORIES, recommendation_category
+from services.role_taxonomy import role_taxonomy
+from services.sandbox_runner import parse_tests, sandbox_runner
+import asyncio
 import logging
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Heuristic-mode gaps per criterion scored below HEURISTIC_GAP_THRESHOLD: (category, gaps)
+HEURISTIC_GAP_THRESHOLD = 20
+HEURISTIC_SCORE_GAPS = {
+    "correctness": ("technical", ["Implementation accuracy", "Code structure", "Syntax knowledge"]),
+    "scalability": ("technical", ["Performance optimization", "Scalable design patterns"]),
+    "clarity": ("process", ["Code documentation", "Code organization", "Communication skills"]),
+    "relevance": ("conceptual", ["Understanding of requirements", "Problem analysis skills"])
+}
+# Gaps implied by a content feature the response lacks: (feature, category, gap)
+FEATURE_GAPS = (
+    ("has_relationships", "technical", "Database relationships and constraints"),
+    ("has_index", "technical", "Database performance optimization"),
+    ("has_comments", "process", "Code documentation practices")
+)
+
+gap_vocabulary.register(gap for _, gaps in HEURISTIC_SCORE_GAPS.values() for gap in gaps)
+gap_vocabulary.register(gap for _, _, gap in FEATURE_GAPS)
+
 class SimulatorCrew:
     def __init__(self):
-        # Initialize storage as instance variables
-        self.scenarios_storage = []
-        self.training_resources_storage = []
+        # Versioned copy-on-write catalog; readers take a snapshot, uploads publish a new one
+        self.catalog = Catalog()
+        # Pool and default scenarios handed out to students, kept while cached results may refer to them
+        self.issued_scenarios = TTLCache(settings.evaluation_cache_size, settings.evaluation_cache_ttl_seconds)
+        # Recommendations per (catalog version, role, gap profile); a new catalog version misses naturally
+        self.recommendation_cache = TTLCache(settings.evaluation_cache_size, settings.evaluation_cache_ttl_seconds)
+        self.evaluation_cache = EvaluationCache(self._rubric_version())
         logger.info("SimulatorCrew initialized with empty storage")
     
+    def _rubric_version(self):
+        """Fingerprint of the prompts, keyword rules and thresholds that decide results"""
+        return rubric_version(
+            EVALUATION_PROMPT, GAP_ANALYSIS_PROMPT, TRAINING_RECOMMENDATION_PROMPT,
+            SCORE_BASED_GAPS, SCORE_GAP_THRESHOLD, HEURISTIC_SCORE_GAPS, HEURISTIC_GAP_THRESHOLD, FEATURE_GAPS,
+            heuristic_rules.CODE_KEYWORDS, heuristic_rules.STRUCTURE_KEYWORDS,
+            heuristic_rules.BEST_PRACTICE_KEYWORDS, heuristic_rules.PERFORMANCE_KEYWORDS,
+            settings.cascade_uncertainty_band, settings.cascade_min_confidence,
+            settings.sandbox_runtime_budget_ms
+        )
+    
+    @property
+    def scenarios_storage(self):
+        """Scenarios of the current catalog version, as read-only row views"""
+        return self.catalog.snapshot.scenarios
+    
+    @property
+    def training_resources_storage(self):
+        """Training resources of the current catalog version, as read-only row views"""
+        return self.catalog.snapshot.training_resources
+    
     def add_scenarios_to_storage(self, scenarios):
-        """Add scenarios to instance storage"""
-        self.scenarios_storage.extend(scenarios)
-        logger.info(f"Added {len(scenarios)} scenarios to storage. Total: {len(self.scenarios_storage)}")
+        """Upsert scenarios by role+title into a new catalog version; returns the added and updated scenarios"""
+        delta = self.catalog.upsert_scenarios(scenarios)
+        
+        if delta["added"] or delta["updated"]:
+            self.evaluation_cache.invalidate_catalog()
+        logger.info(
+            f"Scenarios upserted: {len(delta['added'])} added, {len(delta['updated'])} updated, "
+            f"{delta['unchanged']} unchanged. Total: {len(self.scenarios_storage)}"
+        )
         # Debug log first few scenarios
-        for i, scenario in enumerate(scenarios[:2]):
+        for i, scenario in enumerate(delta["added"][:2]):
             logger.info(f"Scenario {i+1}: {scenario.get('title', 'No title')} - Role: {scenario.get('role', 'No role')}")
+        return delta
     
     def add_training_resources_to_storage(self, resources):
-        """Add training resources to instance storage"""
-        self.training_resources_storage.extend(resources)
-        logger.info(f"Added {len(resources)} training resources to storage. Total: {len(self.training_resources_storage)}")
+        """Upsert training resources by url (or content hash) into a new catalog version; returns the delta"""
+        delta = self.catalog.upsert_training_resources(resources)
+        
+        if delta["added"] or delta["updated"]:
+            self.evaluation_cache.invalidate_catalog()
+        logger.info(
+            f"Training resources upserted: {len(delta['added'])} added, {len(delta['updated'])} updated, "
+            f"{delta['unchanged']} unchanged. Total: {len(self.training_resources_storage)}"
+        )
         # Debug log first few resources
-        for i, resource in enumerate(resources[:2]):
+        for i, resource in enumerate(delta["added"][:2]):
             logger.info(f"Resource {i+1}: {resource.get('title', 'No title')} - Type: {resource.get('type', 'No type')}")
+        return delta
+    
+    def is_file_ingested(self, catalog, digest):
+        """True when an identical file was already uploaded to this catalog and nothing changed it since"""
+        return self.catalog.is_file_ingested(catalog, digest)
+    
+    def mark_file_ingested(self, catalog, digest):
+        self.catalog.mark_file_ingested(catalog, digest)
     
     def generate_scenarios_only(self, student_data):
         logger.info("Generating scenarios...")
@@ -32,12 +120,17 @@ class SimulatorCrew:
         skill_level = student_data.get("skill_level", "beginner")
         
         logger.info(f"Looking for scenarios for role: {role}, skill: {skill_level}")
-        logger.info(f"Available scenarios in storage: {len(self.scenarios_storage)}")
+        # One consistent catalog version for the whole request
+        catalog = self.catalog.snapshot
+        logger.info(f"Available scenarios in storage: {len(catalog.scenarios)}")
         
         # First, try to get scenarios from uploaded CSV data
         uploaded_scenarios = []
         try:
-            uploaded_scenarios = [s for s in self.scenarios_storage if s.get("role", "").lower() == role.lower()]
+            # Same difficulty first, then the other compatible scenarios
+            uploaded_scenarios = catalog.candidates(role, skill_level)
+            seen = {scenario["id"] for scenario in uploaded_scenarios}
+            uploaded_scenarios += [s for s in catalog.candidates(role) if s["id"] not in seen]
             logger.info(f"Found {len(uploaded_scenarios)} matching scenarios for role: {role}")
         except Exception as e:
             logger.warning(f"Could not retrieve uploaded scenarios: {e}")
@@ -49,11 +142,12 @@ class SimulatorCrew:
             logger.info("Using uploaded scenarios from CSV")
             for scenario_data in uploaded_scenarios[:2]:  # Take first 2
                 scenario = {
-                    "id": str(uuid.uuid4()),
+                    "id": scenario_data.get("id") or scenario_id(scenario_data),
                     "title": scenario_data.get("title", f"{role.title()} Challenge"),
                     "task": scenario_data.get("task", f"Complete a {role} development task"),
                     "role": role,
-                    "difficulty": skill_level,
+                    # Other-difficulty candidates fill in when the level has too few; they keep their own label
+                    "difficulty": scenario_data.get("difficulty") or skill_level,
                     "context": scenario_data.get("context", ""),
                     "requirements": self._split_field(scenario_data.get("requirements", [])),
                     "deliverables": self._split_field(scenario_data.get("deliverables", [])),
@@ -61,12 +155,25 @@ class SimulatorCrew:
                 }
                 scenarios.append(scenario)
         
+        # Top up from the pre-generated LLM pool (refills itself in the background)
+        if len(scenarios) < 2:
+            pooled = scenario_generator_agent.pool.take(role, skill_level, 2 - len(scenarios))
+            if pooled:
+                logger.info(f"Using {len(pooled)} pre-generated scenarios from pool")
+                scenarios.extend(pooled)
+        
         # If no uploaded scenarios or need more, generate default ones
         if len(scenarios) < 2:
             logger.info("Using default scenarios (no CSV data found)")
             default_scenarios = self._generate_default_scenarios(role, skill_level)
+            for scenario in default_scenarios:
+                scenario["id"] = scenario_id(scenario)
             scenarios.extend(default_scenarios[:(2 - len(scenarios))])
         
+        for scenario in scenarios:
+            if scenario["id"] not in catalog.scenario_index:
+                self.issued_scenarios.set(scenario["id"], scenario)
+        
         logger.info(f"Generated {len(scenarios)} scenarios for {role}")
         return scenarios
     
@@ -81,10 +188,10 @@ class SimulatorCrew:
     
     def _generate_default_scenarios(self, role, skill_level):
         """Generate default scenarios when no CSV data is available"""
-        if role == "frontend":
+        family = role_taxonomy.family(role)
+        if family == "frontend":
             return [
                 {
-                    "id": str(uuid.uuid4()),
                     "title": "Responsive Product Page",
                     "task": "Create a responsive e-commerce product page with add to cart functionality",
                     "role": role,
@@ -94,7 +201,6 @@ class SimulatorCrew:
                     "criteria": ["Code quality", "User experience", "Performance"]
                 },
                 {
-                    "id": str(uuid.uuid4()),
                     "title": "Interactive Dashboard",
                     "task": "Build a data visualization dashboard with charts and filters",
                     "role": role,
@@ -104,10 +210,9 @@ class SimulatorCrew:
                     "criteria": ["Visualization quality", "Interactivity", "Code structure"]
                 }
             ]
-        elif role == "backend":
+        elif family == "backend":
             return [
                 {
-                    "id": str(uuid.uuid4()),
                     "title": "REST API Development",
                     "task": "Design and implement a RESTful API for a blog platform",
                     "role": role,
@@ -117,7 +222,6 @@ class SimulatorCrew:
                     "criteria": ["API design", "Security", "Performance"]
                 },
                 {
-                    "id": str(uuid.uuid4()),
                     "title": "Database Design",
                     "task": "Create a database schema for an e-commerce platform",
                     "role": role,
@@ -127,10 +231,9 @@ class SimulatorCrew:
                     "criteria": ["Schema quality", "Optimization", "Scalability"]
                 }
             ]
-        elif role == "data_analyst":
+        elif family == "data_analyst":
             return [
                 {
-                    "id": str(uuid.uuid4()),
                     "title": "Sales Data Analysis",
                     "task": "Analyze quarterly sales data and identify key trends",
                     "role": role,
@@ -143,7 +246,6 @@ class SimulatorCrew:
         else:  # fullstack
             return [
                 {
-                    "id": str(uuid.uuid4()),
                     "title": "Full-Stack Application",
                     "task": "Build a complete task management application",
                     "role": role,
@@ -154,93 +256,137 @@ class SimulatorCrew:
                 }
             ]
     
-    def run_full_simulation(self, student_data, submission_data):
+    async def simulate(self, student_data, submission_data, evaluation_mode=None):
+        """
+        Evaluate a submission in the requested mode, serving identical resubmissions from cache
+        A cache hit skips every stage
+        """
+        evaluation_mode = evaluation_mode or settings.evaluation_mode
+        scenario = self.find_scenario(submission_data.get("scenario_id", ""), student_data)
+        tests = parse_tests(scenario.get("tests")) if settings.sandbox_enabled else []
+        cache_key = self.evaluation_cache.key(
+            submission_data.get("scenario_id", ""),
+            student_data,
+            submission_data.get("content", ""),
+            submission_data.get("files", []),
+            evaluation_mode,
+            # Executed results depend on every character of the program, whitespace included
+            exact=bool(tests)
+        )
+        
+        cached = self.evaluation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Serving cached simulation for scenario {submission_data.get('scenario_id', '')}")
+            return {
+                **cached,
+                "simulation_id": str(uuid.uuid4()),
+                "student": student_data,
+                "response": {**cached.get("response", {}), "content": submission_data.get("content", "")},
+                "cache_hit": True
+            }
+        
+        # Parse code in worker processes while the event loop stays free; later stages read the cache
+        await code_analysis_engine.warm([submission_data.get("content", "")])
+        execution = await self._execute_tests(submission_data, tests)
+        
+        if evaluation_mode in ("agents", "speculative"):
+            results = await self.run_agent_pipeline(
+                student_data, submission_data, speculative=evaluation_mode == "speculative", execution=execution
+            )
+        else:
+            # Cascade escalation and LLM map scoring block on the provider, so keep them off the event loop
+            results = await asyncio.to_thread(
+                self.run_full_simulation, student_data, submission_data, evaluation_mode=evaluation_mode, execution=execution
+            )
+        
+        if results.get("status") == "completed":
+            self.evaluation_cache.set(cache_key, results)
+        return {**results, "cache_hit": False}
+    
+    async def _execute_tests(self, submission_data, tests):
+        """Run the scenario's test cases against a Python submission in the sandbox; None when there are none"""
+        if not tests:
+            return None
+        
+        content = submission_data.get("content", "")
+        metrics = code_analysis_engine.cached(content)
+        if not metrics or metrics["language"] != "python":
+            return {"status": "skipped", "reason": "only Python submissions are executed", "total": len(tests)}
+        return await sandbox_runner.run_tests_async(content, tests)
+    
+    def run_full_simulation(self, student_data, submission_data, evaluation_mode=None, execution=None):
         logger.info("Running full simulation...")
         logger.info(f"Available training resources: {len(self.training_resources_storage)}")
         
-        # Simple evaluation logic (enhanced from previous version)
+        evaluation_mode = evaluation_mode or settings.evaluation_mode
+        role = student_data.get("role", "")
+        scenario_id = submission_data.get("scenario_id", "")
+        original_scenario = self.find_scenario(scenario_id, student_data)
+        
         content = submission_data.get("content", "")
-        content_length = len(content)
-        word_count = len(content.split())
-        
-        # Analyze response content for better scoring
-        has_code = any(keyword in content.lower() for keyword in 
-                      ['create table', 'select', 'insert', 'update', 'delete', 'function', 'class', 'def ', 'const ', 'let ', 'var '])
-        has_structure = any(keyword in content.lower() for keyword in 
-                           ['primary key', 'foreign key', 'index', 'constraint', 'return', '{', '}', 'if', 'for'])
-        has_comments = '--' in content or '//' in content or '#' in content or '/*' in content
-        has_best_practices = any(keyword in content.lower() for keyword in 
-                               ['not null', 'unique', 'auto_increment', 'timestamp', 'varchar'])
-        
-        # Enhanced scoring based on content analysis
-        clarity_score = min(25, max(5, content_length // 20))
-        if has_comments:
-            clarity_score = min(25, clarity_score + 5)
-        if content_length > 500:
-            clarity_score = min(25, clarity_score + 3)
-        
-        relevance_score = 15
-        if has_code:
-            relevance_score += 5
-        if has_structure:
-            relevance_score += 3
-        if word_count > 50:
-            relevance_score += 2
-        relevance_score = min(25, relevance_score)
-        
-        correctness_score = 12
-        if has_structure:
-            correctness_score += 8
-        if has_best_practices:
-            correctness_score += 5
-        correctness_score = min(25, correctness_score)
-        
-        scalability_score = min(25, max(10, content_length // 30))
-        if 'index' in content.lower():
-            scalability_score = min(25, scalability_score + 5)
-        if any(keyword in content.lower() for keyword in ['performance', 'optimization', 'efficient']):
-            scalability_score = min(25, scalability_score + 3)
+        map_reduce_stats = None
+        cascade_report = None
+        
+        if evaluation_mode == "map_reduce":
+            # Score the answer and every uploaded file chunk in parallel, then reduce
+            outcome = map_reduce_evaluator.evaluate(
+                content,
+                submission_data.get("files", []),
+                original_scenario,
+                scorer=settings.map_reduce_scorer
+            )
+            features = outcome["features"]
+            scores = outcome["scores"]
+            map_reduce_stats = outcome["map_reduce"]
+        else:
+            features = heuristic_scorer.extract_features(content, cache=True)
+            scores = heuristic_scorer.score(features)
+        
+        if evaluation_mode == "cascade":
+            # Clear passes and failures keep the heuristic scores; borderline cases ask the LLM
+            scores, cascade_report = evaluation_cascade.evaluate(
+                content,
+                submission_data.get("files", []),
+                original_scenario,
+                features,
+                scores
+            )
+        
+        # Test results, when the scenario has them, outweigh keyword evidence
+        scores = sandbox_runner.apply(scores, execution)
+        
+        content_length = features["length"]
+        word_count = features["words"]
+        has_code = features["has_code"]
+        has_structure = features["has_structure"]
+        has_comments = features["has_comments"]
+        has_best_practices = features["has_best_practices"]
+        
+        clarity_score = scores["clarity"]
+        relevance_score = scores["relevance"]
+        correctness_score = scores["correctness"]
+        scalability_score = scores["scalability"]
         
         total_score = clarity_score + relevance_score + correctness_score + scalability_score
-        
-        # Determine grade
-        if total_score >= 90:
-            grade = "A"
-        elif total_score >= 80:
-            grade = "B"
-        elif total_score >= 70:
-            grade = "C"
-        elif total_score >= 60:
-            grade = "D"
-        else:
-            grade = "F"
+        grade = heuristic_scorer.grade(total_score)
         
         # Enhanced gap analysis
-        technical_gaps = []
-        conceptual_gaps = []
-        process_gaps = []
-        
-        if correctness_score < 20:
-            technical_gaps.extend(["Implementation accuracy", "Code structure", "Syntax knowledge"])
-        if scalability_score < 20:
-            technical_gaps.extend(["Performance optimization", "Scalable design patterns"])
-        if clarity_score < 20:
-            process_gaps.extend(["Code documentation", "Code organization", "Communication skills"])
-        if relevance_score < 20:
-            conceptual_gaps.extend(["Understanding of requirements", "Problem analysis skills"])
+        gaps = {category: [] for category in GAP_CATEGORIES}
+        for criterion, (category, criterion_gaps) in HEURISTIC_SCORE_GAPS.items():
+            if scores[criterion] < HEURISTIC_GAP_THRESHOLD:
+                gaps[category].extend(criterion_gaps)
         
         # Additional specific gaps based on content
-        if 'foreign key' not in content.lower() and 'join' not in content.lower():
-            technical_gaps.append("Database relationships and constraints")
-        if 'index' not in content.lower():
-            technical_gaps.append("Database performance optimization")
-        if not has_comments:
-            process_gaps.append("Code documentation practices")
-        
-        # Remove duplicates
-        technical_gaps = list(set(technical_gaps))
-        conceptual_gaps = list(set(conceptual_gaps))
-        process_gaps = list(set(process_gaps))
+        for feature, category, gap in FEATURE_GAPS:
+            if not features[feature]:
+                gaps[category].append(gap)
+        
+        # Interned bitsets de-duplicate and give every run the same gap order
+        gap_profile = gap_vocabulary.profile(**gaps)
+        gap_lists = gap_vocabulary.to_lists(gap_profile)
+        technical_gaps = gap_lists["technical_gaps"]
+        conceptual_gaps = gap_lists["conceptual_gaps"]
+        process_gaps = gap_lists["process_gaps"]
         
         # Improvement urgency
         if total_score < 50:
@@ -253,40 +399,26 @@ class SimulatorCrew:
             urgency = "Low - Minor improvements suggested"
         
         # CRITICAL: Enhanced training recommendations using uploaded CSV data
-        role = student_data.get("role", "")
-        recommendations = self._get_detailed_training_recommendations(role, technical_gaps, conceptual_gaps, process_gaps)
+        snapshot = self.catalog.snapshot
+        recommendations_key = (snapshot.version, role, gap_profile)
+        cached = self.recommendation_cache.get(recommendations_key)
+        if cached is None:
+            cached = (
+                self._get_detailed_training_recommendations(role, gap_profile, snapshot),
+                self._plan_learning_path(gap_profile, snapshot)
+            )
+            self.recommendation_cache.set(recommendations_key, cached)
+        recommendations, plan = cached
         
         # Create detailed learning path
-        learning_path = self._create_detailed_learning_path(recommendations, urgency)
-        
-        # Find the original scenario
-        original_scenario = None
-        scenario_id = submission_data.get("scenario_id", "")
-        for scenario in self.scenarios_storage:
-            if scenario.get("id") == scenario_id:
-                original_scenario = scenario
-                break
-        
-        if not original_scenario:
-            original_scenario = {
-                "id": scenario_id,
-                "title": "Assessment Scenario",
-                "task": "Complete the assigned task",
-                "role": role,
-                "difficulty": student_data.get("skill_level", "beginner")
-            }
+        learning_path = self._create_detailed_learning_path(recommendations, urgency, plan)
         
         # Compile comprehensive results
         results = {
             "simulation_id": str(uuid.uuid4()),
             "student": student_data,
             "scenario": original_scenario,
-            "adapted_challenge": {
-                "scenario_id": scenario_id,
-                "adapted_task": original_scenario.get("task", ""),
-                "complexity_level": student_data.get("skill_level", "beginner"),
-                "instructions": "Complete the task according to the requirements"
-            },
+            "adapted_challenge": self._basic_adapted_challenge(original_scenario, student_data),
             "response": {
                 "id": str(uuid.uuid4()),
                 "content": content,
@@ -317,14 +449,18 @@ class SimulatorCrew:
                     "correctness": f"Implementation: {'Excellent' if correctness_score >= 22 else 'Good' if correctness_score >= 18 else 'Needs work'} ({correctness_score}/25)",
                     "scalability": f"Scalability: {'Excellent' if scalability_score >= 22 else 'Good' if scalability_score >= 18 else 'Consider improvements'} ({scalability_score}/25)",
                     "general": f"Overall performance shows {'excellent' if total_score >= 85 else 'good' if total_score >= 70 else 'basic'} understanding of the requirements."
-                }
+                },
+                "evaluation_mode": evaluation_mode,
+                "map_reduce": map_reduce_stats,
+                "cascade": cascade_report,
+                "execution": execution
             },
             "gap_analysis": {
                 "id": str(uuid.uuid4()),
                 "technical_gaps": technical_gaps,
                 "conceptual_gaps": conceptual_gaps,
                 "process_gaps": process_gaps,
-                "total_gaps": len(technical_gaps) + len(conceptual_gaps) + len(process_gaps),
+                "total_gaps": gap_profile.count(),
                 "improvement_urgency": urgency,
                 "priority_areas": self._get_priority_areas(technical_gaps, conceptual_gaps, process_gaps)
             },
@@ -334,6 +470,7 @@ class SimulatorCrew:
                 "recommendations": recommendations,
                 "learning_path": learning_path,
                 "estimated_duration": self._estimate_total_duration(learning_path),
+                "gap_coverage": {key: value for key, value in plan.items() if key != "resources"},
                 "urgency": urgency
             },
             "status": "completed",
@@ -343,67 +480,254 @@ class SimulatorCrew:
         logger.info(f"Completed simulation for student {student_data.get('name', 'Unknown')} with score {total_score}")
         return results
     
-    def _get_detailed_training_recommendations(self, role, technical_gaps, conceptual_gaps, process_gaps):
+    async def run_agent_pipeline(self, student_data, submission_data, speculative=False, execution=None):
+        """Run the agent stages as a dependency graph under per-stage timeouts and a request deadline"""
+        logger.info(f"Running {'speculative ' if speculative else ''}agent pipeline...")
+        scenario = self.find_scenario(submission_data.get("scenario_id", ""), student_data)
+        stages = self._build_pipeline_stages(student_data, submission_data, scenario, speculative, execution)
+        
+        run = await orchestrator.run(stages, deadline=settings.pipeline_deadline_seconds)
+        results = run["results"]
+        
+        if "response_collection" not in results:
+            return {
+                "error": "Response collection failed",
+                "stage_status": run["stage_status"],
+                "stage_timings": run["stage_timings"]
+            }
+        
+        evaluation = results.get("evaluation", {})
+        gap_analysis = results.get("gap_diagnosis", {})
+        training_recommendations = results.get("training_recommendation", {})
+        speculation = None
+        if speculative and "reconciliation" in results:
+            reconciled = results["reconciliation"]
+            evaluation = reconciled["evaluation"]
+            gap_analysis = reconciled["gap_analysis"]
+            training_recommendations = reconciled["training_recommendations"]
+            speculation = reconciled["speculation"]
+        
+        all_succeeded = all(state == "completed" for state in run["stage_status"].values())
+        logger.info(f"Agent pipeline finished in {run['total_time']}s: {run['stage_status']}")
+        return {
+            "simulation_id": str(uuid.uuid4()),
+            "student": student_data,
+            "scenario": scenario,
+            "adapted_challenge": results.get("challenge_adaptation", {}),
+            "response": results["response_collection"],
+            "evaluation": evaluation,
+            "gap_analysis": gap_analysis,
+            "training_recommendations": training_recommendations,
+            "speculation": speculation,
+            "status": "completed" if all_succeeded else "partial",
+            "stage_status": run["stage_status"],
+            "stage_timings": run["stage_timings"],
+            "pipeline_time": run["total_time"],
+            "timestamp": str(uuid.uuid4())
+        }
+    
+    def _build_pipeline_stages(self, student_data, submission_data, scenario, speculative=False, execution=None):
+        """Bind each agent to its stage in the dependency graph, with a fallback where one exists"""
+        role = student_data.get("role", "")
+        dependencies = SPECULATIVE_STAGE_DEPENDENCIES if speculative else STAGE_DEPENDENCIES
+        # Speculative gap diagnosis works from heuristic scores instead of waiting for the LLM
+        gap_input = "heuristic_evaluation" if speculative else "evaluation"
+        
+        def collect(results, context):
+            response = response_collector_agent.collect_response(submission_data)
+            if "error" in response:
+                raise ValueError(response["error"])
+            return response
+        
+        def evaluate(results, context):
+            adapted_task = results["challenge_adaptation"].get("adapted_task") or scenario.get("task", "")
+            context.check()
+            evaluation = evaluation_agent.evaluate_response(results["response_collection"], {**scenario, "task": adapted_task})
+            return sandbox_runner.apply_to_evaluation(evaluation, execution)
+        
+        stage_functions = {
+            "response_collection": (collect, None),
+            "challenge_adaptation": (
+                lambda results, context: challenge_presenter_agent.prefetcher.get(scenario, student_data),
+                lambda results: self._basic_adapted_challenge(scenario, student_data)
+            ),
+            "evaluation": (
+                evaluate,
+                lambda results: evaluation_agent._default_evaluation(results["response_collection"])
+            ),
+            "gap_diagnosis": (
+                lambda results, context: gap_diagnosis_agent.diagnose_gaps(results[gap_input], results["response_collection"]),
+                lambda results: gap_diagnosis_agent._basic_gap_analysis(results[gap_input], results["response_collection"])
+            ),
+            "training_recommendation": (
+                lambda results, context: training_recommender_agent.recommend_training(results["gap_diagnosis"], role),
+                lambda results: training_recommender_agent._default_recommendations(role)
+            ),
+            "heuristic_evaluation": (
+                lambda results, context: sandbox_runner.apply_to_evaluation(self._heuristic_evaluation(results["response_collection"]), execution),
+                None
+            ),
+            "reconciliation": (
+                lambda results, context: self._reconcile_speculation(results, role, context),
+                None
+            )
+        }
+        
+        return [
+            Stage(
+                name=name,
+                func=func,
+                depends_on=dependencies[name],
+                timeout=settings.pipeline_stage_timeout_seconds,
+                fallback=fallback
+            )
+            for name, (func, fallback) in stage_functions.items()
+            if name in dependencies
+        ]
+    
+    def _heuristic_evaluation(self, response):
+        """Keyword-scored evaluation in the same shape as EvaluationAgent output"""
+        scores = heuristic_scorer.score(heuristic_scorer.extract_features(response.get("content", ""), cache=True))
+        total_score = sum(scores.values())
+        return {
+            "id": str(uuid.uuid4()),
+            "response_id": response.get("id", ""),
+            "scores": scores,
+            "feedback": {},
+            "total_score": total_score,
+            "max_score": 100,
+            "percentage": (total_score / 100) * 100,
+            "grade": heuristic_scorer.grade(total_score),
+            "evaluation_time": response.get("submission_time", ""),
+            "response_type": response.get("response_type", "text"),
+            "scored_by": "heuristic"
+        }
+    
+    def _reconcile_speculation(self, results, role, context):
+        """
+        Keep the speculative gaps and recommendations when the LLM scores cross no gap
+        threshold; otherwise revise only the crossed criteria and re-recommend.
+        A speculative diagnosis that fell back to basic gaps is redone from the final evaluation.
+        """
+        heuristic_evaluation = results["heuristic_evaluation"]
+        evaluation = results["evaluation"]
+        if "error" in evaluation:
+            # The LLM fell back to its fixed default; the heuristic scores are the better estimate
+            logger.warning("LLM evaluation unavailable, keeping heuristic evaluation")
+            evaluation = heuristic_evaluation
+        
+        crossed = gap_diagnosis_agent.threshold_crossings(heuristic_evaluation["scores"], evaluation["scores"])
+        # A diagnosis that fell back to its basic form picked gaps from the heuristic total, which
+        # revising per criterion cannot undo, so diagnose the final evaluation afresh
+        rediagnose = "error" in results["gap_diagnosis"]
+        if rediagnose:
+            context.check()
+            gap_analysis = gap_diagnosis_agent.diagnose_gaps(evaluation, results["response_collection"])
+        else:
+            gap_analysis = gap_diagnosis_agent.revise_gaps(results["gap_diagnosis"], heuristic_evaluation["scores"], evaluation)
+        
+        if crossed or rediagnose:
+            logger.info(f"Speculation missed on {crossed}, recomputing recommendations")
+            context.check()
+            training_recommendations = training_recommender_agent.recommend_training(gap_analysis, role)
+        else:
+            training_recommendations = {
+                **results["training_recommendation"],
+                "gap_analysis_id": gap_analysis["id"],
+                "urgency": gap_analysis["improvement_urgency"]
+            }
+        
+        return {
+            "evaluation": evaluation,
+            "gap_analysis": gap_analysis,
+            "training_recommendations": training_recommendations,
+            "speculation": {
+                "hit": not crossed and not rediagnose,
+                "crossed_criteria": crossed,
+                "rediagnosed": rediagnose,
+                "heuristic_scores": heuristic_evaluation["scores"]
+            }
+        }
+    
+    def find_scenario(self, scenario_id, student_data):
+        """Look up the scenario a submission answers, or a placeholder when it is unknown"""
+        scenario = self.catalog.snapshot.find_scenario(scenario_id) or self.issued_scenarios.get(scenario_id)
+        if scenario is not None:
+            return scenario
+        
+        return {
+            "id": scenario_id,
+            "title": "Assessment Scenario",
+            "task": "Complete the assigned task",
+            "role": student_data.get("role", ""),
+            "difficulty": student_data.get("skill_level", "beginner")
+        }
+    
+    def _basic_adapted_challenge(self, scenario, student_data):
+        """Unadapted challenge used when no adaptation is available"""
+        return {
+            "scenario_id": scenario.get("id", ""),
+            "adapted_task": scenario.get("task", ""),
+            "complexity_level": student_data.get("skill_level", "beginner"),
+            "instructions": "Complete the task according to the requirements"
+        }
+    
+    def _get_detailed_training_recommendations(self, role, gap_profile, snapshot=None):
         """Get detailed training recommendations from uploaded CSV data"""
-        logger.info(f"Getting training recommendations for role: {role}")
-        logger.info(f"Technical gaps: {technical_gaps}")
-        logger.info(f"Available resources: {len(self.training_resources_storage)}")
+        snapshot = snapshot or self.catalog.snapshot
+        resources = snapshot.training_resources
+        logger.info(f"Getting training recommendations for role: {role} from {len(resources)} resources")
         
+        # One sparse product scores every resource; top-k per category comes from a partial sort
+        ranked = snapshot.relevance.recommend(gap_profile, role, settings.recommendation_top_k)
+        return self._resolve_recommendations(role, resources, ranked)
+    
+    def recommend_for_cohort(self, students):
+        """
+        Recommendations for many students in one pass over the relevance matrix
+        Input: dicts with role and technical_gaps / conceptual_gaps / process_gaps
+        """
+        snapshot = self.catalog.snapshot
+        cohort = [
+            (student.get("role", ""), gap_vocabulary.profile_from_analysis(student))
+            for student in students
+        ]
+        # Gaps outside the vocabulary are matched as text for this request only
+        free_text = [
+            [gap for gaps in gap_vocabulary.free_text(student).values() for gap in gaps]
+            for student in students
+        ]
+        ranked = snapshot.relevance.recommend_cohort(cohort, settings.recommendation_top_k, free_text)
+        logger.info(f"Recommended training for a cohort of {len(cohort)} students")
+        return [
+            self._resolve_recommendations(role, snapshot.training_resources, positions)
+            for (role, _), positions in zip(cohort, ranked)
+        ]
+    
+    def _resolve_recommendations(self, role, resources, ranked):
+        """Resource rows for ranked positions, or the role defaults when nothing matched"""
         recommendations = {
-            "immediate": [],
-            "foundational": [],
-            "practical": [],
-            "advanced": []
+            category: [dict(resources[position]) for position in positions]
+            for category, positions in ranked.items()
         }
         
-        # Search uploaded training resources
-        role_resources = []
-        gap_keywords = technical_gaps + conceptual_gaps + process_gaps
-        
-        logger.info(f"Searching for resources matching role '{role}' or gaps: {gap_keywords}")
-        
-        for resource in self.training_resources_storage:
-            resource_skills = str(resource.get("skills", "")).lower()
-            resource_title = str(resource.get("title", "")).lower()
-            resource_description = str(resource.get("description", "")).lower()
-            
-            # Check if resource matches role or gaps
-            role_match = role.lower() in resource_skills or role.lower() in resource_title
-            gap_match = any(gap.lower() in resource_skills or gap.lower() in resource_title or gap.lower() in resource_description 
-                           for gap in gap_keywords)
-            
-            if role_match or gap_match:
-                role_resources.append(resource)
-                logger.info(f"Found matching resource: {resource.get('title', 'Unknown')}")
-        
-        logger.info(f"Found {len(role_resources)} matching resources")
-        
-        # Categorize resources
-        for resource in role_resources:
-            resource_type = str(resource.get("type", "course")).lower()
-            title = str(resource.get("title", "")).lower()
-            
-            if any(urgent_word in title for urgent_word in ["fundamental", "basic", "introduction", "beginner"]):
-                recommendations["foundational"].append(resource)
-            elif resource_type in ["project", "exercise", "practice"]:
-                recommendations["practical"].append(resource)
-            elif any(advanced_word in title for advanced_word in ["advanced", "expert", "master", "optimization"]):
-                recommendations["advanced"].append(resource)
-            else:
-                recommendations["immediate"].append(resource)
-        
         # If no uploaded resources found, use defaults
         if not any(recommendations.values()):
             logger.warning("No matching resources found, using default recommendations")
-            recommendations = self._get_default_recommendations(role)
-        else:
-            logger.info(f"Using {sum(len(resources) for resources in recommendations.values())} resources from CSV")
-        
+            return self._get_default_recommendations(role)
+        logger.info(f"Using {sum(len(resources) for resources in recommendations.values())} resources from CSV")
         return recommendations
     
+    def _plan_learning_path(self, gap_profile, snapshot):
+        """Catalog resources covering the student's gaps at the fewest estimated hours"""
+        plan = learning_path_planner.plan_catalog(snapshot.relevance, gap_profile)
+        resources = snapshot.training_resources
+        return {"resources": [dict(resources[position]) for position in plan.pop("positions")], **plan}
+    
     def _get_default_recommendations(self, role):
         """Fallback recommendations when no CSV data is available"""
-        if role == "frontend":
+        family = role_taxonomy.family(role)
+        if family == "frontend":
             return {
                 "foundational": [
                     {"title": "React Fundamentals", "type": "course", "description": "Learn React basics", "url": "#", "skills": "React JavaScript"},
@@ -414,7 +738,7 @@ class SimulatorCrew:
                     {"title": "React Portfolio Project", "type": "project", "description": "Build portfolio", "url": "#", "skills": "React project"}
                 ]
             }
-        elif role == "backend":
+        elif family == "backend":
             return {
                 "foundational": [
                     {"title": "SQL Database Design", "type": "course", "description": "Database fundamentals", "url": "#", "skills": "SQL database"},
@@ -422,7 +746,7 @@ class SimulatorCrew:
                     {"title": "API Development", "type": "tutorial", "description": "REST API design", "url": "#", "skills": "API REST"}
                 ]
             }
-        elif role == "data_analyst":
+        elif family == "data_analyst":
             return {
                 "foundational": [
                     {"title": "Python for Data Analysis", "type": "course", "description": "Data analysis with Python", "url": "#", "skills": "Python data analysis"},
@@ -438,13 +762,22 @@ class SimulatorCrew:
                 ]
             }
     
-    def _create_detailed_learning_path(self, recommendations, urgency):
+    def _create_detailed_learning_path(self, recommendations, urgency, plan=None):
         """Create a structured learning path with detailed phases"""
         learning_path = []
+        planned = bool(plan and plan["resources"])
+        if planned:
+            # The coverage plan already chose the fewest resources needed; phase them without cutting
+            recommendations = {category: [] for category in RECOMMENDATION_CATEGORIES}
+            for resource in plan["resources"]:
+                recommendations[recommendation_category(resource)].append(resource)
+        
+        def take(resources, count):
+            return resources if planned else resources[:count]
         
         # Phase 1: Immediate/Critical skills
         if recommendations.get("immediate") or recommendations.get("foundational"):
-            phase1_resources = (recommendations.get("immediate", []) + recommendations.get("foundational", []))[:3]
+            phase1_resources = take(recommendations.get("immediate", []) + recommendations.get("foundational", []), 3)
             if phase1_resources:
                 learning_path.append({
                     "phase": 1,
@@ -461,7 +794,7 @@ class SimulatorCrew:
                 "phase": 2,
                 "title": "Practical Application",
                 "duration": "3-4 weeks",
-                "resources": recommendations["practical"][:2],
+                "resources": take(recommendations["practical"], 2),
                 "goal": "Apply knowledge through hands-on practice",
                 "description": "Build real projects to reinforce learning"
             })
@@ -472,7 +805,7 @@ class SimulatorCrew:
                 "phase": 3,
                 "title": "Advanced Development",
                 "duration": "2-3 weeks",
-                "resources": recommendations["advanced"][:2],
+                "resources": take(recommendations["advanced"], 2),
                 "goal": "Develop advanced skills and expertise",
                 "description": "Master advanced concepts and techniques"
             })
@@ -106,4 +106,26 @@ def create_training_recommendation_task(gap_analysis: Dict[str, Any], student_ro
         """,
         expected_output="Personalized training recommendations with learning path",
         agent=None
-    )
\ No newline at end of file
+    )
+
+# Dependency graph of the agent pipeline. Stages with no path between them
+# (response collection and challenge adaptation) run concurrently.
+STAGE_DEPENDENCIES = {
+    "response_collection": [],
+    "challenge_adaptation": [],
+    "evaluation": ["response_collection", "challenge_adaptation"],
+    "gap_diagnosis": ["evaluation"],
+    "training_recommendation": ["gap_diagnosis"]
+}
+
+# Speculative variant: gaps and recommendations are computed from heuristic
+# scores while the LLM evaluation runs, then reconciled with its final scores.
+SPECULATIVE_STAGE_DEPENDENCIES = {
+    "response_collection": [],
+    "challenge_adaptation": [],
+    "heuristic_evaluation": ["response_collection"],
+    "evaluation": ["response_collection", "challenge_adaptation"],
+    "gap_diagnosis": ["heuristic_evaluation"],
+    "training_recommendation": ["gap_diagnosis"],
+    "reconciliation": ["evaluation", "gap_diagnosis", "training_recommendation"]
+}
\ No newline at end of file
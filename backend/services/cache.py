@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from config.settings import settings
+from typing import Any, Dict, Hashable, List, Optional
+import hashlib
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_INLINE_WHITESPACE = re.compile(r"[ \t\f\v]+")
+
+
+def normalize_content(content: str) -> str:
+    """Collapse whitespace so labels and ids that only reflow text compare equal"""
+    return _WHITESPACE.sub(" ", content or "").strip()
+
+
+def normalize_submission(content: str) -> str:
+    """
+    Collapse spacing inside lines and drop blank lines, but keep line breaks and indentation:
+    in code they carry meaning, so two programs differing only there must not share a result
+    """
+    lines = []
+    for line in (content or "").splitlines():
+        body = line.lstrip()
+        if body:
+            lines.append(line[:len(line) - len(body)] + _INLINE_WHITESPACE.sub(" ", body).rstrip())
+    return "\n".join(lines)
+
+
+def rubric_version(*parts: Any) -> str:
+    """Fingerprint of everything that decides a grade; changes whenever the rubric does"""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(content: str, files: Optional[List[Dict[str, Any]]] = None, exact: bool = False) -> str:
+    """
+    Stable hash of a submission's normalized text and uploaded files
+    Pass exact=True when the cached value depends on running the code, so only identical text matches
+    """
+    normalize = (lambda text: text or "") if exact else normalize_submission
+    digest = hashlib.sha256(normalize(content).encode("utf-8"))
+    for f in sorted(files or [], key=lambda f: f.get("filename", "")):
+        digest.update(b"\x00" + f.get("filename", "").encode("utf-8") + b"\x00")
+        digest.update(normalize(f.get("content", "")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time-to-live"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._stats["misses"] += 1
+                self._stats["evictions"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def invalidate(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_size": self.max_size}
+
+
+class EvaluationCache:
+    """Completed simulation outputs keyed by scenario, evaluation settings and normalized submission"""
+
+    def __init__(self, rubric_version: str):
+        self.rubric_version = rubric_version
+        self.catalog_version = 0
+        self.cache = TTLCache(settings.evaluation_cache_size, settings.evaluation_cache_ttl_seconds)
+
+    def key(self, scenario_id: str, student_data: Dict[str, Any], content: str,
+            files: List[Dict[str, Any]], evaluation_mode: str, exact: bool = False) -> tuple:
+        """Pass exact=True when the result includes executed test outcomes"""
+        # Recommendations depend on role and level, so they are part of the key
+        return (
+            self.rubric_version,
+            self.catalog_version,
+            scenario_id,
+            student_data.get("role", ""),
+            student_data.get("skill_level", ""),
+            evaluation_mode,
+            content_hash(content, files, exact)
+        )
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        return self.cache.get(key)
+
+    def set(self, key: tuple, results: Dict[str, Any]):
+        self.cache.set(key, results)
+
+    def invalidate_catalog(self):
+        """Scenario or training resource catalog changed: every cached recommendation is stale"""
+        self.catalog_version += 1
+        self.cache.invalidate()
+        logger.info(f"Evaluation cache invalidated, catalog version {self.catalog_version}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.cache.stats(), "rubric_version": self.rubric_version, "catalog_version": self.catalog_version}
@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+from services.columnar import ColumnarTable, TableSchema
+from services.csv_processor import resource_key, scenario_id, scenario_key
+from services.relevance_matrix import RelevanceMatrix
+from services.role_taxonomy import RoleIndex, role_taxonomy
+from services.scenario_enrichment import DERIVED_FIELDS, enrich_scenario
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality fields are interned as codes, free text goes to string buffers
+SCENARIO_SCHEMA = TableSchema(
+    categorical=("role", "difficulty", "role_family"),
+    strings=("id", "title", "task", "context", "tests"),
+    # Derived once at ingest so request-time selection is a pure filter
+    lists=("requirements", "deliverables", "criteria"),
+    flags=("outdated",)
+)
+RESOURCE_SCHEMA = TableSchema(categorical=("type",), strings=("title", "description", "url", "skills"))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of the scenario and training resource catalogs at one version"""
+    version: int = 0
+    scenarios: ColumnarTable = field(default_factory=lambda: ColumnarTable(SCENARIO_SCHEMA))
+    training_resources: ColumnarTable = field(default_factory=lambda: ColumnarTable(RESOURCE_SCHEMA))
+    # id -> row position, for O(1) lookup
+    scenario_index: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+    # Row positions by role family bit and difficulty
+    role_index: RoleIndex = field(default_factory=lambda: RoleIndex(role_taxonomy))
+    # Natural key -> row position, so re-uploads update rows instead of duplicating them
+    scenario_positions: Mapping[tuple, int] = field(default_factory=lambda: MappingProxyType({}))
+    resource_positions: Mapping[tuple, int] = field(default_factory=lambda: MappingProxyType({}))
+    # Resource x gap / role relevance, rebuilt only when the resources change
+    relevance: RelevanceMatrix = field(default_factory=lambda: RelevanceMatrix(ColumnarTable(RESOURCE_SCHEMA)))
+
+    def find_scenario(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        position = self.scenario_index.get(scenario_id)
+        return dict(self.scenarios[position]) if position is not None else None
+
+    def candidates(self, role: str, difficulty: Optional[str] = None,
+                   include_outdated: bool = False) -> List[Dict[str, Any]]:
+        """Scenarios a student of `role` can take, optionally of one difficulty, in catalog order"""
+        selected = []
+        for position in self.role_index.candidates(role, difficulty):
+            row = self.scenarios[position]
+            if include_outdated or not row["outdated"]:
+                selected.append(dict(row))
+        return selected
+
+    def memory_usage(self) -> Dict[str, Any]:
+        return {
+            "scenarios": self.scenarios.memory_usage(),
+            "training_resources": self.training_resources.memory_usage()
+        }
+
+
+class Catalog:
+    """
+    Copy-on-write catalog: readers take the current snapshot without locking,
+    uploads build the next version off to the side and publish it with one reference swap
+    """
+
+    def __init__(self):
+        self._snapshot = CatalogSnapshot()
+        # Serializes writers only; readers never take it
+        self._write_lock = threading.Lock()
+        # Digests of files already applied, per catalog; cleared whenever that catalog changes
+        self._ingested_files: Dict[str, set] = {"scenarios": set(), "training_resources": set()}
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    def upsert_scenarios(self, scenarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Publish a new version with the scenarios upserted by role+title; returns the delta"""
+        for scenario in scenarios:
+            scenario.setdefault("id", scenario_id(scenario))
+            if not all(field in scenario for field in DERIVED_FIELDS):
+                enrich_scenario(scenario)
+
+        with self._write_lock:
+            current = self._snapshot
+            table, positions, delta, changes = self._upsert(
+                current.scenarios, current.scenario_positions, scenarios, scenario_key, SCENARIO_SCHEMA
+            )
+            if not changes:
+                return delta
+
+            # Only the changed rows touch the id and role indexes
+            replaced = {position: current.scenarios[position] for position in changes if position < len(current.scenarios)}
+            index = dict(current.scenario_index)
+            for position, row in replaced.items():
+                if index.get(row["id"]) == position:
+                    del index[row["id"]]
+            for position, row in changes.items():
+                index.setdefault(row["id"], position)
+
+            # Training resources are untouched and shared with the previous version
+            self._publish("scenarios", CatalogSnapshot(
+                version=current.version + 1,
+                scenarios=table,
+                training_resources=current.training_resources,
+                scenario_index=MappingProxyType(index),
+                role_index=current.role_index.updated(changes, replaced),
+                scenario_positions=positions,
+                resource_positions=current.resource_positions,
+                relevance=current.relevance
+            ))
+            return delta
+
+    def upsert_training_resources(self, resources: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Publish a new version with the resources upserted by url (or content hash); returns the delta"""
+        with self._write_lock:
+            current = self._snapshot
+            table, positions, delta, changes = self._upsert(
+                current.training_resources, current.resource_positions, resources, resource_key, RESOURCE_SCHEMA
+            )
+            if not changes:
+                return delta
+
+            # Scenarios and their index are untouched and shared with the previous version
+            self._publish("training_resources", CatalogSnapshot(
+                version=current.version + 1,
+                scenarios=current.scenarios,
+                training_resources=table,
+                scenario_index=current.scenario_index,
+                role_index=current.role_index,
+                scenario_positions=current.scenario_positions,
+                resource_positions=positions,
+                relevance=RelevanceMatrix(table)
+            ))
+            return delta
+
+    def is_file_ingested(self, catalog: str, digest: str) -> bool:
+        """True when an identical file was uploaded to `catalog` and nothing has changed it since"""
+        return digest in self._ingested_files[catalog]
+
+    def mark_file_ingested(self, catalog: str, digest: str):
+        with self._write_lock:
+            self._ingested_files[catalog].add(digest)
+
+    def _publish(self, catalog: str, snapshot: CatalogSnapshot):
+        # A file skipped as "already uploaded" must still apply once another upload changed its rows
+        self._ingested_files[catalog] = set()
+        # A single attribute assignment is atomic; in-flight readers keep the version they took
+        self._snapshot = snapshot
+        logger.info(
+            f"Catalog version {snapshot.version} published: {len(snapshot.scenarios)} scenarios, "
+            f"{len(snapshot.training_resources)} training resources"
+        )
+
+    def _upsert(self, current_rows: ColumnarTable, current_positions: Mapping[tuple, int],
+                items: List[Dict[str, Any]], key_func: Callable[[Dict[str, Any]], tuple], schema: TableSchema):
+        """
+        Insert new items, replace changed ones and skip exact duplicates into a new table version
+        that shares the untouched chunks of the current one
+        Output: table, natural key positions, delta, changed rows by position
+        """
+        positions = dict(current_positions)
+        delta = {"added": [], "updated": [], "unchanged": 0}
+        changes: Dict[int, Dict[str, Any]] = {}
+        added_in_batch = {}
+        base = len(current_rows)
+        for item in items:
+            # Compare in the form the table will return, so unchanged rows really compare equal
+            item = schema.normalize(item)
+            key = key_func(item)
+            position = positions.get(key)
+            if position is None:
+                positions[key] = base + len(added_in_batch)
+                added_in_batch[key] = len(delta["added"])
+                changes[positions[key]] = item
+                delta["added"].append(item)
+            elif changes.get(position, current_rows[position] if position < base else None) == item:
+                delta["unchanged"] += 1
+            elif key in added_in_batch:
+                # Same key twice in one file: the later row wins and is still a plain addition
+                changes[position] = item
+                delta["added"][added_in_batch[key]] = item
+            else:
+                changes[position] = item
+                delta["updated"].append(item)
+
+        if not changes:
+            return current_rows, current_positions, delta, changes
+        replaced = {position: row for position, row in changes.items() if position < base}
+        appended = [changes[position] for position in range(base, base + len(added_in_batch))]
+        return current_rows.upsert(replaced, appended), MappingProxyType(positions), delta, changes
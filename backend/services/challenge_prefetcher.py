@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import settings
+from services.cache import TTLCache
+from services.single_flight import SingleFlight
+from typing import Any, Callable, Dict, List
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ChallengePrefetcher:
+    """Adapts freshly generated scenarios in the background so selecting a challenge is a cache hit"""
+
+    def __init__(self, adapter: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]],
+                 fallback: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]):
+        self.adapter = adapter
+        # The unadapted challenge, served whenever adaptation is shed or fails
+        self.fallback = fallback
+        self.enabled = settings.challenge_prefetch_enabled
+        # Unused adaptations simply expire
+        self.cache = TTLCache(settings.challenge_prefetch_cache_size, settings.challenge_prefetch_ttl_seconds)
+        self.single_flight = SingleFlight()
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.challenge_prefetch_workers,
+            thread_name_prefix="challenge-prefetch"
+        )
+        self._stats = {"prefetched": 0, "served_from_cache": 0, "computed_on_demand": 0}
+        self._lock = threading.Lock()
+
+    def key(self, scenario_id: str, student_profile: Dict[str, Any]) -> tuple:
+        # Role decides the format type, so it is part of the key alongside the level
+        return scenario_id, student_profile.get("skill_level", "beginner"), student_profile.get("role", "")
+
+    def prefetch(self, scenarios: List[Dict[str, Any]], student_profile: Dict[str, Any]):
+        """Queue adaptation of every returned scenario; returns immediately"""
+        if not self.enabled:
+            return
+        for scenario in scenarios:
+            if scenario.get("id") and self.cache.get(self.key(scenario["id"], student_profile)) is None:
+                self.executor.submit(self._adapt, scenario, student_profile, True)
+
+    def get(self, scenario: Dict[str, Any], student_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Adapted challenge from cache, joining an in-flight prefetch or computing it now"""
+        cached = self.cache.get(self.key(scenario.get("id", ""), student_profile))
+        if cached is not None:
+            self._count("served_from_cache")
+            return cached
+        return self._adapt(scenario, student_profile, False)
+
+    def get_cached(self, scenario_id: str, student_profile: Dict[str, Any]) -> Dict[str, Any]:
+        cached = self.cache.get(self.key(scenario_id, student_profile))
+        if cached is not None:
+            self._count("served_from_cache")
+        return cached
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {**stats, "cache": self.cache.stats(), "in_flight": self.single_flight.stats()["in_flight"]}
+
+    def _adapt(self, scenario: Dict[str, Any], student_profile: Dict[str, Any], background: bool) -> Dict[str, Any]:
+        key = self.key(scenario.get("id", ""), student_profile)
+
+        def compute():
+            adapted = self.adapter(scenario, student_profile)
+            # Only real LLM adaptations are worth keeping; fallbacks are served but recomputed next time
+            if adapted.get("adapted"):
+                self.cache.set(key, adapted)
+            self._count("prefetched" if background else "computed_on_demand")
+            return adapted
+
+        try:
+            return self.single_flight.do(key, compute)
+        except Exception as e:
+            logger.error(f"Challenge adaptation for scenario {key[0]} failed: {e}")
+            return self.fallback(scenario, student_profile)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,195 @@
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config.settings import settings
+from services.cache import TTLCache
+from services.code_metrics import serve
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWorker:
+    """One spawned analysis process and the parent's end of its pipe"""
+
+    def __init__(self):
+        # Spawned workers import only the stdlib parsing module, not the whole app
+        context = multiprocessing.get_context("spawn")
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def run(self, content: str, max_ast_chars: int, timeout: float) -> Dict[str, Any]:
+        """Metrics for one job; TimeoutError if it overruns, EOFError or OSError if the process died"""
+        self.connection.send((content, max_ast_chars))
+        if not self.connection.poll(timeout):
+            raise FutureTimeoutError()
+        ok, value = self.connection.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def stop(self):
+        self.connection.close()
+        self.process.terminate()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class CodeAnalysisEngine:
+    """
+    Runs code structure analysis on a bounded set of worker processes
+    Results are cached by content hash and concurrent requests for the same content share one job.
+    A job that overruns its timeout, or whose process dies, costs only its own worker:
+    that process is stopped and the next job starts a fresh one.
+    """
+
+    def __init__(self):
+        self.max_workers = settings.code_analysis_workers
+        self.timeout = settings.code_analysis_timeout_seconds
+        self.max_ast_chars = settings.code_analysis_max_ast_chars
+        self._cache = TTLCache(settings.code_analysis_cache_size, settings.code_analysis_cache_ttl_seconds)
+        # Each dispatch thread holds at most one worker, so there are never more than max_workers processes
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._idle: List[AnalysisWorker] = []
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"parsed": 0, "timeouts": 0, "failures": 0, "worker_restarts": 0}
+
+    def key(self, content: str) -> str:
+        return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+    def cached(self, content: str) -> Optional[Dict[str, Any]]:
+        """Metrics already computed for `content`, without starting a job"""
+        return self._usable(self._cache.get(self.key(content)))
+
+    def analyze(self, content: str) -> Optional[Dict[str, Any]]:
+        """Metrics for `content`, waiting up to the timeout; None if they could not be computed in time"""
+        key = self.key(content)
+        metrics = self._cache.get(key)
+        if metrics is not None:
+            return self._usable(metrics)
+
+        future = self._submit(key, content)
+        try:
+            return self._usable(future.result(timeout=self.timeout))
+        except FutureTimeoutError:
+            # Still queued or running; the job enforces its own deadline and caches its outcome
+            logger.warning(f"Code analysis not ready after {self.timeout}s")
+        except Exception as e:
+            self._on_failure(e)
+        return None
+
+    async def analyze_async(self, content: str) -> Optional[Dict[str, Any]]:
+        """Like analyze, but awaits the worker so the event loop stays free"""
+        key = self.key(content)
+        metrics = self._cache.get(key)
+        if metrics is not None:
+            return self._usable(metrics)
+
+        future = self._submit(key, content)
+        try:
+            return self._usable(await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout))
+        except asyncio.TimeoutError:
+            logger.warning(f"Code analysis not ready after {self.timeout}s")
+        except Exception as e:
+            self._on_failure(e)
+        return None
+
+    async def warm(self, contents: Iterable[str]):
+        """Analyze several texts concurrently so later synchronous readers hit the cache"""
+        await asyncio.gather(*(self.analyze_async(content) for content in contents if content and content.strip()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "inflight": len(self._inflight), "workers": self.max_workers, "cache": self._cache.stats()}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            idle, self._idle = self._idle, []
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for worker in idle:
+            worker.stop()
+
+    def _submit(self, key: str, content: str) -> Future:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="code-analysis")
+                future = self._executor.submit(self._run, content)
+                self._inflight[key] = future
+                future.add_done_callback(lambda done: self._complete(key, done))
+        return future
+
+    def _complete(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if future.cancelled() or future.exception() is not None:
+                return
+            if "error" not in future.result():
+                self._stats["parsed"] += 1
+        self._cache.set(key, future.result())
+
+    def _run(self, content: str) -> Dict[str, Any]:
+        """Runs on a dispatch thread: one job on an idle worker, replacing the worker if the job kills it"""
+        worker = self._checkout()
+        try:
+            metrics = worker.run(content, self.max_ast_chars, self.timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Code analysis timed out after {self.timeout}s; restarting its worker")
+            self._retire(worker, "timeouts")
+            # Remember the failure so the same pathological input does not tie up a worker again
+            metrics = {"error": f"timed out after {self.timeout}s"}
+        except (EOFError, OSError) as e:
+            logger.warning(f"Code analysis worker died: {e!r}; restarting it")
+            self._retire(worker, "failures")
+            raise
+        except BaseException:
+            self._checkin(worker)
+            raise
+        else:
+            self._checkin(worker)
+        return metrics
+
+    def _checkout(self) -> AnalysisWorker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                self._stats["worker_restarts"] += 1
+        return AnalysisWorker()
+
+    def _checkin(self, worker: AnalysisWorker):
+        with self._lock:
+            if self._executor is not None:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def _retire(self, worker: AnalysisWorker, reason: str):
+        worker.stop()
+        with self._lock:
+            self._stats[reason] += 1
+            self._stats["worker_restarts"] += 1
+
+    def _on_failure(self, error: Exception):
+        logger.error(f"Code analysis failed: {error}")
+        with self._lock:
+            self._stats["failures"] += 1
+
+    def _usable(self, metrics: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return None if metrics is None or "error" in metrics else metrics
+
+
+code_analysis_engine = CodeAnalysisEngine()
@@ -0,0 +1,214 @@
+"""
+Structure metrics of code submissions
+Python is parsed with ast and tokenize; JavaScript and SQL go through a small lexical tokenizer.
+Kept free of application imports so it loads quickly in code analysis worker processes.
+"""
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+import ast
+import io
+import re
+import tokenize
+
+# Counted anywhere in the text, so SQL embedded in host-language strings is included
+SQL_CONSTRAINT_PATTERNS = {
+    "primary_key": re.compile(r"\bprimary\s+key\b", re.I),
+    "foreign_key": re.compile(r"\bforeign\s+key\b|\breferences\b", re.I),
+    "unique": re.compile(r"\bunique\b", re.I),
+    "not_null": re.compile(r"\bnot\s+null\b", re.I),
+    "check": re.compile(r"\bcheck\s*\(", re.I),
+    "default": re.compile(r"\bdefault\b", re.I),
+    "index": re.compile(r"\bindex\b", re.I)
+}
+
+SQL_STATEMENT = re.compile(r"(?:^|;)\s*(create|select|insert|update|delete|alter|drop|with)\b", re.I | re.M)
+JS_SIGNALS = re.compile(r"\bfunction\b|=>|\b(?:const|let|var)\s+\w|\brequire\s*\(|\bexport\b")
+
+_STRING = r"(?P<string>\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)"
+_CODE = r"(?P<word>[A-Za-z_$][\w$]*)|(?P<op>=>|&&|\|\||\?\?|\?\.|[{}()\[\];?])|(?P<other>\S)"
+# Unclosed block comments run to the end of the text, which keeps scanning linear
+JS_TOKEN = re.compile(r"(?P<comment>//[^\n]*|/\*(?:.*?\*/|.*))|" + _STRING + "|" + _CODE, re.S)
+SQL_TOKEN = re.compile(r"(?P<comment>--[^\n]*|#[^\n]*|/\*(?:.*?\*/|.*))|" + _STRING + "|" + _CODE, re.S)
+
+JS_BRANCH_WORDS = {"if", "for", "while", "case", "catch"}
+JS_BRANCH_OPS = {"&&", "||", "??", "?"}
+SQL_BRANCH_WORDS = {"when", "and", "or", "join"}
+
+
+def analyze_code(content: str, max_ast_chars: int) -> Dict[str, Any]:
+    """Metrics for one submission; Python is tried first, anything it cannot parse is tokenized"""
+    metrics = _python_metrics(content) if len(content) <= max_ast_chars else None
+    if metrics is None:
+        metrics = _lexical_metrics(content)
+    metrics["sql_constraints"] = sql_constraints(content)
+    return metrics
+
+
+def sql_constraints(content: str) -> Dict[str, int]:
+    counts = {name: len(pattern.findall(content)) for name, pattern in SQL_CONSTRAINT_PATTERNS.items()}
+    return {name: count for name, count in counts.items() if count}
+
+
+def serve(connection) -> None:
+    """Worker process loop: answer (content, max_ast_chars) jobs over `connection` until it closes"""
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        try:
+            connection.send((True, analyze_code(*job)))
+        except Exception as error:
+            connection.send((False, f"{type(error).__name__}: {error}"))
+
+
+def _python_metrics(content: str) -> Optional[Dict[str, Any]]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+    if not any(not isinstance(node, ast.Expr) or isinstance(node.value, ast.Call) for node in tree.body):
+        # Bare names and literals parse as Python but are really prose
+        return None
+
+    functions = [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    classes = [node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.add((node.module or "").split(".")[0] or ".")
+
+    comment_lines, code_lines = _python_lines(content)
+    documented = [node for node in [tree, *functions, *classes] if ast.get_docstring(node)]
+    return {
+        "language": "python",
+        "parser": "ast",
+        "functions": len(functions),
+        "classes": len(classes),
+        "imports": sorted(imports),
+        "complexity": 1 + _branches(tree),
+        "max_function_complexity": max((1 + _branches(node) for node in functions), default=0),
+        "max_nesting": _nesting(tree),
+        "comment_lines": comment_lines,
+        "code_lines": code_lines,
+        "docstrings": len(documented)
+    }
+
+
+def _branches(tree: ast.AST) -> int:
+    """Decision points under a node (cyclomatic complexity minus one)"""
+    count = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler)):
+            count += 1
+        elif isinstance(node, ast.BoolOp):
+            count += len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            count += 1 + len(node.ifs)
+        elif type(node).__name__ == "match_case":
+            count += 1
+    return count
+
+
+def _nesting(tree: ast.AST) -> int:
+    """Deepest nesting of control-flow blocks"""
+    blocks = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try)
+    deepest, stack = 0, [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, blocks):
+            depth += 1
+            deepest = max(deepest, depth)
+        stack.extend((child, depth) for child in ast.iter_child_nodes(node))
+    return deepest
+
+
+def _python_lines(content: str) -> Tuple[int, int]:
+    comment_lines, code_lines = set(), set()
+    ignored = (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER)
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(content).readline):
+            if token.type == tokenize.COMMENT:
+                comment_lines.add(token.start[0])
+            elif token.type not in ignored:
+                code_lines.update(range(token.start[0], token.end[0] + 1))
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    return len(comment_lines), len(code_lines)
+
+
+def _lexical_metrics(content: str) -> Dict[str, Any]:
+    is_sql = bool(SQL_STATEMENT.search(content)) and not JS_SIGNALS.search(content)
+    pattern = SQL_TOKEN if is_sql else JS_TOKEN
+    # Nesting is parenthesis depth in SQL and block depth in JavaScript
+    opener, closer = ("(", ")") if is_sql else ("{", "}")
+    line_starts = [0] + [match.end() for match in re.finditer(r"\n", content)]
+
+    def line_of(offset: int) -> int:
+        return bisect_right(line_starts, offset)
+
+    comment_lines, code_lines = set(), set()
+    words: List[str] = []
+    ops: List[str] = []
+    strings_after: Dict[int, str] = {}
+    depth = deepest = 0
+    for match in pattern.finditer(content):
+        kind = match.lastgroup
+        start_line = line_of(match.start())
+        if kind == "comment":
+            comment_lines.update(range(start_line, line_of(match.end() - 1) + 1))
+            continue
+        code_lines.add(start_line)
+        text = match.group()
+        if kind == "word":
+            words.append(text.lower() if is_sql else text)
+        elif kind == "string":
+            # Remember the string following each word, for import / require sources
+            strings_after[len(words)] = text[1:-1]
+        elif kind == "op":
+            ops.append(text)
+            if text == opener:
+                depth += 1
+                deepest = max(deepest, depth)
+            elif text == closer:
+                depth = max(0, depth - 1)
+
+    if is_sql:
+        return {
+            "language": "sql",
+            "parser": "lexical",
+            "functions": sum(1 for first, second in zip(words, words[1:])
+                             if first == "create" and second in ("function", "procedure", "trigger")),
+            "classes": 0,
+            "imports": [],
+            "complexity": 1 + sum(1 for word in words if word in SQL_BRANCH_WORDS),
+            "max_function_complexity": 0,
+            "max_nesting": deepest,
+            "comment_lines": len(comment_lines),
+            "code_lines": len(code_lines),
+            "docstrings": 0,
+            "tables": sum(1 for first, second in zip(words, words[1:]) if first == "create" and second == "table")
+        }
+
+    imports = set()
+    for index, word in enumerate(words):
+        if word in ("import", "require", "from") and index + 1 in strings_after:
+            imports.add(strings_after[index + 1])
+    return {
+        "language": "javascript",
+        "parser": "lexical",
+        "functions": words.count("function") + ops.count("=>"),
+        "classes": words.count("class"),
+        "imports": sorted(imports),
+        "complexity": 1 + sum(1 for word in words if word in JS_BRANCH_WORDS) + sum(1 for op in ops if op in JS_BRANCH_OPS),
+        "max_function_complexity": 0,
+        "max_nesting": deepest,
+        "comment_lines": len(comment_lines),
+        "code_lines": len(code_lines),
+        "docstrings": 0
+    }
+
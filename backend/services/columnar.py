@@ -0,0 +1,299 @@
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import sys
+
+try:
+    import pyarrow as pa
+except ImportError:  # Optional: only needed for Arrow/Parquet export
+    pa = None
+
+# Signed code widths, smallest first, matching Arrow dictionary index types
+CODE_TYPES = (("b", 0x7F, "int8"), ("h", 0x7FFF, "int16"), ("i", 0x7FFFFFFF, "int32"))
+
+# Separator of list items inside a list column's string buffer
+LIST_SEPARATOR = "\x1f"
+
+# Rows per chunk: an upload rebuilds only the chunks it touches and the partly filled tail
+CHUNK_ROWS = 1024
+
+
+class CategoryVocabulary:
+    """Interned category strings; each distinct value gets a small integer code"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class TableSchema:
+    """
+    Column layout: categorical columns are stored as codes, string and list-of-string
+    columns in one buffer each, flags as one byte per row
+    """
+
+    def __init__(self, categorical: Tuple[str, ...], strings: Tuple[str, ...],
+                 lists: Tuple[str, ...] = (), flags: Tuple[str, ...] = ()):
+        self.categorical = categorical
+        self.strings = strings
+        self.lists = lists
+        self.flags = flags
+        self.fields = categorical + strings + lists + flags
+
+    def normalize(self, row: Mapping) -> Dict[str, Any]:
+        """Row as it will read back from the table: schema fields typed, extra fields untouched"""
+        normalized = {name: "" if row.get(name) is None else str(row.get(name)) for name in self.categorical + self.strings}
+        for name in self.lists:
+            items = row.get(name) or []
+            if isinstance(items, str):
+                items = items.split(",")
+            normalized[name] = [str(item).strip() for item in items if str(item).strip()]
+        for name in self.flags:
+            normalized[name] = bool(row.get(name))
+        normalized.update({key: value for key, value in row.items() if key not in normalized})
+        return normalized
+
+
+class RowView(Mapping):
+    """Read-only dict-like view of one table row, decoded on access"""
+
+    __slots__ = ("_table", "_position")
+
+    def __init__(self, table: "ColumnarTable", position: int):
+        self._table = table
+        self._position = position
+
+    def __getitem__(self, key: str) -> Any:
+        return self._table.value(self._position, key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._table.schema.fields
+        extras = self._table.extras(self._position)
+        if extras:
+            yield from extras
+
+    def __len__(self) -> int:
+        extras = self._table.extras(self._position)
+        return len(self._table.schema.fields) + (len(extras) if extras else 0)
+
+    def __repr__(self) -> str:
+        return f"RowView({dict(self)!r})"
+
+
+class ColumnChunk:
+    """
+    Up to CHUNK_ROWS consecutive rows in column layout, never modified once built
+    Categorical columns hold array codes into the table's vocabulary; string columns are one
+    UTF-8 buffer plus an offsets array, so a row costs a few bytes of overhead instead of a dict
+    """
+
+    def __init__(self, schema: TableSchema, vocabulary: CategoryVocabulary, rows: Iterable[Mapping]):
+        codes: Dict[str, List[int]] = {name: [] for name in schema.categorical}
+        buffered = schema.strings + schema.lists
+        chunks: Dict[str, List[bytes]] = {name: [] for name in buffered}
+        # 64-bit offsets, the same layout as an Arrow large_string column
+        offsets: Dict[str, array] = {name: array("q", [0]) for name in buffered}
+        self.flags: Dict[str, array] = {name: array("b") for name in schema.flags}
+        # Fields outside the schema are rare, so rows without any keep None
+        self.extras: List[Optional[Dict[str, Any]]] = []
+
+        for row in rows:
+            normalized = schema.normalize(row)
+            for name in schema.categorical:
+                codes[name].append(vocabulary.code(normalized[name]))
+            for name in buffered:
+                text = LIST_SEPARATOR.join(normalized[name]) if name in schema.lists else normalized[name]
+                encoded = text.encode("utf-8")
+                chunks[name].append(encoded)
+                offsets[name].append(offsets[name][-1] + len(encoded))
+            for name in schema.flags:
+                self.flags[name].append(1 if normalized[name] else 0)
+            extras = {key: value for key, value in normalized.items() if key not in schema.fields}
+            self.extras.append(extras or None)
+
+        # The vocabulary only grows, so codes are sized for its length when the chunk is built
+        self.code_type = code_type_for(len(vocabulary))
+        self.codes = {name: array(self.code_type[0], values) for name, values in codes.items()}
+        self.buffers = {name: b"".join(parts) for name, parts in chunks.items()}
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.extras)
+
+    def memory_usage(self) -> Dict[str, int]:
+        codes = sum(sys.getsizeof(column) for column in self.codes.values())
+        codes += sum(sys.getsizeof(column) for column in self.flags.values())
+        strings = sum(sys.getsizeof(buffer) for buffer in self.buffers.values())
+        strings += sum(sys.getsizeof(offsets) for offsets in self.offsets.values())
+        extras = sys.getsizeof(self.extras) + sum(sys.getsizeof(extra) for extra in self.extras if extra)
+        return {"codes_bytes": codes, "strings_bytes": strings, "extras_bytes": extras}
+
+
+def code_type_for(size: int) -> Tuple[str, int, str]:
+    """Narrowest code width that can index a vocabulary of `size` values"""
+    return next(code_type for code_type in CODE_TYPES if size <= code_type[1])
+
+
+class ColumnarTable:
+    """
+    Immutable column-oriented table of string rows, stored as a tuple of ColumnChunks
+    Every chunk but the last holds exactly CHUNK_ROWS rows. A new version made with upsert
+    shares every chunk it does not touch, and the append-only category vocabulary, with this one.
+    """
+
+    def __init__(self, schema: TableSchema, rows: Iterable[Mapping] = (),
+                 vocabulary: Optional[CategoryVocabulary] = None, chunks: Optional[Iterable[ColumnChunk]] = None):
+        self.schema = schema
+        self.vocabulary = vocabulary if vocabulary is not None else CategoryVocabulary()
+        if chunks is None:
+            rows = list(rows)
+            chunks = [
+                ColumnChunk(schema, self.vocabulary, rows[start:start + CHUNK_ROWS])
+                for start in range(0, len(rows), CHUNK_ROWS)
+            ]
+        self.chunks: Tuple[ColumnChunk, ...] = tuple(chunks)
+        self._length = sum(len(chunk) for chunk in self.chunks)
+
+    def upsert(self, replaced: Mapping[int, Mapping], appended: List[Mapping]) -> "ColumnarTable":
+        """
+        A new version with the rows at `replaced` positions swapped and `appended` added at the end
+        Only the chunks holding replaced rows and the partly filled last chunk are rebuilt
+        """
+        chunks = list(self.chunks)
+        touched = {position // CHUNK_ROWS for position in replaced}
+        appended = list(appended)
+        if appended and chunks and len(chunks[-1]) < CHUNK_ROWS:
+            touched.add(len(chunks) - 1)
+
+        for index in sorted(touched):
+            base = index * CHUNK_ROWS
+            rows = [
+                replaced[base + offset] if base + offset in replaced else dict(self[base + offset])
+                for offset in range(len(chunks[index]))
+            ]
+            if index == len(chunks) - 1:
+                room = CHUNK_ROWS - len(rows)
+                rows.extend(appended[:room])
+                appended = appended[room:]
+            chunks[index] = ColumnChunk(self.schema, self.vocabulary, rows)
+
+        for start in range(0, len(appended), CHUNK_ROWS):
+            chunks.append(ColumnChunk(self.schema, self.vocabulary, appended[start:start + CHUNK_ROWS]))
+        return ColumnarTable(self.schema, vocabulary=self.vocabulary, chunks=chunks)
+
+    def value(self, position: int, key: str) -> Any:
+        chunk = self.chunks[position // CHUNK_ROWS]
+        offset = position % CHUNK_ROWS
+        if key in chunk.codes:
+            return self.vocabulary.values[chunk.codes[key][offset]]
+        if key in chunk.buffers:
+            offsets = chunk.offsets[key]
+            text = chunk.buffers[key][offsets[offset]:offsets[offset + 1]].decode("utf-8")
+            if key in self.schema.lists:
+                return text.split(LIST_SEPARATOR) if text else []
+            return text
+        if key in chunk.flags:
+            return bool(chunk.flags[key][offset])
+        extras = chunk.extras[offset]
+        if extras and key in extras:
+            return extras[key]
+        raise KeyError(key)
+
+    def extras(self, position: int) -> Optional[Dict[str, Any]]:
+        """Fields of one row outside the schema, or None"""
+        return self.chunks[position // CHUNK_ROWS].extras[position % CHUNK_ROWS]
+
+    def column(self, key: str) -> List[Any]:
+        """Every value of one column, decoded"""
+        return [self.value(position, key) for position in range(len(self))]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position: int) -> RowView:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return RowView(self, position)
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self, position) for position in range(len(self)))
+
+    def to_arrow(self) -> "pa.Table":
+        """
+        Schema columns as an Arrow table of one record batch per chunk, wrapping the existing
+        string buffers without copying
+        Categorical columns become dictionary arrays; list and flag columns, and codes of chunks
+        built when the vocabulary was narrower, are converted; fields outside the schema are not exported
+        """
+        if pa is None:
+            raise RuntimeError("Arrow export requires pyarrow")
+        values = list(self.vocabulary.values)
+        dictionary = pa.array(values, type=pa.string())
+        code_type = code_type_for(len(values))
+        index_type = getattr(pa, code_type[2])()
+        types = {}
+        for name in self.schema.fields:
+            if name in self.schema.categorical:
+                types[name] = pa.dictionary(index_type, pa.string())
+            elif name in self.schema.flags:
+                types[name] = pa.bool_()
+            elif name in self.schema.lists:
+                types[name] = pa.list_(pa.string())
+            else:
+                types[name] = pa.large_string()
+
+        columns = {name: [] for name in self.schema.fields}
+        for chunk in self.chunks:
+            length = len(chunk)
+            for name in self.schema.fields:
+                if name in self.schema.categorical:
+                    codes = chunk.codes[name]
+                    if chunk.code_type != code_type:
+                        codes = array(code_type[0], codes)
+                    indices = pa.Array.from_buffers(index_type, length, [None, pa.py_buffer(codes)])
+                    columns[name].append(pa.DictionaryArray.from_arrays(indices, dictionary))
+                elif name in self.schema.flags:
+                    columns[name].append(pa.array([bool(flag) for flag in chunk.flags[name]], type=pa.bool_()))
+                elif name in self.schema.lists:
+                    offsets = chunk.offsets[name]
+                    columns[name].append(pa.array([
+                        chunk.buffers[name][offsets[offset]:offsets[offset + 1]].decode("utf-8").split(LIST_SEPARATOR)
+                        if offsets[offset + 1] > offsets[offset] else []
+                        for offset in range(length)
+                    ], type=types[name]))
+                else:
+                    columns[name].append(pa.Array.from_buffers(
+                        pa.large_string(), length,
+                        [None, pa.py_buffer(chunk.offsets[name]), pa.py_buffer(chunk.buffers[name])]
+                    ))
+        return pa.table({name: pa.chunked_array(columns[name], type=types[name]) for name in self.schema.fields})
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by the table, by component"""
+        usage = {"codes_bytes": 0, "strings_bytes": 0, "extras_bytes": 0}
+        for chunk in self.chunks:
+            for component, size in chunk.memory_usage().items():
+                usage[component] += size
+        vocabulary = sum(sys.getsizeof(value) for value in self.vocabulary.values)
+        return {
+            "rows": len(self),
+            "chunks": len(self.chunks),
+            "categories": len(self.vocabulary),
+            **usage,
+            "vocabulary_bytes": vocabulary,
+            "total_bytes": sum(usage.values()) + vocabulary
+        }
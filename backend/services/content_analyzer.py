@@ -0,0 +1,148 @@
+from config.settings import settings
+from services.cache import TTLCache
+from services.code_analysis import code_analysis_engine
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+import hashlib
+
+CODE_KEYWORDS = ['create table', 'select', 'insert', 'update', 'delete', 'function', 'class', 'def ', 'const ', 'let ', 'var ']
+STRUCTURE_KEYWORDS = ['primary key', 'foreign key', 'index', 'constraint', 'return', '{', '}', 'if', 'for']
+BEST_PRACTICE_KEYWORDS = ['not null', 'unique', 'auto_increment', 'timestamp', 'varchar']
+PERFORMANCE_KEYWORDS = ['performance', 'optimization', 'efficient']
+COMMENT_MARKERS = ['--', '//', '#', '/*']
+
+# Response type indicators, checked in this order
+CODE_INDICATORS = ["function", "class", "def ", "const ", "let ", "var ", "import", "return", "{", "}", "//", "/*"]
+DOC_INDICATORS = ["introduction", "analysis", "conclusion", "summary", "recommendation"]
+DESIGN_INDICATORS = ["schema", "diagram", "architecture", "database", "table", "relationship"]
+
+SQL_CONSTRUCTS = {
+    "create_table": "create table",
+    "select": "select",
+    "insert": "insert",
+    "update": "update",
+    "delete": "delete",
+    "join": "join",
+    "primary_key": "primary key",
+    "foreign_key": "foreign key",
+    "index": "index"
+}
+
+# The keyword features the heuristic scorer reads
+KEYWORD_FEATURES = (
+    "length", "words", "has_code", "has_structure", "has_comments", "has_best_practices",
+    "has_index", "has_performance_terms", "has_relationships"
+)
+
+
+class ContentAnalyzer:
+    """
+    Analyzes a submission's text once into a read-only feature record
+    The response collector, heuristic scorer, simulation and gap diagnosis all read the same record
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(settings.content_analysis_cache_size, settings.content_analysis_cache_ttl_seconds)
+
+    def analyze(self, content: str, cache: bool = True) -> Mapping[str, Any]:
+        """
+        Feature record for `content`; pass cache=False for throwaway pieces such as chunks
+        Code responses also get parsed structure metrics from the code analysis cache once it is warmed;
+        a code record still waiting on them is not kept, so a later read picks them up
+        """
+        content = content or ""
+        if not cache:
+            return MappingProxyType(self._analyze(content, code_metrics=False))
+
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        record = self._cache.get(key)
+        if record is None:
+            record = MappingProxyType(self._analyze(content, code_metrics=True))
+            if record["response_type"] != "code" or record["code_metrics"] is not None:
+                self._cache.set(key, record)
+        return record
+
+    def keyword_features(self, content: str, cache: bool = True) -> Dict[str, Any]:
+        """The heuristic scorer's features, as a plain dict callers may merge"""
+        record = self.analyze(content, cache)
+        return {name: record[name] for name in KEYWORD_FEATURES}
+
+    def content_stats(self, record: Mapping[str, Any]) -> Dict[str, Any]:
+        """The content_stats block of a collected response"""
+        stats = {
+            "word_count": record["words"],
+            "character_count": record["length"],
+            "line_count": record["lines"],
+            "response_type": record["response_type"]
+        }
+        if record["response_type"] == "code":
+            stats.update({
+                "function_count": record["function_count"],
+                "comment_lines": record["comment_lines"],
+                "has_imports": record["has_imports"],
+                "sql_constructs": list(record["sql_constructs"])
+            })
+            metrics = record["code_metrics"]
+            if metrics:
+                stats.update({
+                    "language": metrics["language"],
+                    "class_count": metrics["classes"],
+                    "imports": metrics["imports"],
+                    "complexity": metrics["complexity"],
+                    "max_nesting": metrics["max_nesting"],
+                    "sql_constraints": metrics["sql_constraints"]
+                })
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def _analyze(self, content: str, code_metrics: bool) -> Dict[str, Any]:
+        # One lowercase copy, one word split and one line split serve every feature below
+        content_lower = content.lower()
+        lines = content_lower.split("\n")
+
+        record = {
+            "length": len(content),
+            "stripped_length": len(content.strip()),
+            "words": len(content_lower.split()),
+            "lines": len(lines),
+            "response_type": self._response_type(content_lower),
+            "has_code": any(keyword in content_lower for keyword in CODE_KEYWORDS),
+            "has_structure": any(keyword in content_lower for keyword in STRUCTURE_KEYWORDS),
+            "has_comments": any(marker in content_lower for marker in COMMENT_MARKERS),
+            "has_best_practices": any(keyword in content_lower for keyword in BEST_PRACTICE_KEYWORDS),
+            "has_index": "index" in content_lower,
+            "has_performance_terms": any(keyword in content_lower for keyword in PERFORMANCE_KEYWORDS),
+            "has_relationships": "foreign key" in content_lower or "join" in content_lower,
+            "has_imports": "import" in content_lower,
+            "function_count": content_lower.count("function") + content_lower.count("def "),
+            "comment_lines": sum(1 for line in lines if any(marker in line for marker in COMMENT_MARKERS)),
+            "sql_constructs": tuple(name for name, keyword in SQL_CONSTRUCTS.items() if keyword in content_lower),
+            "code_metrics": None
+        }
+
+        if code_metrics and record["response_type"] == "code":
+            # Never wait on a worker here: callers may be on the event loop, which warms the cache instead
+            metrics = code_analysis_engine.cached(content)
+            if metrics:
+                # Parsed structure replaces the substring estimates
+                record.update({
+                    "code_metrics": metrics,
+                    "function_count": metrics["functions"],
+                    "comment_lines": metrics["comment_lines"],
+                    "has_imports": bool(metrics["imports"])
+                })
+        return record
+
+    def _response_type(self, content_lower: str) -> str:
+        if any(indicator in content_lower for indicator in CODE_INDICATORS):
+            return "code"
+        if any(indicator in content_lower for indicator in DOC_INDICATORS):
+            return "document"
+        if any(indicator in content_lower for indicator in DESIGN_INDICATORS):
+            return "design"
+        return "text"
+
+
+content_analyzer = ContentAnalyzer()
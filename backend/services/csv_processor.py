@@ -1,75 +1,141 @@
 import pandas as pd
-from typing import List, Dict, Any
+from services.cache import normalize_content
+from services.scenario_enrichment import enrich_scenario
+from services.validation import (
+    SCENARIO_SPEC, STUDENT_SPEC, TRAINING_RESOURCE_SPEC, empty_report, merge_reports, validate_frame
+)
+from typing import List, Dict, Any, Tuple
+import hashlib
 import logging
 from pathlib import Path
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: Parquet ingestion and export are disabled without it
+    pa = None
+    pq = None
+
 logger = logging.getLogger(__name__)
 
+# Column specs per catalog kind; Parquet files are projected to the spec's columns
+SPECS = {
+    "scenarios": SCENARIO_SPEC,
+    "students": STUDENT_SPEC,
+    "training_resources": TRAINING_RESOURCE_SPEC,
+}
+
+SUPPORTED_SUFFIXES = (".csv", ".parquet")
+PARQUET_BATCH_ROWS = 10000
+
+# Fields that define a scenario; the same content always gets the same id
+SCENARIO_ID_FIELDS = ("role", "title", "task", "difficulty", "context")
+
+
+def scenario_id(scenario: Dict[str, Any]) -> str:
+    """Deterministic scenario id derived from its normalized content"""
+    parts = [normalize_content(str(scenario.get(field, ""))).lower() for field in SCENARIO_ID_FIELDS]
+    return "scn-" + hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def scenario_key(scenario: Dict[str, Any]) -> tuple:
+    """Natural key for upserts: a scenario is identified by its role and title"""
+    return tuple(normalize_content(str(scenario.get(field, ""))).lower() for field in ("role", "title"))
+
+
+def resource_key(resource: Dict[str, Any]) -> tuple:
+    """Natural key for upserts: the url when it is a real link, otherwise a content hash"""
+    url = str(resource.get("url", "")).strip()
+    if url and url != "#":
+        return ("url", url.lower())
+    parts = [normalize_content(str(resource.get(field, ""))).lower() for field in ("title", "type", "description", "skills")]
+    return ("content", hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest())
+
+
+def file_hash(content: bytes) -> str:
+    """Hash of an uploaded file, used to skip re-uploads of an identical file"""
+    return hashlib.sha256(content).hexdigest()
+
+
 class CSVProcessor:
     def __init__(self):
         self.data_path = Path("data")
-        
+        self.parquet_available = pq is not None
+    
     def load_scenarios_from_csv(self, file_path: str) -> List[Dict[str, Any]]:
-        try:
-            df = pd.read_csv(file_path)
-            scenarios = []
-            
-            for _, row in df.iterrows():
-                scenario = {
-                    "role": row.get("role", "").strip(),
-                    "title": row.get("title", "").strip(),
-                    "task": row.get("task", "").strip(),
-                    "difficulty": row.get("difficulty", "beginner").strip(),
-                    "context": row.get("context", "").strip(),
-                }
-                scenarios.append(scenario)
-                
-            logger.info(f"Loaded {len(scenarios)} scenarios from CSV")
-            return scenarios
-        except Exception as e:
-            logger.error(f"Failed to load scenarios from CSV: {e}")
-            return []
+        return self._load_csv("scenarios", file_path)[0]
     
     def load_students_from_csv(self, file_path: str) -> List[Dict[str, Any]]:
+        return self._load_csv("students", file_path)[0]
+    
+    def load_training_resources_from_csv(self, file_path: str) -> List[Dict[str, Any]]:
+        return self._load_csv("training_resources", file_path)[0]
+    
+    def load_scenarios_from_parquet(self, file_path: str) -> List[Dict[str, Any]]:
+        return self._load_parquet("scenarios", file_path)[0]
+    
+    def load_students_from_parquet(self, file_path: str) -> List[Dict[str, Any]]:
+        return self._load_parquet("students", file_path)[0]
+    
+    def load_training_resources_from_parquet(self, file_path: str) -> List[Dict[str, Any]]:
+        return self._load_parquet("training_resources", file_path)[0]
+    
+    def load_file(self, kind: str, file_path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Load scenarios, students or training_resources from a .csv or .parquet file
+        Output: valid records, validation report for the rejected rows
+        """
+        if file_path.endswith(".parquet"):
+            return self._load_parquet(kind, file_path)
+        return self._load_csv(kind, file_path)
+    
+    def export_to_parquet(self, table, file_path: str, row_group_rows: int = PARQUET_BATCH_ROWS):
+        """Write a catalog table to Parquet straight from its column buffers"""
+        if not self.parquet_available:
+            raise RuntimeError("Parquet export requires pyarrow")
+        pq.write_table(table.to_arrow(), file_path, row_group_size=row_group_rows)
+        logger.info(f"Exported {len(table)} rows to Parquet")
+    
+    def _load_csv(self, kind: str, file_path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         try:
-            df = pd.read_csv(file_path)
-            students = []
-            
-            for _, row in df.iterrows():
-                student = {
-                    "id": str(row.get("id", "")),
-                    "name": row.get("name", "").strip(),
-                    "role": row.get("role", "").strip(),
-                    "skill_level": row.get("skill_level", "beginner").strip(),
-                    "email": row.get("email", "").strip()
-                }
-                students.append(student)
-                
-            logger.info(f"Loaded {len(students)} students from CSV")
-            return students
+            # Read everything as text so ids like "007" survive; validation does the typing
+            df = pd.read_csv(file_path, dtype=str)
+            records, report = validate_frame(df, SPECS[kind])
+            records = self._finish_records(kind, records)
+            logger.info(f"Loaded {len(records)} {kind} from CSV, rejected {report['rejected']} rows")
+            return records, report
         except Exception as e:
-            logger.error(f"Failed to load students from CSV: {e}")
-            return []
+            logger.error(f"Failed to load {kind} from CSV: {e}")
+            return [], {**empty_report(), "error": str(e)}
     
-    def load_training_resources_from_csv(self, file_path: str) -> List[Dict[str, Any]]:
+    def _load_parquet(self, kind: str, file_path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         try:
-            df = pd.read_csv(file_path)
-            resources = []
+            if not self.parquet_available:
+                raise RuntimeError("Parquet support requires pyarrow")
+            spec = SPECS[kind]
+            parquet_file = pq.ParquetFile(file_path)
+            present = [column.name for column in spec if column.name in parquet_file.schema_arrow.names]
+            
+            records, report = [], empty_report()
+            # Batches never span more than a row group and only the projected columns are decoded
+            for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=present):
+                batch_records, batch_report = validate_frame(batch.to_pandas(), spec, row_offset=report["total_rows"])
+                records.extend(batch_records)
+                merge_reports(report, batch_report)
             
-            for _, row in df.iterrows():
-                resource = {
-                    "title": row.get("title", "").strip(),
-                    "type": row.get("type", "").strip(),
-                    "description": row.get("description", "").strip(),
-                    "url": row.get("url", "").strip(),
-                    "skills": row.get("skills", "").strip()
-                }
-                resources.append(resource)
-                
-            logger.info(f"Loaded {len(resources)} training resources from CSV")
-            return resources
+            records = self._finish_records(kind, records)
+            logger.info(f"Loaded {len(records)} {kind} from Parquet, rejected {report['rejected']} rows")
+            return records, report
         except Exception as e:
-            logger.error(f"Failed to load training resources from CSV: {e}")
-            return []
+            logger.error(f"Failed to load {kind} from Parquet: {e}")
+            return [], {**empty_report(), "error": str(e)}
+    
+    def _finish_records(self, kind: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if kind == "scenarios":
+            for scenario in records:
+                scenario["id"] = scenario_id(scenario)
+                # Requirements, deliverables, criteria, role family and outdated flag, derived once here
+                enrich_scenario(scenario)
+        return records
 
-csv_processor = CSVProcessor()
\ No newline at end of file
+csv_processor = CSVProcessor()
@@ -0,0 +1,76 @@
+from agents.evaluation_agent import evaluation_agent
+from config.settings import settings
+from services.heuristic_scorer import heuristic_scorer
+from typing import Dict, Any, List, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationCascade:
+    """Heuristic scoring first; only borderline or low-confidence cases escalate to the LLM evaluator"""
+
+    def __init__(self):
+        self.uncertainty_band = settings.cascade_uncertainty_band
+        self.min_confidence = settings.cascade_min_confidence
+        self._stats = {"evaluated": 0, "escalated": 0, "llm_failed": 0}
+        self._lock = threading.Lock()
+
+    def escalation_reason(self, features: Dict[str, Any], scores: Dict[str, int]) -> str:
+        """Why the heuristic result needs the LLM, or an empty string when it can stand"""
+        total_score = sum(scores.values())
+        confidence = heuristic_scorer.confidence(features)
+        if heuristic_scorer.boundary_distance(total_score) <= self.uncertainty_band:
+            return f"score {total_score} within {self.uncertainty_band} points of a grade boundary"
+        if confidence < self.min_confidence:
+            return f"heuristic confidence {confidence} below {self.min_confidence}"
+        return ""
+
+    def evaluate(self, content: str, files: List[Dict[str, Any]], scenario_data: Dict[str, Any],
+                 features: Dict[str, Any], scores: Dict[str, int]) -> Tuple[Dict[str, int], Dict[str, Any]]:
+        """
+        Input: heuristic features and scores already computed for the submission
+        Output: final scores and a report of whether (and why) the LLM was consulted
+        """
+        reason = self.escalation_reason(features, scores)
+        final_scores = scores
+        scored_by = "heuristic"
+
+        if reason:
+            logger.info(f"Escalating evaluation to LLM: {reason}")
+            evaluation = evaluation_agent.evaluate_response(
+                {"content": content, "files": files, "response_type": "code" if features["has_code"] else "text"},
+                scenario_data
+            )
+            if "error" in evaluation:
+                # LLM fell back to its default; the heuristic result is the better estimate
+                logger.warning("LLM evaluation failed during escalation, keeping heuristic scores")
+            else:
+                final_scores = {criterion: evaluation["scores"].get(criterion, 0) for criterion in scores}
+                scored_by = "llm"
+
+        with self._lock:
+            self._stats["evaluated"] += 1
+            if reason:
+                self._stats["escalated"] += 1
+            if reason and scored_by == "heuristic":
+                self._stats["llm_failed"] += 1
+
+        return final_scores, {
+            "escalated": bool(reason),
+            "reason": reason or "heuristic result outside uncertainty band",
+            "scored_by": scored_by,
+            "heuristic_scores": scores,
+            "heuristic_confidence": heuristic_scorer.confidence(features),
+            "escalation_rate": self.stats()["escalation_rate"]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["escalation_rate"] = round(stats["escalated"] / stats["evaluated"], 3) if stats["evaluated"] else 0.0
+        return stats
+
+
+evaluation_cascade = EvaluationCascade()
@@ -0,0 +1,123 @@
+from services.cache import normalize_content
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import threading
+
+GAP_CATEGORIES = ("technical", "conceptual", "process")
+
+
+class GapProfile(NamedTuple):
+    """A student's gaps as one bitset per category; bit i is gap id i"""
+    technical: int = 0
+    conceptual: int = 0
+    process: int = 0
+
+    @property
+    def mask(self) -> int:
+        """Every gap regardless of category"""
+        return self.technical | self.conceptual | self.process
+
+    def union(self, other: "GapProfile") -> "GapProfile":
+        return GapProfile(*(mine | theirs for mine, theirs in zip(self, other)))
+
+    def without(self, other: "GapProfile") -> "GapProfile":
+        return GapProfile(*(mine & ~theirs for mine, theirs in zip(self, other)))
+
+    def count(self) -> int:
+        return sum(category.bit_count() for category in self)
+
+
+class GapVocabulary:
+    """
+    Interns the known gap descriptions to small integer ids
+    Gaps differing only in case or whitespace share an id; the first spelling seen is kept for display.
+    Only registered gaps get an id: free text from LLM output or request bodies is carried as text,
+    so it never grows the vocabulary or the relevance matrix columns built from it.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._labels: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, gap: str) -> Optional[int]:
+        """Id of a registered gap, None for any other text"""
+        return self._ids.get(self._key(gap))
+
+    def register(self, gaps: Iterable[str]):
+        """Intern known gaps up front so their ids, and therefore output order, are stable"""
+        with self._lock:
+            for gap in gaps:
+                key = self._key(gap)
+                if key and key not in self._ids:
+                    self._ids[key] = len(self._labels)
+                    self._labels.append(normalize_content(gap))
+
+    def label(self, gap_id: int) -> str:
+        return self._labels[gap_id]
+
+    def bits(self, gaps: Iterable[str]) -> int:
+        """Bitset of the registered gaps among `gaps`"""
+        mask = 0
+        for gap in gaps:
+            gap_id = self.intern(str(gap)) if gap else None
+            if gap_id is not None:
+                mask |= 1 << gap_id
+        return mask
+
+    def unknown(self, gaps: Iterable[str]) -> List[str]:
+        """Gaps outside the vocabulary, normalized and de-duplicated in first-seen order"""
+        seen, found = set(), []
+        for gap in gaps:
+            key = self._key(str(gap)) if gap else ""
+            if key and key not in self._ids and key not in seen:
+                seen.add(key)
+                found.append(normalize_content(str(gap)))
+        return found
+
+    def ids(self, mask: int) -> List[int]:
+        """Gap ids set in a bitset, ascending"""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(low.bit_length() - 1)
+            mask ^= low
+        return ids
+
+    def labels(self, mask: int) -> List[str]:
+        """Gap descriptions of a bitset in id order, so output is deterministic"""
+        return [self._labels[gap_id] for gap_id in self.ids(mask)]
+
+    def profile(self, technical: Iterable[str] = (), conceptual: Iterable[str] = (),
+                process: Iterable[str] = ()) -> GapProfile:
+        return GapProfile(self.bits(technical), self.bits(conceptual), self.bits(process))
+
+    def profile_from_analysis(self, gap_analysis: Dict) -> GapProfile:
+        """Profile of a gap analysis dict with technical_gaps / conceptual_gaps / process_gaps lists"""
+        return self.profile(*(gap_analysis.get(f"{category}_gaps", []) for category in GAP_CATEGORIES))
+
+    def free_text(self, gap_analysis: Dict) -> Dict[str, List[str]]:
+        """Per category, the gaps of a gap analysis dict that the vocabulary does not know"""
+        return {
+            f"{category}_gaps": self.unknown(gap_analysis.get(f"{category}_gaps", []))
+            for category in GAP_CATEGORIES
+        }
+
+    def to_lists(self, profile: GapProfile, free_text: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+        """
+        technical_gaps / conceptual_gaps / process_gaps lists for a profile,
+        each followed by that category's free-text gaps, if any
+        """
+        free_text = free_text or {}
+        return {
+            f"{category}_gaps": self.labels(mask) + list(free_text.get(f"{category}_gaps", []))
+            for category, mask in zip(GAP_CATEGORIES, profile)
+        }
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def _key(self, gap: str) -> str:
+        return normalize_content(gap).lower()
+
+
+gap_vocabulary = GapVocabulary()
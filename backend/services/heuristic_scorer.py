@@ -0,0 +1,104 @@
+from services.content_analyzer import (
+    BEST_PRACTICE_KEYWORDS, CODE_KEYWORDS, COMMENT_MARKERS, PERFORMANCE_KEYWORDS, STRUCTURE_KEYWORDS, content_analyzer
+)
+from typing import Dict, Any, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Size features add up across chunks; everything else is a presence flag
+ADDITIVE_FEATURES = ("length", "words")
+
+# Totals at which the letter grade changes
+GRADE_BOUNDARIES = (60, 70, 80, 90)
+
+
+class HeuristicScorer:
+    """Keyword-feature scorer for the four rubric criteria (25 points each)"""
+
+    def extract_features(self, content: str, cache: bool = False) -> Dict[str, Any]:
+        """Keyword features for one piece of content; whole submissions should pass cache=True"""
+        return content_analyzer.keyword_features(content, cache)
+
+    def merge_features(self, features_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reduce per-chunk features into features of the whole submission"""
+        merged = self.extract_features("")
+        for features in features_list:
+            for key, value in features.items():
+                if key in ADDITIVE_FEATURES:
+                    merged[key] += value
+                else:
+                    merged[key] = merged[key] or value
+        return merged
+
+    def score(self, features: Dict[str, Any]) -> Dict[str, int]:
+        """Score the rubric criteria from keyword features"""
+        content_length = features["length"]
+
+        clarity_score = min(25, max(5, content_length // 20))
+        if features["has_comments"]:
+            clarity_score = min(25, clarity_score + 5)
+        if content_length > 500:
+            clarity_score = min(25, clarity_score + 3)
+
+        relevance_score = 15
+        if features["has_code"]:
+            relevance_score += 5
+        if features["has_structure"]:
+            relevance_score += 3
+        if features["words"] > 50:
+            relevance_score += 2
+        relevance_score = min(25, relevance_score)
+
+        correctness_score = 12
+        if features["has_structure"]:
+            correctness_score += 8
+        if features["has_best_practices"]:
+            correctness_score += 5
+        correctness_score = min(25, correctness_score)
+
+        scalability_score = min(25, max(10, content_length // 30))
+        if features["has_index"]:
+            scalability_score = min(25, scalability_score + 5)
+        if features["has_performance_terms"]:
+            scalability_score = min(25, scalability_score + 3)
+
+        return {
+            "clarity": clarity_score,
+            "relevance": relevance_score,
+            "correctness": correctness_score,
+            "scalability": scalability_score
+        }
+
+    def confidence(self, features: Dict[str, Any]) -> float:
+        """How far keyword scoring can be trusted for this content (0-1)"""
+        confidence = 1.0
+        if features["length"] < 200:
+            confidence -= 0.3  # Too little text for keywords to mean much
+        if features["words"] < 30:
+            confidence -= 0.2
+        if features["has_code"] and not features["has_structure"]:
+            confidence -= 0.2  # Mixed signals: code keywords without code structure
+        if not (features["has_code"] or features["has_structure"] or features["has_best_practices"]):
+            confidence -= 0.2  # Prose answers are outside what the keywords measure
+        return max(0.0, round(confidence, 2))
+
+    def boundary_distance(self, total_score: int) -> int:
+        """Points to the nearest grade boundary"""
+        return min(abs(total_score - boundary) for boundary in GRADE_BOUNDARIES)
+
+    def grade(self, total_score: int) -> str:
+        """Letter grade for a total out of 100"""
+        if total_score >= 90:
+            return "A"
+        elif total_score >= 80:
+            return "B"
+        elif total_score >= 70:
+            return "C"
+        elif total_score >= 60:
+            return "D"
+        else:
+            return "F"
+
+
+heuristic_scorer = HeuristicScorer()
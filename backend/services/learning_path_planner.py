@@ -0,0 +1,115 @@
+from services.gap_vocabulary import GapProfile, GapVocabulary, gap_vocabulary
+from services.relevance_matrix import GAP_FIELD_WEIGHTS, RelevanceMatrix
+from services.validation import resource_hours
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+import numpy as np
+
+# A set cover option: (gap bitmask, hours, index into the caller's resources)
+Option = Tuple[int, float, int]
+
+
+def greedy_cover(options: Sequence[Option]) -> Tuple[List[int], int]:
+    """
+    Greedy weighted set cover: repeatedly take the option covering the most new gaps per hour,
+    then drop picks the others already cover, most expensive first
+    Output: picked indices in pick order, bitmask of the gaps covered
+    """
+    target = 0
+    for mask, _, _ in options:
+        target |= mask
+
+    covered, picks = 0, []
+    remaining = list(options)
+    while covered != target:
+        best = max(
+            remaining,
+            key=lambda option: ((option[0] & ~covered).bit_count() / option[1], -option[1], -option[2])
+        )
+        picks.append(best)
+        covered |= best[0]
+        remaining = [option for option in remaining if option[0] & ~covered]
+
+    for pick in sorted(picks, key=lambda option: (-option[1], -option[2])):
+        rest = 0
+        for other in picks:
+            if other is not pick:
+                rest |= other[0]
+        if pick[0] & ~rest == 0:
+            picks.remove(pick)
+
+    return [index for _, _, index in picks], covered
+
+
+class LearningPathPlanner:
+    """Chooses the resources that cover a student's gaps at the fewest estimated study hours"""
+
+    def __init__(self, vocabulary: GapVocabulary = gap_vocabulary):
+        self.vocabulary = vocabulary
+
+    def plan_catalog(self, matrix: RelevanceMatrix, profile: GapProfile) -> Dict[str, Any]:
+        """
+        Plan over a whole catalog version using its relevance columns
+        Output: resource positions in pick order, covered / uncovered gaps, estimated hours
+        """
+        gap_ids = self.vocabulary.ids(profile.mask)
+        labels = [self.vocabulary.label(gap_id) for gap_id in gap_ids]
+        columns = [matrix.gap_column(gap_id)[0] for gap_id in gap_ids]
+        if not gap_ids or not any(len(positions) for positions in columns):
+            return self._plan([], 0, labels, 0.0)
+
+        # Only the cheapest (then earliest) resource per distinct gap set can be worth picking
+        if len(gap_ids) <= 64:
+            masks = np.zeros(matrix.size, dtype=np.uint64)
+            for bit, positions in enumerate(columns):
+                masks[positions] |= np.uint64(1 << bit)
+            candidates = np.flatnonzero(masks)
+            candidates = candidates[np.argsort(matrix.hours[candidates], kind="stable")]
+            _, first = np.unique(masks[candidates], return_index=True)
+            keep = candidates[first]
+            options = list(zip(masks[keep].tolist(), matrix.hours[keep].tolist(), keep.tolist()))
+        else:
+            masks: Dict[int, int] = {}
+            for bit, positions in enumerate(columns):
+                for position in positions.tolist():
+                    masks[position] = masks.get(position, 0) | 1 << bit
+            cheapest = {}
+            for position in sorted(masks):
+                mask, cost = masks[position], float(matrix.hours[position])
+                if mask not in cheapest or cost < cheapest[mask][1]:
+                    cheapest[mask] = (mask, cost, position)
+            options = list(cheapest.values())
+
+        picks, covered = greedy_cover(options)
+        return self._plan(picks, covered, labels, float(matrix.hours[picks].sum()) if picks else 0.0)
+
+    def plan_resources(self, resources: Sequence[Mapping[str, Any]], gaps: Sequence[str]) -> Dict[str, Any]:
+        """
+        Plan over a short list of resource dicts, matching gaps in their text
+        Output: indices into `resources` in pick order, covered / uncovered gaps, estimated hours
+        """
+        # Known gaps in id order, then free text the vocabulary does not hold
+        labels = self.vocabulary.labels(self.vocabulary.bits(gaps)) + self.vocabulary.unknown(gaps)
+        gap_text = [label.lower() for label in labels]
+        options = []
+        for index, resource in enumerate(resources):
+            text = [str(resource.get(name, "")).lower() for name, _ in GAP_FIELD_WEIGHTS]
+            mask = 0
+            for bit, gap in enumerate(gap_text):
+                if any(gap in value for value in text):
+                    mask |= 1 << bit
+            if mask:
+                options.append((mask, float(resource_hours(resource)), index))
+
+        picks, covered = greedy_cover(options)
+        return self._plan(picks, covered, labels, float(sum(resource_hours(resources[index]) for index in picks)))
+
+    def _plan(self, picks: List[int], covered: int, labels: List[str], hours: float) -> Dict[str, Any]:
+        return {
+            "positions": picks,
+            "covered_gaps": [label for bit, label in enumerate(labels) if covered >> bit & 1],
+            "uncovered_gaps": [label for bit, label in enumerate(labels) if not covered >> bit & 1],
+            "estimated_hours": hours
+        }
+
+
+learning_path_planner = LearningPathPlanner()
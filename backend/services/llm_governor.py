@@ -0,0 +1,305 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# (deadline, cancelled flag) bounding the governed calls of the current thread or task
+_call_scope: contextvars.ContextVar[Tuple[Optional[float], Optional[threading.Event]]] = \
+    contextvars.ContextVar("llm_call_scope", default=(None, None))
+
+
+@contextmanager
+def call_scope(deadline: Optional[float] = None, cancelled: Optional[threading.Event] = None):
+    """
+    Bound every governed call made inside the block: none starts or retries once `cancelled`
+    is set, and none waits for capacity or backs off past `deadline` (a time.monotonic value)
+    """
+    token = _call_scope.set((deadline, cancelled))
+    try:
+        yield
+    finally:
+        _call_scope.reset(token)
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when the governor sheds a call instead of sending it to the provider"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    def acquire(self, amount: float, deadline: float) -> bool:
+        """
+        Take `amount` tokens, waiting until they are available or the deadline passes
+        Blocks the calling thread; use acquire_async on the event loop
+        """
+        while True:
+            wait = self._take(amount)
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    async def acquire_async(self, amount: float, deadline: float) -> bool:
+        """Like acquire, but sleeps with asyncio so the event loop keeps running"""
+        while True:
+            wait = self._take(amount)
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(min(wait, 1.0))
+
+    def _take(self, amount: float) -> float:
+        """Take the tokens if they are there; otherwise the seconds until they will be"""
+        # A single request larger than the bucket would never fit, so cap it at capacity
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate_per_second if self.rate_per_second > 0 else float("inf")
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures, half-open probe after the recovery timeout"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                # Let exactly one probe through to test the provider
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.recovery_timeout
+            return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("LLM circuit breaker closed, provider healthy again")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give back a half-open probe that never reached the provider"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"LLM circuit breaker opened after {self.consecutive_failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class LLMGovernor:
+    """Rate limiting, bounded concurrency, retries and circuit breaking around LLM calls"""
+
+    RETRYABLE_MARKERS = (
+        "429", "500", "502", "503", "504", "quota", "rate limit", "resource exhausted",
+        "resourceexhausted", "unavailable", "deadline", "timeout", "timed out", "overloaded"
+    )
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        max_retries: int,
+        request_deadline: float,
+        failure_threshold: int,
+        recovery_timeout: float,
+        base_backoff: float = 0.5,
+        max_backoff: float = 8.0
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.max_retries = max_retries
+        self.request_deadline = request_deadline
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._stats = {"calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "shed": 0}
+        self._stats_lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """False while the circuit is open, so callers can go straight to their fallbacks"""
+        return not self.breaker.is_open()
+
+    def call(self, fn: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """
+        Run `fn` under the rate limits, concurrency bound, retry policy and circuit breaker
+        Waiting for capacity and backing off block the calling thread, so synchronous callers
+        on an async path must run this off the event loop (run_in_executor / asyncio.to_thread)
+        """
+        deadline = self._start()
+        attempt = 0
+        while True:
+            self._acquire_capacity(estimated_tokens, deadline)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+            else:
+                return self._succeeded(result)
+            finally:
+                self.semaphore.release()
+            attempt += 1
+            time.sleep(delay)
+
+    async def call_async(self, fn: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """
+        Like call, for the event loop: waits and backoff are awaited and the blocking
+        `fn` runs in the default executor
+        """
+        deadline = self._start()
+        attempt = 0
+        while True:
+            await self._acquire_capacity_async(estimated_tokens, deadline)
+            try:
+                result = await asyncio.to_thread(fn)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+            else:
+                return self._succeeded(result)
+            finally:
+                self.semaphore.release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["circuit_state"] = self.breaker.state
+        stats["available"] = self.is_available()
+        return stats
+
+    def bounds(self) -> Tuple[float, Optional[threading.Event]]:
+        """Deadline and cancellation event a call started now would run under, scope included"""
+        scope_deadline, cancelled = _call_scope.get()
+        deadline = time.monotonic() + self.request_deadline
+        return (deadline if scope_deadline is None else min(deadline, scope_deadline)), cancelled
+
+    def _start(self) -> float:
+        """Count the call and check the scope and breaker; Output: the call's deadline"""
+        self._count("calls")
+        deadline, cancelled = self.bounds()
+        if cancelled is not None and cancelled.is_set():
+            self._count("shed")
+            raise LLMUnavailableError("LLM call cancelled by its caller")
+        if not self.breaker.allow_request():
+            self._count("shed")
+            raise LLMUnavailableError("LLM circuit breaker is open")
+        return deadline
+
+    def _succeeded(self, result: T) -> T:
+        self.breaker.record_success()
+        self._count("succeeded")
+        return result
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Record a failed attempt; Output: the backoff before the next one, or raises if there is none"""
+        retryable = self._is_retryable(error)
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            # The provider answered, so it is healthy: a bad request resets the failure streak
+            self.breaker.record_success()
+        if not retryable or attempt >= self.max_retries or not self.breaker.allow_request():
+            self._count("failed")
+            raise error
+        cancelled = _call_scope.get()[1]
+        if cancelled is not None and cancelled.is_set():
+            self._count("failed")
+            raise LLMUnavailableError(f"LLM call cancelled by its caller after {attempt + 1} attempts: {error}") from error
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            self._count("failed")
+            raise LLMUnavailableError(f"LLM deadline exceeded after {attempt + 1} attempts: {error}") from error
+        self._count("retries")
+        logger.warning(f"LLM call failed ({error}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        return delay
+
+    def _acquire_capacity(self, estimated_tokens: int, deadline: float):
+        if not self.request_bucket.acquire(1, deadline) or not self.token_bucket.acquire(estimated_tokens, deadline):
+            self._shed("LLM rate limit would exceed request deadline")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self.semaphore.acquire(timeout=remaining):
+            self._shed("No LLM concurrency slot available before deadline")
+
+    async def _acquire_capacity_async(self, estimated_tokens: int, deadline: float):
+        if not (await self.request_bucket.acquire_async(1, deadline)
+                and await self.token_bucket.acquire_async(estimated_tokens, deadline)):
+            self._shed("LLM rate limit would exceed request deadline")
+        remaining = deadline - time.monotonic()
+        # The semaphore is shared with threaded callers, so wait for it off the loop
+        if remaining <= 0 or not await asyncio.to_thread(self.semaphore.acquire, True, remaining):
+            self._shed("No LLM concurrency slot available before deadline")
+
+    def _shed(self, reason: str):
+        self._count("shed")
+        self.breaker.release_probe()
+        raise LLMUnavailableError(reason)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from synchronising on the provider
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def _is_retryable(self, error: Exception) -> bool:
+        text = f"{type(error).__name__} {error}".lower()
+        return any(marker in text for marker in self.RETRYABLE_MARKERS)
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
@@ -1,26 +1,72 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from config.settings import settings
+from services.llm_governor import LLMGovernor, LLMUnavailableError
+from services.single_flight import SingleFlight, WaitAbandoned
+from services.prompt_budget import prompt_budget
+import hashlib
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Token allowance for the completion on top of the prompt estimate
+COMPLETION_TOKEN_ALLOWANCE = 1024
+
 class LLMService:
     def __init__(self):
+        self.model = "gemini-1.5-flash"
+        self.temperature = 0.7
         self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
+            model=self.model,
             google_api_key=settings.google_api_key,
-            temperature=0.7
+            temperature=self.temperature,
+            max_retries=1,  # Retries are owned by the governor
+            timeout=settings.llm_request_deadline_seconds
+        )
+        self.governor = LLMGovernor(
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            max_concurrency=settings.llm_max_concurrency,
+            max_retries=settings.llm_max_retries,
+            request_deadline=settings.llm_request_deadline_seconds,
+            failure_threshold=settings.llm_breaker_failure_threshold,
+            recovery_timeout=settings.llm_breaker_recovery_seconds
         )
+        self.single_flight = SingleFlight()
+    
+    def is_available(self) -> bool:
+        """False while the provider is considered unhealthy; agents should use their fallbacks"""
+        return self.governor.is_available()
+    
+    def stats(self) -> dict:
+        """Governor and request-coalescing counters for the debug endpoint"""
+        return {**self.governor.stats(), "single_flight": self.single_flight.stats()}
     
     def generate_response(self, prompt: str) -> str:
         try:
-            response = self.llm.invoke(prompt)
-            return response.content
+            # Identical concurrent prompts (e.g. a class generating the same role/level
+            # scenarios) share one governed round trip; callers joining it still stop at
+            # their own deadline or cancellation rather than the first caller's
+            deadline, cancelled = self.governor.bounds()
+            return self.single_flight.do(self._prompt_key(prompt), lambda: self._invoke(prompt), deadline, cancelled)
+        except WaitAbandoned as e:
+            logger.warning(f"LLM call shed: {e}")
+            raise LLMUnavailableError(str(e)) from e
+        except LLMUnavailableError as e:
+            logger.warning(f"LLM call shed: {e}")
+            raise
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
             raise
     
+    def _invoke(self, prompt: str) -> str:
+        estimated_tokens = prompt_budget.count_tokens(prompt) + COMPLETION_TOKEN_ALLOWANCE
+        return self.governor.call(lambda: self.llm.invoke(prompt).content, estimated_tokens)
+    
+    def _prompt_key(self, prompt: str) -> str:
+        payload = f"{self.model}|{self.temperature}|{prompt}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
     def parse_json_response(self, response: str) -> dict:
         try:
             # Clean the response to extract JSON
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from agents.evaluation_agent import evaluation_agent
+from config.settings import settings
+from services.content_analyzer import (
+    BEST_PRACTICE_KEYWORDS, CODE_KEYWORDS, COMMENT_MARKERS, PERFORMANCE_KEYWORDS, STRUCTURE_KEYWORDS
+)
+from services.heuristic_scorer import heuristic_scorer
+from services.prompt_budget import prompt_budget
+from typing import Dict, Any, List, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CRITERIA = ("clarity", "relevance", "correctness", "scalability")
+
+# Each chunk is scanned together with this much of the one before it,
+# so a keyword cut by a chunk boundary is still seen whole
+KEYWORD_OVERLAP_CHARS = max(
+    len(keyword) for keyword in (
+        *CODE_KEYWORDS, *STRUCTURE_KEYWORDS, *BEST_PRACTICE_KEYWORDS, *PERFORMANCE_KEYWORDS, *COMMENT_MARKERS,
+        "foreign key", "join"
+    )
+)
+
+
+class MapReduceEvaluator:
+    """Evaluate a submission by scoring each file chunk and reducing to rubric scores"""
+
+    def __init__(self):
+        self.chunk_tokens = settings.map_reduce_chunk_tokens
+        self.max_llm_chunks = settings.map_reduce_max_llm_chunks
+        # LLM map calls wait on the network, so they run in parallel
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.map_reduce_max_workers,
+            thread_name_prefix="map-reduce"
+        )
+
+    def split(self, content: str, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Break the answer text and every uploaded file into bounded chunks"""
+        sources = [("response", content or "")]
+        sources.extend((f.get("filename", "file"), f.get("content", "") or "") for f in files or [])
+
+        units = []
+        for source, text in sources:
+            if not text.strip():
+                continue
+            chunks = prompt_budget.chunk_text(text, self.chunk_tokens)
+            for index, chunk in enumerate(chunks):
+                units.append({
+                    "source": source,
+                    "part": index + 1,
+                    "parts": len(chunks),
+                    "text": chunk,
+                    "overlap": chunks[index - 1][-KEYWORD_OVERLAP_CHARS:] if index else "",
+                    "tokens": prompt_budget.count_tokens(chunk)
+                })
+        return units
+
+    def evaluate(self, content: str, files: List[Dict[str, Any]], scenario_data: Dict[str, Any], scorer: str = "heuristic") -> Dict[str, Any]:
+        """
+        Map: keyword features per chunk, plus an LLM evaluation of the largest chunks when scorer is "llm"
+        Reduce: merged features scored once, or the token-weighted mean of the LLM-scored chunks only;
+        the two scorers are not calibrated against each other, so their scores are never mixed
+        """
+        start_time = time.time()
+        units = self.split(content, files)
+
+        selected, llm_futures = [], []
+        if scorer == "llm" and units:
+            # Every chunk is one governed LLM call, so only the largest few go to the LLM
+            selected = sorted(range(len(units)), key=lambda index: -units[index]["tokens"])[:self.max_llm_chunks]
+            llm_futures = [self.executor.submit(self._map_llm, units[index], scenario_data) for index in selected]
+
+        # The keyword map runs on this thread while the LLM calls wait on the network
+        features = heuristic_scorer.merge_features([self._map_heuristic(unit) for unit in units])
+        scores = heuristic_scorer.score(features)
+        scored_by = "heuristic"
+
+        scored = [
+            (evaluation, units[index])
+            for evaluation, index in zip((future.result() for future in llm_futures), selected)
+            if "error" not in evaluation
+        ]
+        if scored:
+            scores = self._reduce_scores(scored)
+            scored_by = "llm"
+        elif llm_futures:
+            logger.warning("All LLM map evaluations failed, keeping heuristic map-reduce scores")
+
+        stats = {
+            "scorer": scored_by,
+            "chunks": len(units),
+            "llm_chunks": len(scored),
+            # LLM scores that cover only some chunks grade only those chunks
+            "partial": scored_by == "llm" and len(scored) < len(units),
+            "sources": len({unit["source"] for unit in units}),
+            "total_tokens": sum(unit["tokens"] for unit in units),
+            "scored_tokens": sum(unit["tokens"] for _, unit in scored) if scored else sum(unit["tokens"] for unit in units),
+            "largest_chunk_tokens": max((unit["tokens"] for unit in units), default=0),
+            "processing_time": round(time.time() - start_time, 3)
+        }
+        logger.info(f"Map-reduce evaluation over {stats['chunks']} chunks from {stats['sources']} sources in {stats['processing_time']}s")
+        return {"features": features, "scores": scores, "map_reduce": stats}
+
+    def _map_heuristic(self, unit: Dict[str, Any]) -> Dict[str, Any]:
+        """Presence flags from the chunk with its overlap, sizes from the chunk alone so nothing counts twice"""
+        features = heuristic_scorer.extract_features(unit["overlap"] + unit["text"])
+        if unit["overlap"]:
+            features.update({"length": len(unit["text"]), "words": len(unit["text"].split())})
+        return features
+
+    def _map_llm(self, unit: Dict[str, Any], scenario_data: Dict[str, Any]) -> Dict[str, Any]:
+        header = f"[Part {unit['part']} of {unit['parts']} from {unit['source']}]\n"
+        response_type = "text" if unit["source"] == "response" else "code"
+        return evaluation_agent.evaluate_response(
+            {"content": header + unit["text"], "files": [], "response_type": response_type},
+            scenario_data
+        )
+
+    def _reduce_scores(self, scored: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, int]:
+        """Token-weighted mean of each criterion over (evaluation, chunk) pairs from one scorer"""
+        totals = {criterion: 0.0 for criterion in CRITERIA}
+        weight = 0
+        for evaluation, unit in scored:
+            chunk_scores = evaluation.get("scores", {})
+            for criterion in CRITERIA:
+                totals[criterion] += chunk_scores.get(criterion, 0) * unit["tokens"]
+            weight += unit["tokens"]
+
+        if not weight:
+            return {}
+        return {criterion: round(totals[criterion] / weight) for criterion in CRITERIA}
+
+
+map_reduce_evaluator = MapReduceEvaluator()
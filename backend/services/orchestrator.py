@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from services.llm_governor import call_scope
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Stage outcomes that let dependent stages run
+SUCCESS_STATES = ("completed", "fallback")
+
+
+class StageCancelled(Exception):
+    """Raised inside a stage that has outlived its timeout or the pipeline deadline"""
+
+
+@dataclass
+class StageContext:
+    """Deadline and cancellation flag a running stage checks between steps"""
+    deadline_at: float
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def check(self):
+        if self.cancelled.is_set() or time.monotonic() >= self.deadline_at:
+            raise StageCancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline graph; `func` receives the results of finished stages and its StageContext,
+    `fallback` just the results
+    """
+    name: str
+    func: Callable[[Dict[str, Any], StageContext], Any]
+    depends_on: List[str] = field(default_factory=list)
+    timeout: Optional[float] = None
+    fallback: Optional[Callable[[Dict[str, Any]], Any]] = None
+
+
+class PipelineOrchestrator:
+    """Runs a dependency graph of blocking stages, starting each stage as soon as its inputs are ready"""
+
+    def __init__(self, max_workers: int = 16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+
+    def validate(self, stages: List[Stage]):
+        """Reject unknown dependencies and cycles before anything runs"""
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            unknown = [dep for dep in stage.depends_on if dep not in names]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {unknown}")
+
+        remaining = {stage.name: set(stage.depends_on) for stage in stages}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline has a dependency cycle among: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    async def run(self, stages: List[Stage], deadline: float, inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run all stages within `deadline` seconds
+        Output: results, per-stage status and wall time, total time
+        """
+        self.validate(stages)
+        start_time = time.monotonic()
+        deadline_at = start_time + deadline
+
+        results: Dict[str, Any] = dict(inputs or {})
+        status: Dict[str, str] = {}
+        timings: Dict[str, float] = {}
+        started: Dict[str, float] = {}
+        pending = {stage.name: stage for stage in stages}
+        running: Dict[asyncio.Task, str] = {}
+
+        while pending or running:
+            # Launch every stage whose dependencies are done; cancel those whose inputs failed
+            for name, stage in list(pending.items()):
+                failed = [dep for dep in stage.depends_on if dep in status and status[dep] not in SUCCESS_STATES]
+                if failed:
+                    status[name] = "cancelled"
+                    logger.warning(f"Stage '{name}' cancelled, upstream failed: {failed}")
+                    del pending[name]
+                elif all(status.get(dep) in SUCCESS_STATES for dep in stage.depends_on):
+                    task = asyncio.create_task(self._run_stage(stage, results, deadline_at))
+                    running[task] = name
+                    started[name] = time.monotonic()
+                    del pending[name]
+
+            if not running:
+                break
+
+            remaining = deadline_at - time.monotonic()
+            done = set()
+            if remaining > 0:
+                done, _ = await asyncio.wait(running, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # Request deadline hit: abandon everything still in flight or waiting
+                for task, name in running.items():
+                    task.cancel()
+                    status[name] = "deadline_exceeded"
+                    timings[name] = round(time.monotonic() - started[name], 3)
+                for name in pending:
+                    status[name] = "cancelled"
+                logger.warning(f"Pipeline deadline of {deadline}s exceeded")
+                running.clear()
+                pending.clear()
+                break
+
+            for task in done:
+                name = running.pop(task)
+                stage_status, result, elapsed = task.result()
+                status[name] = stage_status
+                timings[name] = elapsed
+                if stage_status in SUCCESS_STATES:
+                    results[name] = result
+
+        return {
+            "results": results,
+            "stage_status": status,
+            "stage_timings": timings,
+            "total_time": round(time.monotonic() - start_time, 3)
+        }
+
+    async def _run_stage(self, stage: Stage, results: Dict[str, Any], deadline_at: float):
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        timeout = deadline_at - started
+        if stage.timeout is not None:
+            timeout = min(timeout, stage.timeout)
+        context = StageContext(deadline_at=started + timeout)
+
+        try:
+            # Blocking agent work runs in the pool so the event loop stays free
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._call, stage.func, results, context), timeout=timeout
+            )
+            return "completed", result, round(time.monotonic() - started, 3)
+        except asyncio.TimeoutError:
+            # The pool thread cannot be interrupted; the flag stops its remaining steps and LLM calls
+            context.cancel()
+            logger.warning(f"Stage '{stage.name}' timed out after {timeout:.1f}s")
+            outcome = "timeout"
+        except asyncio.CancelledError:
+            context.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Stage '{stage.name}' failed: {e}")
+            outcome = "failed"
+
+        if stage.fallback is not None:
+            try:
+                result = await loop.run_in_executor(self.executor, stage.fallback, results)
+                return "fallback", result, round(time.monotonic() - started, 3)
+            except Exception as e:
+                logger.error(f"Fallback for stage '{stage.name}' failed: {e}")
+        return outcome, None, round(time.monotonic() - started, 3)
+
+    def _call(self, func: Callable[[Dict[str, Any], StageContext], Any], results: Dict[str, Any], context: StageContext):
+        # Governed LLM calls made by the stage stop starting and retrying once it is cancelled
+        with call_scope(deadline=context.deadline_at, cancelled=context.cancelled):
+            return func(results, context)
+
+
+orchestrator = PipelineOrchestrator()
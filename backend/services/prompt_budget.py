@@ -0,0 +1,166 @@
+from config.settings import settings
+from typing import Dict, Any, List, Tuple
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# Gemini tokenizes English and code at roughly four characters per token
+CHARS_PER_TOKEN = 4
+MIN_CHUNK_TOKENS = 64
+HEAD_SHARE = 0.6  # Share of a compacted budget spent on the opening excerpt
+
+
+class PromptBudget:
+    """Counts prompt tokens and compacts oversized inputs to a per-agent budget"""
+
+    def __init__(self):
+        self.budgets = {
+            "evaluation_response": settings.prompt_budget_response_tokens,
+            "evaluation_files": settings.prompt_budget_files_tokens,
+            "challenge_scenario": settings.prompt_budget_scenario_tokens,
+            "gap_feedback": settings.prompt_budget_feedback_tokens
+        }
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate token count without calling the provider"""
+        return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+    def chunk_text(self, text: str, max_tokens: int) -> List[str]:
+        """Split text on line boundaries into chunks of at most `max_tokens`"""
+        max_tokens = max(1, max_tokens)
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        chunks = []
+        current = []
+        current_tokens = 0
+
+        for line in text.splitlines(keepends=True):
+            line_tokens = self.count_tokens(line)
+            if line_tokens > max_tokens:
+                # Minified code or a giant paragraph: hard split the line itself
+                if current:
+                    chunks.append("".join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(line[i:i + max_chars] for i in range(0, len(line), max_chars))
+                continue
+            if current and current_tokens + line_tokens > max_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += line_tokens
+
+        if current:
+            chunks.append("".join(current))
+        return chunks
+
+    def compact(self, text: str, max_tokens: int, label: str = "input") -> Tuple[str, Dict[str, Any]]:
+        """Fit text into `max_tokens`, keeping head and tail excerpts of oversized inputs"""
+        text = text or ""
+        original_tokens = self.count_tokens(text)
+        stats = {
+            "label": label,
+            "budget": max_tokens,
+            "original_tokens": original_tokens,
+            "final_tokens": original_tokens,
+            "truncated": False,
+            "omitted_tokens": 0,
+            "chunks_total": 1,
+            "chunks_kept": 1
+        }
+        if original_tokens <= max_tokens:
+            return text, stats
+
+        marker_reserve = self.count_tokens(self._omission_marker(original_tokens, label))
+        if marker_reserve > max_tokens:
+            # Too small a budget for even the marker: keep as much of the opening as fits
+            compacted = text[:max(0, max_tokens) * CHARS_PER_TOKEN]
+            stats.update({
+                "final_tokens": self.count_tokens(compacted),
+                "truncated": True,
+                "omitted_tokens": original_tokens - self.count_tokens(compacted),
+                "chunks_kept": 0
+            })
+            return compacted, stats
+
+        chunks = self.chunk_text(text, max(MIN_CHUNK_TOKENS, max_tokens // 8))
+        available = max_tokens - marker_reserve
+        head_budget = int(available * HEAD_SHARE)
+
+        head, used = [], 0
+        for chunk in chunks:
+            tokens = self.count_tokens(chunk)
+            if used + tokens > head_budget:
+                break
+            head.append(chunk)
+            used += tokens
+
+        tail = []
+        for chunk in reversed(chunks[len(head):]):
+            tokens = self.count_tokens(chunk)
+            if used + tokens > available:
+                break
+            tail.insert(0, chunk)
+            used += tokens
+
+        omitted_tokens = original_tokens - used
+        compacted = "".join(head) + self._omission_marker(omitted_tokens, label) + "".join(tail)
+
+        stats.update({
+            "final_tokens": self.count_tokens(compacted),
+            "truncated": True,
+            "omitted_tokens": omitted_tokens,
+            "chunks_total": len(chunks),
+            "chunks_kept": len(head) + len(tail)
+        })
+        logger.info(f"Compacted {label} from ~{original_tokens} to ~{stats['final_tokens']} tokens")
+        return compacted, stats
+
+    def compact_files(self, files: List[Dict[str, Any]], max_tokens: int) -> Tuple[str, Dict[str, Any]]:
+        """Render uploaded files into one prompt section, sharing the budget fairly between them"""
+        rendered = [(f.get("filename", "file"), f.get("content", "") or "") for f in files]
+        stats = {
+            "label": "files",
+            "budget": max_tokens,
+            "file_count": len(rendered),
+            "original_tokens": sum(self.count_tokens(content) for _, content in rendered),
+            "truncated": False,
+            "truncated_files": []
+        }
+        if not rendered:
+            stats["final_tokens"] = 0
+            return "", stats
+
+        # Water-filling: small files keep their full text, large files split what is left
+        allocations = {}
+        remaining_budget = max_tokens
+        by_size = sorted(range(len(rendered)), key=lambda i: self.count_tokens(rendered[i][1]))
+        for position, index in enumerate(by_size):
+            share = remaining_budget // (len(by_size) - position)
+            allocations[index] = min(self.count_tokens(rendered[index][1]), share)
+            remaining_budget -= allocations[index]
+
+        sections = []
+        for index, (filename, content) in enumerate(rendered):
+            compacted, file_stats = self.compact(content, allocations[index], label=filename)
+            if file_stats["truncated"]:
+                stats["truncated"] = True
+                stats["truncated_files"].append({
+                    "filename": filename,
+                    "original_tokens": file_stats["original_tokens"],
+                    "final_tokens": file_stats["final_tokens"]
+                })
+            sections.append(f"--- {filename} ---\n{compacted}")
+
+        section_text = "\n\n".join(sections)
+        stats["final_tokens"] = self.count_tokens(section_text)
+        return section_text, stats
+
+    def fit(self, text: str, budget_name: str) -> Tuple[str, Dict[str, Any]]:
+        """Compact text against one of the named per-agent budgets"""
+        return self.compact(text, self.budgets[budget_name], label=budget_name)
+
+    def _omission_marker(self, omitted_tokens: int, label: str) -> str:
+        return f"\n... [~{omitted_tokens} tokens omitted from {label}] ...\n"
+
+
+prompt_budget = PromptBudget()
@@ -0,0 +1,159 @@
+from services.columnar import ColumnarTable
+from services.gap_vocabulary import GapProfile, GapVocabulary, gap_vocabulary
+from services.validation import resource_hours
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+import numpy as np
+import threading
+
+RECOMMENDATION_CATEGORIES = ("immediate", "foundational", "practical", "advanced")
+FOUNDATIONAL_WORDS = ("fundamental", "basic", "introduction", "beginner")
+PRACTICAL_TYPES = ("project", "exercise", "practice")
+ADVANCED_WORDS = ("advanced", "expert", "master", "optimization")
+
+# Where a gap is mentioned decides how relevant a resource is to it
+GAP_FIELD_WEIGHTS = (("skills", 3.0), ("title", 2.0), ("description", 1.0))
+ROLE_FIELD_WEIGHTS = (("skills", 1.0), ("title", 1.0))
+ROLE_MATCH_WEIGHT = 1.0
+
+# Students scored per block, so a cohort's dense score block stays small
+COHORT_BLOCK_ROWS = 256
+# Role columns kept per matrix; roles are free text, so further ones are built per call and not kept
+MAX_ROLE_COLUMNS = 256
+
+# A sparse column: resource positions with a nonzero weight, and those weights
+Column = Tuple[np.ndarray, np.ndarray]
+
+
+def recommendation_category(resource: Mapping[str, Any]) -> str:
+    """Learning path category of a resource, from its type and title"""
+    resource_type = str(resource.get("type", "course")).lower()
+    title = str(resource.get("title", "")).lower()
+
+    if any(word in title for word in FOUNDATIONAL_WORDS):
+        return "foundational"
+    if resource_type in PRACTICAL_TYPES:
+        return "practical"
+    if any(word in title for word in ADVANCED_WORDS):
+        return "advanced"
+    return "immediate"
+
+
+class RelevanceMatrix:
+    """
+    Sparse resource x gap and resource x role relevance for one immutable resource table
+    Columns are built on first use: one per registered gap, up to MAX_ROLE_COLUMNS roles, and
+    free-text gaps only for the call that asks, so request text cannot grow the matrix
+    """
+
+    def __init__(self, resources: ColumnarTable, vocabulary: GapVocabulary = gap_vocabulary):
+        self.size = len(resources)
+        self.vocabulary = vocabulary
+        fields = {name for name, _ in GAP_FIELD_WEIGHTS + ROLE_FIELD_WEIGHTS}
+        self._text = {name: [str(value).lower() for value in resources.column(name)] for name in fields}
+        categories, hours = [], []
+        for resource in resources:
+            categories.append(RECOMMENDATION_CATEGORIES.index(recommendation_category(resource)))
+            hours.append(resource_hours(resource))
+        self.categories = np.array(categories, dtype=np.int8)
+        # Estimated study hours, the cost side of learning path planning
+        self.hours = np.array(hours, dtype=np.float32)
+        self._gap_columns: Dict[int, Column] = {}
+        self._role_columns: Dict[str, Column] = {}
+        self._lock = threading.Lock()
+
+    def gap_column(self, gap_id: int) -> Column:
+        column = self._gap_columns.get(gap_id)
+        if column is None:
+            column = self._column(self.vocabulary.label(gap_id).lower(), GAP_FIELD_WEIGHTS)
+            with self._lock:
+                column = self._gap_columns.setdefault(gap_id, column)
+        return column
+
+    def role_column(self, role: str) -> Column:
+        key = (role or "").strip().lower()
+        column = self._role_columns.get(key)
+        if column is None:
+            positions, _ = self._column(key, ROLE_FIELD_WEIGHTS)
+            column = (positions, np.full(len(positions), ROLE_MATCH_WEIGHT, dtype=np.float32))
+            with self._lock:
+                if key in self._role_columns or len(self._role_columns) < MAX_ROLE_COLUMNS:
+                    column = self._role_columns.setdefault(key, column)
+        return column
+
+    def text_column(self, gap: str) -> Column:
+        """Column of a gap outside the vocabulary; built for the caller and not kept"""
+        return self._column(gap.lower(), GAP_FIELD_WEIGHTS)
+
+    def scores(self, profile: GapProfile, role: str) -> np.ndarray:
+        """Relevance of every resource to one student: the gap vector times the matrix"""
+        return self.cohort_scores([(role, profile)])[0]
+
+    def cohort_scores(self, students: Sequence[Tuple[str, GapProfile]],
+                      free_text: Sequence[Sequence[str]] = ()) -> np.ndarray:
+        """
+        Relevance of every resource to every student at once
+        Equivalent to the (student x gap) matrix times the (gap x resource) matrix, done as one scatter-add
+        `free_text` optionally holds each student's gaps outside the vocabulary, row for row
+        """
+        rows, positions, weights = [], [], []
+        text_columns: Dict[str, Column] = {}
+        for row, (role, profile) in enumerate(students):
+            columns = [self.gap_column(gap_id) for gap_id in self.vocabulary.ids(profile.mask)]
+            for gap in (free_text[row] if row < len(free_text) else ()):
+                if gap not in text_columns:
+                    text_columns[gap] = self.text_column(gap)
+                columns.append(text_columns[gap])
+            columns.append(self.role_column(role))
+            for column_positions, column_weights in columns:
+                rows.append(np.full(len(column_positions), row, dtype=np.int64))
+                positions.append(column_positions)
+                weights.append(column_weights)
+
+        shape = (len(students), self.size)
+        if not positions or not self.size:
+            return np.zeros(shape, dtype=np.float32)
+        flat = np.concatenate(rows) * self.size + np.concatenate(positions)
+        scores = np.bincount(flat, weights=np.concatenate(weights), minlength=shape[0] * shape[1])
+        return scores.astype(np.float32).reshape(shape)
+
+    def top_k(self, scores: np.ndarray, k: int) -> Dict[str, List[int]]:
+        """Best k relevant positions per category, by score then catalog order"""
+        ranked = {}
+        for code, category in enumerate(RECOMMENDATION_CATEGORIES):
+            candidates = np.flatnonzero((self.categories == code) & (scores > 0))
+            if len(candidates) > k:
+                # Partial sort: everything above the k-th best score, then ties in catalog order
+                values = scores[candidates]
+                kth = np.partition(values, len(values) - k)[len(values) - k]
+                above = candidates[values > kth]
+                ties = candidates[values == kth][:k - len(above)]
+                candidates = np.concatenate([above, ties])
+            order = np.lexsort((candidates, -scores[candidates]))
+            ranked[category] = candidates[order].tolist()
+        return ranked
+
+    def recommend(self, profile: GapProfile, role: str, k: int) -> Dict[str, List[int]]:
+        """Top-k resource positions per category for one student"""
+        return self.top_k(self.scores(profile, role), k)
+
+    def recommend_cohort(self, students: Sequence[Tuple[str, GapProfile]], k: int,
+                         free_text: Sequence[Sequence[str]] = ()) -> List[Dict[str, List[int]]]:
+        """Top-k resource positions per category for each student, scored block by block"""
+        ranked = []
+        for start in range(0, len(students), COHORT_BLOCK_ROWS):
+            block = self.cohort_scores(
+                students[start:start + COHORT_BLOCK_ROWS], free_text[start:start + COHORT_BLOCK_ROWS]
+            )
+            ranked.extend(self.top_k(scores, k) for scores in block)
+        return ranked
+
+    def _column(self, text: str, field_weights: Tuple[Tuple[str, float], ...]) -> Column:
+        weights = np.zeros(self.size, dtype=np.float32)
+        if not text:
+            # An empty role or gap is a substring of everything, not a match
+            return np.flatnonzero(weights), weights[:0]
+        for name, weight in field_weights:
+            hits = [position for position, value in enumerate(self._text[name]) if text in value]
+            weights[hits] += weight
+        positions = np.flatnonzero(weights)
+        return positions, weights[positions]
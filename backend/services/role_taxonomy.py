@@ -0,0 +1,131 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Pattern, Tuple
+import re
+import threading
+
+# Role families, the free-text markers that identify them and their parent families.
+# A student can take scenarios of their own family, its ancestors and its descendants.
+ROLE_HIERARCHY = {
+    "fullstack": {"markers": ("fullstack", "full stack", "full-stack"), "parents": ()},
+    "data_analyst": {"markers": ("data", "analyst", "analytics"), "parents": ()},
+    "frontend": {"markers": ("frontend", "front end", "front-end", "web"), "parents": ("fullstack",)},
+    "backend": {"markers": ("backend", "back end", "back-end", "api"), "parents": ("fullstack",)},
+}
+
+
+class RoleTaxonomy:
+    """Role families as bit positions, with each family's compatible set precomputed as a bitmask"""
+
+    def __init__(self, hierarchy: Dict[str, Dict[str, Any]]):
+        # Marker order matters: more specific families are listed first.
+        # Markers match whole words, so "api" does not match "rapid" nor "data" match "database"
+        self.markers: List[Tuple[str, Pattern]] = [
+            (family, re.compile(r"\b(?:" + "|".join(re.escape(marker) for marker in spec["markers"]) + r")\b"))
+            for family, spec in hierarchy.items()
+        ]
+        self.bits: Dict[str, int] = {}
+        self.compatible: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        for family in hierarchy:
+            self.bits[family] = 1 << len(self.bits)
+
+        parents = {family: spec["parents"] for family, spec in hierarchy.items()}
+        for family in hierarchy:
+            mask = self.bits[family] | self._ancestor_mask(family, parents)
+            for other in hierarchy:
+                if family in self._ancestors(other, parents):
+                    mask |= self.bits[other]
+            self.compatible[family] = mask
+
+    def family(self, role: str) -> str:
+        """Normalized family of a free-text role; unknown roles are their own family"""
+        role_lower = (role or "").strip().lower()
+        for family, pattern in self.markers:
+            if pattern.search(role_lower):
+                return family
+        return role_lower
+
+    def bit(self, family: str) -> int:
+        """Bit of a family; families outside the hierarchy get one on first sight"""
+        bit = self.bits.get(family)
+        if bit is None:
+            with self._lock:
+                bit = self.bits.get(family)
+                if bit is None:
+                    bit = self.bits[family] = 1 << len(self.bits)
+                    self.compatible[family] = bit
+        return bit
+
+    def compatible_mask(self, role: str) -> int:
+        family = self.family(role)
+        self.bit(family)
+        return self.compatible[family]
+
+    def is_compatible(self, scenario_family: str, role: str) -> bool:
+        """Can a student of `role` take a scenario of `scenario_family`"""
+        return bool(self.compatible_mask(role) & self.bit(scenario_family))
+
+    def _ancestors(self, family: str, parents: Dict[str, Tuple[str, ...]]) -> set:
+        found, stack = set(), list(parents.get(family, ()))
+        while stack:
+            parent = stack.pop()
+            if parent not in found:
+                found.add(parent)
+                stack.extend(parents.get(parent, ()))
+        return found
+
+    def _ancestor_mask(self, family: str, parents: Dict[str, Tuple[str, ...]]) -> int:
+        mask = 0
+        for ancestor in self._ancestors(family, parents):
+            mask |= self.bits[ancestor]
+        return mask
+
+
+class RoleIndex:
+    """Row positions bucketed by (family bit, difficulty) for one immutable set of rows"""
+
+    def __init__(self, taxonomy: RoleTaxonomy, rows: Iterable[Dict[str, Any]] = ()):
+        self.taxonomy = taxonomy
+        buckets: Dict[Tuple[int, str], List[int]] = {}
+        for position, row in enumerate(rows):
+            key = self._key(row)
+            buckets.setdefault(key, []).append(position)
+        self.buckets = {key: tuple(positions) for key, positions in buckets.items()}
+
+    def updated(self, changes: Mapping[int, Mapping[str, Any]], replaced: Mapping[int, Mapping[str, Any]]) -> "RoleIndex":
+        """
+        A new index with the rows at `changes` positions set, sharing every bucket they leave alone
+        `replaced` holds the previous rows at positions that already existed
+        """
+        touched: Dict[Tuple[int, str], set] = {}
+        for position, row in replaced.items():
+            key = self._key(row)
+            touched.setdefault(key, set(self.buckets.get(key, ()))).discard(position)
+        for position, row in changes.items():
+            key = self._key(row)
+            touched.setdefault(key, set(self.buckets.get(key, ()))).add(position)
+
+        index = RoleIndex(self.taxonomy)
+        index.buckets = dict(self.buckets)
+        for key, positions in touched.items():
+            if positions:
+                index.buckets[key] = tuple(sorted(positions))
+            else:
+                index.buckets.pop(key, None)
+        return index
+
+    def candidates(self, role: str, difficulty: Optional[str] = None) -> List[int]:
+        """Positions of rows compatible with `role` (and of `difficulty`, if given), in row order"""
+        mask = self.taxonomy.compatible_mask(role)
+        positions = []
+        for (bit, row_difficulty), bucket in self.buckets.items():
+            if bit & mask and (difficulty is None or row_difficulty == difficulty):
+                positions.extend(bucket)
+        positions.sort()
+        return positions
+
+    def _key(self, row: Mapping[str, Any]) -> Tuple[int, str]:
+        return self.taxonomy.bit(row["role_family"]), row.get("difficulty", "")
+
+
+role_taxonomy = RoleTaxonomy(ROLE_HIERARCHY)
@@ -0,0 +1,303 @@
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import settings
+from services.heuristic_scorer import heuristic_scorer
+from services.validation import load_test_cases
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Largest file a submission may write, and most output kept from each of its streams
+SANDBOX_FILE_BYTES = 1024 * 1024
+# Characters of mismatched output or error text kept per test
+MAX_DETAIL_CHARS = 200
+
+# Holds .env and the roster database; no part of it may be visible inside the sandbox
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Unprivileged uid/gid the child runs as, and where its working directory is mounted
+SANDBOX_UID = 65534
+SANDBOX_WORKDIR = "/sandbox"
+# Read-only system directories the interpreter may need; the interpreter's own prefixes are added
+SYSTEM_DIRS = ("/usr", "/lib", "/lib64", "/lib32", "/bin")
+
+# Runs in the sandboxed child, which only ever sees the submission and the test's input.
+# It reads {"limits", "expression"} or {"limits", "stdin"} from stdin, applies the resource limits,
+# then runs the submission: as a module followed by the expression, whose value is written to stdout
+# as JSON, or as a script reading the given stdin. Expected values stay in the parent, which compares.
+RUNNER = r'''
+import contextlib, io, json, os, sys
+request = json.loads(sys.stdin.read())
+limits = request["limits"]
+try:
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, (limits["cpu_seconds"], limits["cpu_seconds"] + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (limits["memory_bytes"], limits["memory_bytes"]))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (limits["file_bytes"], limits["file_bytes"]))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+except (ImportError, ValueError, OSError):
+    pass
+
+try:
+    code = compile(open("submission.py").read(), "submission.py", "exec")
+    if "expression" in request:
+        namespace = {"__name__": "submission"}
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(code, namespace)
+            value = eval(request["expression"], namespace)
+        sys.stdout.write(json.dumps(value, default=repr))
+    else:
+        sys.stdin = io.StringIO(request["stdin"])
+        try:
+            exec(code, {"__name__": "__main__"})
+        except SystemExit as exit:
+            if exit.code not in (None, 0):
+                raise
+    sys.stdout.flush()
+except BaseException as error:
+    sys.stderr.write(f"{type(error).__name__}: {error}")
+    sys.stderr.flush()
+    os._exit(1)
+'''
+
+
+def parse_tests(value: Any) -> List[Dict[str, Any]]:
+    """
+    Test cases of a scenario, from the JSON text of its tests column
+    Uploads reject malformed tests row by row, so anything that still fails to load yields no tests
+    """
+    if isinstance(value, str) and value.strip():
+        try:
+            return load_test_cases(value)
+        except ValueError as e:
+            logger.warning(f"Ignoring scenario tests: {e}")
+    return []
+
+
+class SandboxRunner:
+    """
+    Runs a submission against test cases, one isolated interpreter per case
+    Each case runs under bubblewrap in its own user, PID, network and mount namespaces as an
+    unprivileged uid, seeing only the interpreter, system libraries and the submission; on top of that
+    it gets CPU-time, address-space and file-size limits plus a wall-clock deadline.
+    Without bubblewrap nothing is executed. A thread pool sized to the machine keeps that many
+    cases running at once. The child's verdict is never trusted: it returns raw output and the parent compares.
+    """
+
+    def __init__(self):
+        self.max_workers = settings.sandbox_workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sandbox")
+        self._lock = threading.Lock()
+        self._stats = {"submissions": 0, "cases": 0, "passed": 0, "timeouts": 0}
+        self.bwrap = shutil.which(settings.sandbox_bwrap_path)
+        self.read_only_dirs = self._read_only_dirs()
+        self.unavailable_reason = self._unavailable_reason()
+        if settings.sandbox_enabled and self.unavailable_reason:
+            logger.error(f"Sandbox enabled but test execution is off: {self.unavailable_reason}")
+
+    def run_tests(self, source: str, tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run every case in parallel; Output: pass/fail counts, runtimes and per-case results"""
+        tests = tests[:settings.sandbox_max_tests]
+        if self.unavailable_reason:
+            return {"status": "unavailable", "reason": self.unavailable_reason, "total": len(tests)}
+        start_time = time.time()
+        results = list(self.executor.map(lambda case: self._run_case(source, case), tests))
+        return self._report(tests, results, time.time() - start_time)
+
+    async def run_tests_async(self, source: str, tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.run_tests, source, tests)
+
+    def apply(self, scores: Dict[str, int], report: Optional[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Execution results replace keyword-based correctness with the pass rate and
+        blend the share of cases inside their runtime budget into scalability
+        """
+        if not report or report.get("status") != "completed" or not report["total"]:
+            return scores
+        runtime_score = 25 * report["within_budget"] / report["total"]
+        return {
+            **scores,
+            "correctness": round(25 * report["passed"] / report["total"]),
+            "scalability": round((scores["scalability"] + runtime_score) / 2)
+        }
+
+    def apply_to_evaluation(self, evaluation: Dict[str, Any], report: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """An evaluation result with execution-based scores and totals"""
+        if not report:
+            return evaluation
+        if "error" in evaluation or "scores" not in evaluation:
+            return {**evaluation, "execution": report}
+        scores = self.apply(evaluation["scores"], report)
+        total_score = sum(scores.values())
+        return {
+            **evaluation,
+            "scores": scores,
+            "total_score": total_score,
+            "percentage": (total_score / 100) * 100,
+            "grade": heuristic_scorer.grade(total_score),
+            "execution": report
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "workers": self.max_workers, "available": not self.unavailable_reason}
+
+    def _read_only_dirs(self) -> List[str]:
+        prefixes = (sys.prefix, sys.base_prefix, sys.exec_prefix, sys.base_exec_prefix)
+        dirs = [path for path in SYSTEM_DIRS if os.path.isdir(path)]
+        for prefix in (os.path.realpath(path) for path in prefixes):
+            if prefix not in dirs:
+                dirs.append(prefix)
+        return dirs
+
+    def _unavailable_reason(self) -> Optional[str]:
+        if not self.bwrap:
+            return f"bubblewrap ({settings.sandbox_bwrap_path}) not found"
+        for path in self.read_only_dirs:
+            if BACKEND_DIR.is_relative_to(path):
+                return f"the interpreter prefix {path} contains the backend directory"
+        return None
+
+    def _command(self, workdir: str) -> List[str]:
+        """The bubblewrap command line running RUNNER with workdir as its only writable directory"""
+        command = [
+            self.bwrap,
+            "--unshare-all", "--unshare-user",
+            "--uid", str(SANDBOX_UID), "--gid", str(SANDBOX_UID),
+            "--cap-drop", "ALL",
+            "--die-with-parent", "--new-session", "--clearenv",
+            "--dev", "/dev", "--tmpfs", "/tmp"
+        ]
+        for path in self.read_only_dirs:
+            command += ["--ro-bind", path, path]
+        command += ["--bind", workdir, SANDBOX_WORKDIR, "--chdir", SANDBOX_WORKDIR]
+        return command + ["--", sys.executable, "-I", "-S", "-c", RUNNER]
+
+    def _run_case(self, source: str, case: Dict[str, Any]) -> Dict[str, Any]:
+        limits = {
+            "cpu_seconds": settings.sandbox_cpu_seconds,
+            "memory_bytes": settings.sandbox_memory_mb * 1024 * 1024,
+            "file_bytes": SANDBOX_FILE_BYTES
+        }
+        # Only the test's input crosses to the child
+        if "expression" in case:
+            request = {"limits": limits, "expression": case["expression"]}
+        else:
+            request = {"limits": limits, "stdin": str(case.get("stdin", ""))}
+
+        # Output goes to unnamed files the parent opened, so it is bounded by the file-size limit
+        # and the child's working directory holds nothing but the submission
+        with tempfile.TemporaryDirectory(prefix="sandbox-") as workdir, \
+                tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            with open(os.path.join(workdir, "submission.py"), "w", encoding="utf-8") as handle:
+                handle.write(source)
+
+            # Own session so bubblewrap can be killed as a group; it takes the namespaces down with it
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                self._command(workdir),
+                cwd=workdir,
+                env={},
+                stdin=subprocess.PIPE,
+                stdout=stdout,
+                stderr=stderr,
+                start_new_session=True
+            )
+            try:
+                process.communicate(json.dumps(request).encode("utf-8"), timeout=settings.sandbox_wall_seconds)
+            except subprocess.TimeoutExpired:
+                self._kill(process)
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                return {"passed": False, "error": f"wall-clock limit of {settings.sandbox_wall_seconds}s exceeded"}
+            runtime_ms = (time.perf_counter() - start) * 1000
+
+            output, error = (self._read(stream) for stream in (stdout, stderr))
+
+        # bubblewrap reports a child killed by a signal as 128 + the signal number
+        returncode = process.returncode
+        if returncode > 128:
+            returncode = 128 - returncode
+        return self._verdict(case, returncode, output, error, runtime_ms)
+
+    def _verdict(self, case: Dict[str, Any], returncode: int, output: str, error: str, runtime_ms: float) -> Dict[str, Any]:
+        """Compare a child's raw output with the case's expected value"""
+        if returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+            return {"passed": False, "error": f"CPU limit of {settings.sandbox_cpu_seconds}s exceeded"}
+        if returncode == -signal.SIGXFSZ:
+            return {"passed": False, "error": f"output limit of {SANDBOX_FILE_BYTES} bytes exceeded"}
+        if returncode != 0:
+            message = error.strip().splitlines()[-1] if error.strip() else f"sandbox exited with status {returncode}"
+            return {"passed": False, "error": message[:MAX_DETAIL_CHARS]}
+
+        if "expression" in case:
+            try:
+                passed = json.loads(output) == case.get("expected")
+            except ValueError:
+                passed = False
+        else:
+            passed = output.strip() == str(case.get("stdout", "")).strip()
+        result = {"passed": passed, "runtime_ms": runtime_ms}
+        if not passed:
+            result["actual"] = output[:MAX_DETAIL_CHARS]
+        return result
+
+    def _read(self, stream) -> str:
+        stream.seek(0)
+        return stream.read(SANDBOX_FILE_BYTES).decode("utf-8", errors="replace")
+
+    def _kill(self, process: subprocess.Popen):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+        process.wait()
+
+    def _report(self, tests: List[Dict[str, Any]], results: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+        cases = []
+        within_budget = 0
+        for index, (case, result) in enumerate(zip(tests, results)):
+            budget = float(case.get("max_ms", settings.sandbox_runtime_budget_ms))
+            runtime = result.get("runtime_ms")
+            if result["passed"] and runtime is not None and runtime <= budget:
+                within_budget += 1
+            cases.append({
+                "name": case.get("name", f"test {index + 1}"),
+                "passed": result["passed"],
+                "runtime_ms": round(runtime, 3) if runtime is not None else None,
+                **{key: result[key] for key in ("actual", "error") if key in result}
+            })
+
+        passed = sum(1 for case in cases if case["passed"])
+        runtimes = [case["runtime_ms"] for case in cases if case["runtime_ms"] is not None]
+        with self._lock:
+            self._stats["submissions"] += 1
+            self._stats["cases"] += len(cases)
+            self._stats["passed"] += passed
+        logger.info(f"Sandbox ran {len(cases)} test cases: {passed} passed in {wall_time:.2f}s")
+        return {
+            "status": "completed",
+            "total": len(cases),
+            "passed": passed,
+            "failed": len(cases) - passed,
+            "within_budget": within_budget,
+            "runtime_ms": {
+                "total": round(sum(runtimes), 3),
+                "max": round(max(runtimes, default=0.0), 3)
+            },
+            "wall_time_seconds": round(wall_time, 3),
+            "tests": cases
+        }
+
+
+sandbox_runner = SandboxRunner()
@@ -0,0 +1,89 @@
+from services.role_taxonomy import role_taxonomy
+from typing import Any, Dict, List
+
+OUTDATED_KEYWORDS = [
+    "flash", "internet explorer", "jquery", "php4", "python2",
+    "angularjs", "bootstrap3", "mysql5", "node8"
+]
+
+# Fields derived from a scenario's text once, when it enters the catalog
+DERIVED_FIELDS = ("requirements", "deliverables", "criteria", "role_family", "outdated")
+
+
+def is_outdated(scenario: Dict[str, Any]) -> bool:
+    """Check for outdated technologies in the task or context"""
+    task_lower = scenario.get("task", "").lower()
+    context_lower = scenario.get("context", "").lower()
+    return any(keyword in task_lower or keyword in context_lower for keyword in OUTDATED_KEYWORDS)
+
+
+def parse_requirements(task: str) -> List[str]:
+    """Extract requirements from task description"""
+    task_lower = task.lower()
+    requirements = []
+    if "responsive" in task_lower:
+        requirements.append("Mobile responsive design")
+    if "api" in task_lower:
+        requirements.append("RESTful API design")
+    if "database" in task_lower:
+        requirements.append("Database integration")
+    if "secure" in task_lower or "auth" in task_lower:
+        requirements.append("Security implementation")
+
+    # Add default requirements if none found
+    if not requirements:
+        requirements = ["Follow industry best practices", "Clean code structure"]
+
+    return requirements
+
+
+def deliverables_from_context(context: str) -> List[str]:
+    """Generate deliverables based on context"""
+    context_lower = context.lower()
+    deliverables = ["Working solution"]
+
+    if "web" in context_lower:
+        deliverables.append("Deployed web application")
+    if "api" in context_lower:
+        deliverables.append("API documentation")
+    if "data" in context_lower:
+        deliverables.append("Data analysis report")
+
+    deliverables.append("Code documentation")
+    return deliverables
+
+
+def criteria_from_task(task: str) -> List[str]:
+    """Generate evaluation criteria from task"""
+    task_lower = task.lower()
+    criteria = ["Functionality", "Code quality"]
+
+    if "ui" in task_lower or "frontend" in task_lower:
+        criteria.append("User interface design")
+    if "performance" in task_lower:
+        criteria.append("Performance optimization")
+    if "scale" in task_lower:
+        criteria.append("Scalability")
+
+    criteria.append("Documentation quality")
+    return criteria
+
+
+def enrich_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the derived fields in place; lists a scenario already carries are kept"""
+    if not scenario.get("requirements"):
+        scenario["requirements"] = parse_requirements(scenario.get("task", ""))
+    if not scenario.get("deliverables"):
+        scenario["deliverables"] = deliverables_from_context(scenario.get("context", ""))
+    if not scenario.get("criteria"):
+        scenario["criteria"] = criteria_from_task(scenario.get("task", ""))
+    scenario["role_family"] = role_taxonomy.family(scenario.get("role", ""))
+    scenario["outdated"] = is_outdated(scenario)
+    return scenario
+
+
+def derived(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived fields of a scenario, computed only for rows that predate ingest-time enrichment"""
+    if all(field in scenario for field in DERIVED_FIELDS):
+        return {field: scenario[field] for field in DERIVED_FIELDS}
+    return {field: value for field, value in enrich_scenario(dict(scenario)).items() if field in DERIVED_FIELDS}
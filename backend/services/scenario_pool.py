@@ -0,0 +1,102 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import settings
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str]
+
+
+class ScenarioPool:
+    """Bounded per-(role, skill_level) buffers of pre-generated scenarios, refilled in the background"""
+
+    def __init__(self, generator: Callable[[str, str, int], List[Dict[str, Any]]],
+                 validator: Callable[[Dict[str, Any]], bool],
+                 available: Callable[[], bool] = lambda: True):
+        self.generator = generator
+        self.validator = validator
+        # Refills are skipped while this says the generator's provider is unhealthy
+        self.available = available
+        self.capacity = settings.scenario_pool_capacity
+        self.low_water = settings.scenario_pool_low_water
+        self.batch_size = settings.scenario_pool_batch_size
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="scenario-pool")
+        self._buffers: Dict[PoolKey, deque] = {}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._stats = {"served": 0, "misses": 0, "generated": 0, "rejected": 0, "refills_skipped": 0}
+
+    def take(self, role: str, skill_level: str, count: int) -> List[Dict[str, Any]]:
+        """Pop up to `count` ready scenarios; schedules a refill when the buffer runs low"""
+        key = self._key(role, skill_level)
+        with self._lock:
+            buffer = self._buffers.setdefault(key, deque())
+            scenarios = [buffer.popleft() for _ in range(min(count, len(buffer)))]
+            self._stats["served"] += len(scenarios)
+            self._stats["misses"] += count - len(scenarios)
+            low = len(buffer) < self.low_water
+
+        if low:
+            self.request_refill(role, skill_level)
+        return scenarios
+
+    def request_refill(self, role: str, skill_level: str):
+        """Start a background refill unless one is already running for this key or the provider is shedding"""
+        key = self._key(role, skill_level)
+        if not self.available():
+            with self._lock:
+                self._stats["refills_skipped"] += 1
+            return
+        with self._lock:
+            if key in self._refilling:
+                return
+            self._refilling.add(key)
+        self.executor.submit(self._refill, key)
+
+    def warm(self, keys: List[PoolKey]):
+        """Pre-fill buffers, e.g. for the role/level pairs expected in a class session"""
+        for role, skill_level in keys:
+            self.request_refill(role, skill_level)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "buffers": {f"{role}:{level}": len(buffer) for (role, level), buffer in self._buffers.items()},
+                "refilling": len(self._refilling)
+            }
+
+    def _refill(self, key: PoolKey):
+        role, skill_level = key
+        try:
+            while True:
+                with self._lock:
+                    buffer = self._buffers.setdefault(key, deque())
+                    needed = min(self.batch_size, self.capacity - len(buffer))
+                    known_tasks = {scenario.get("task", "") for scenario in buffer}
+                if needed <= 0:
+                    break
+
+                batch = self.generator(role, skill_level, needed)
+                accepted = [s for s in batch if self.validator(s) and s.get("task", "") not in known_tasks]
+                with self._lock:
+                    self._buffers[key].extend(accepted[:self.capacity - len(self._buffers[key])])
+                    self._stats["generated"] += len(accepted)
+                    self._stats["rejected"] += len(batch) - len(accepted)
+
+                if not accepted:
+                    # Provider unhealthy or producing junk: stop and let the next take() retry
+                    logger.warning(f"Scenario pool refill for {role}:{skill_level} produced no valid scenarios")
+                    break
+            logger.info(f"Scenario pool for {role}:{skill_level} holds {len(self._buffers[key])} scenarios")
+        except Exception as e:
+            logger.error(f"Scenario pool refill for {role}:{skill_level} failed: {e}")
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def _key(self, role: str, skill_level: str) -> PoolKey:
+        return role.lower(), skill_level.lower()
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Longest a waiting caller sleeps before checking whether it was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+
+class WaitAbandoned(TimeoutError):
+    """A caller stopped waiting for a shared call: its own deadline passed or it was cancelled"""
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one in-flight execution"""
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], T], deadline: Optional[float] = None,
+           cancelled: Optional[threading.Event] = None) -> T:
+        """
+        Run `fn` for `key`, or wait for the call already running for it and share its result
+        A waiting caller gives up with WaitAbandoned at its own `deadline` (a time.monotonic value)
+        or once `cancelled` is set; the shared call carries on for the others
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            logger.debug(f"Coalesced call onto in-flight request {key}")
+            return self._wait(future, deadline, cancelled)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            # Later callers start a fresh call; results are shared only while in flight
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _wait(self, future: Future, deadline: Optional[float], cancelled: Optional[threading.Event]) -> T:
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise WaitAbandoned("cancelled while waiting for a shared call")
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                raise WaitAbandoned("deadline passed while waiting for a shared call")
+            if cancelled is not None:
+                timeout = CANCEL_POLL_SECONDS if timeout is None else min(timeout, CANCEL_POLL_SECONDS)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                if future.done():
+                    # The shared call itself raised a timeout
+                    raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._in_flight)}
@@ -0,0 +1,112 @@
+from config.settings import settings
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+STUDENT_FIELDS = ("id", "name", "role", "skill_level", "email")
+
+# Relative roster paths resolve here rather than against the working directory
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def resolve_path(db_path: str) -> Path:
+    path = Path(db_path).expanduser()
+    return path if path.is_absolute() else BACKEND_DIR / path
+
+
+class StudentRoster:
+    """
+    Student profiles indexed by id and email
+    Lookups are served from memory; every change is also written to SQLite so the roster survives restarts
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = resolve_path(db_path)
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_email: Dict[str, str] = {}
+        self._write_lock = threading.Lock()
+        self._connection = None
+        self._loaded = False
+
+    def get(self, student_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        student = self._by_id.get(str(student_id))
+        return dict(student) if student else None
+
+    def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        student_id = self._by_email.get(email.strip().lower())
+        return self.get(student_id) if student_id else None
+
+    def upsert(self, students: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Add new students and update changed ones by id; returns counts"""
+        self._ensure_loaded()
+        delta = {"added": 0, "updated": 0, "unchanged": 0}
+        changed = []
+        with self._write_lock:
+            for student in students:
+                record = {field: str(student.get(field, "") or "") for field in STUDENT_FIELDS}
+                existing = self._by_id.get(record["id"])
+                if existing == record:
+                    delta["unchanged"] += 1
+                    continue
+                delta["updated" if existing else "added"] += 1
+                if existing and existing["email"]:
+                    self._by_email.pop(existing["email"].lower(), None)
+                self._index(record)
+                changed.append(record)
+
+            if changed and self._connection is not None:
+                with self._connection:
+                    self._connection.executemany(
+                        f"INSERT OR REPLACE INTO students ({', '.join(STUDENT_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                        [tuple(record[field] for field in STUDENT_FIELDS) for record in changed]
+                    )
+
+        logger.info(f"Student roster upserted: {delta}. Total: {len(self._by_id)}")
+        return delta
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        return {"students": len(self._by_id), "persistent": self._connection is not None, "path": str(self.db_path)}
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._by_id)
+
+    def _ensure_loaded(self):
+        """Open the database and load every student on first use, so importing the module touches no files"""
+        if self._loaded:
+            return
+        with self._write_lock:
+            if self._loaded:
+                return
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS students "
+                    "(id TEXT PRIMARY KEY, name TEXT, role TEXT, skill_level TEXT, email TEXT)"
+                )
+                self._connection.execute("CREATE INDEX IF NOT EXISTS students_email ON students (email)")
+                self._connection.commit()
+                for row in self._connection.execute(f"SELECT {', '.join(STUDENT_FIELDS)} FROM students"):
+                    self._index(dict(zip(STUDENT_FIELDS, row)))
+                logger.info(f"Student roster loaded {len(self._by_id)} students from {self.db_path}")
+            except Exception as e:
+                # Keep serving from memory; the roster just won't persist
+                logger.error(f"Student roster persistence unavailable: {e}")
+                self._connection = None
+            self._loaded = True
+
+    def _index(self, record: Dict[str, Any]):
+        self._by_id[record["id"]] = record
+        if record["email"]:
+            self._by_email[record["email"].lower()] = record["id"]
+
+
+student_roster = StudentRoster(settings.student_roster_path)
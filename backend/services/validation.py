@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import json
+import numpy as np
+import pandas as pd
+
+DIFFICULTY_LEVELS = ("beginner", "intermediate", "advanced")
+RESOURCE_TYPES = ("course", "tutorial", "documentation", "project", "practice", "exercise", "book")
+
+# Estimated study hours per resource type
+RESOURCE_TYPE_HOURS = {"course": 20, "tutorial": 5, "documentation": 3, "project": 15, "practice": 8, "book": 30}
+DEFAULT_RESOURCE_HOURS = 10
+
+# Rows listed individually in a report; the counts always cover every row
+MAX_REPORTED_ROWS = 100
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """How one column is cleaned and checked"""
+    name: str
+    required: bool = False
+    default: str = ""
+    allowed: Optional[Tuple[str, ...]] = None
+    lowercase: bool = False
+    # Checks one non-empty value; returns an error message, or "" if the value is fine
+    check: Optional[Callable[[str], str]] = None
+
+
+def load_test_cases(text: str) -> List[Dict[str, Any]]:
+    """
+    Test cases from a scenario's tests JSON: a list of {"name", "expression", "expected"} or
+    {"name", "stdin", "stdout"} objects, optionally with "max_ms"; ValueError says what is wrong
+    """
+    try:
+        cases = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}") from None
+    if not isinstance(cases, list):
+        raise ValueError("expected a JSON list of test cases")
+    for number, case in enumerate(cases, 1):
+        if not isinstance(case, dict):
+            raise ValueError(f"test {number} is not an object")
+        if not ({"expression", "expected"} <= case.keys() or {"stdin", "stdout"} <= case.keys()):
+            raise ValueError(f"test {number} needs expression and expected, or stdin and stdout")
+    return cases
+
+
+def check_test_cases(text: str) -> str:
+    try:
+        load_test_cases(text)
+    except ValueError as e:
+        return str(e)
+    return ""
+
+
+SCENARIO_SPEC = (
+    ColumnSpec("role", required=True),
+    ColumnSpec("title", required=True),
+    ColumnSpec("task", required=True),
+    ColumnSpec("difficulty", default="beginner", allowed=DIFFICULTY_LEVELS, lowercase=True),
+    ColumnSpec("context"),
+    ColumnSpec("tests", check=check_test_cases),  # Optional JSON list of test cases, run against Python submissions
+)
+
+STUDENT_SPEC = (
+    ColumnSpec("id", required=True),
+    ColumnSpec("name", required=True),
+    ColumnSpec("role"),
+    ColumnSpec("skill_level", default="beginner", allowed=DIFFICULTY_LEVELS, lowercase=True),
+    ColumnSpec("email"),
+)
+
+TRAINING_RESOURCE_SPEC = (
+    ColumnSpec("title", required=True),
+    ColumnSpec("type", default="course", allowed=RESOURCE_TYPES, lowercase=True),
+    ColumnSpec("description"),
+    ColumnSpec("url"),
+    ColumnSpec("skills"),
+)
+
+
+def resource_hours(resource: Mapping[str, Any]) -> int:
+    return RESOURCE_TYPE_HOURS.get(str(resource.get("type", "course")).lower(), DEFAULT_RESOURCE_HOURS)
+
+
+def empty_report() -> Dict[str, Any]:
+    return {"total_rows": 0, "accepted": 0, "rejected": 0, "missing_columns": [], "errors": [], "errors_truncated": False}
+
+
+def _first(messages: pd.Series, later: pd.Series) -> pd.Series:
+    """Keep existing messages, fill the empty cells from a later check"""
+    return messages.where(messages != "", later)
+
+
+def validate_frame(df: pd.DataFrame, spec: Tuple[ColumnSpec, ...], row_offset: int = 0) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Clean and check whole columns at once; valid rows are accepted, invalid ones reported
+    Output: accepted records, report with per-row errors (row numbers are 1-based data rows)
+    """
+    report = empty_report()
+    report["total_rows"] = len(df)
+    report["missing_columns"] = [column.name for column in spec if column.required and column.name not in df.columns]
+
+    clean = pd.DataFrame(index=df.index)
+    problems: Dict[str, pd.Series] = {}
+    for column in spec:
+        values = df[column.name] if column.name in df.columns else pd.Series("", index=df.index)
+        values = values.astype("string").fillna("").str.strip()
+        values = values.mask(values == "", column.default)
+        if column.lowercase:
+            values = values.str.lower()
+
+        # One message per cell: the first failing check wins
+        messages = pd.Series("", index=df.index, dtype=object)
+        if column.required:
+            messages = _first(messages, pd.Series(np.where(values == "", "missing value", ""), index=df.index))
+        if column.allowed:
+            invalid = ~values.isin(column.allowed)
+            message = "expected one of " + ", ".join(column.allowed)
+            messages = _first(messages, pd.Series(np.where(invalid, message, ""), index=df.index))
+        if column.check:
+            # Only filled-in values are checked, one by one
+            filled = values != ""
+            checked = pd.Series("", index=df.index, dtype=object)
+            checked[filled] = values[filled].map(column.check).astype(object)
+            messages = _first(messages, checked)
+        if column.required or column.allowed or column.check:
+            problems[column.name] = messages
+        clean[column.name] = values.astype(object)
+
+    rejected = np.zeros(len(df), dtype=bool)
+    for messages in problems.values():
+        rejected |= (messages != "").to_numpy()
+
+    # Only the failing rows are visited one by one
+    for position in np.flatnonzero(rejected):
+        if len(report["errors"]) >= MAX_REPORTED_ROWS:
+            report["errors_truncated"] = True
+            break
+        report["errors"].append({
+            "row": row_offset + int(position) + 1,
+            "errors": {name: messages.iat[position] for name, messages in problems.items() if messages.iat[position]}
+        })
+
+    report["rejected"] = int(rejected.sum())
+    report["accepted"] = len(df) - report["rejected"]
+    return clean[~rejected].to_dict("records"), report
+
+
+def merge_reports(total: Dict[str, Any], part: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the report of one batch into a running report"""
+    for key in ("total_rows", "accepted", "rejected"):
+        total[key] += part[key]
+    total["missing_columns"] = sorted(set(total["missing_columns"]) | set(part["missing_columns"]))
+    room = MAX_REPORTED_ROWS - len(total["errors"])
+    total["errors"].extend(part["errors"][:room])
+    total["errors_truncated"] = total["errors_truncated"] or part["errors_truncated"] or len(part["errors"]) > room
+    return total
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Services import as top-level packages from the backend directory, as they do under uvicorn
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings requires these; tests never reach the real services
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("WEAVIATE_URL", "http://localhost:8080")
+os.environ.setdefault("WEAVIATE_API_KEY", "test")
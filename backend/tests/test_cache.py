@@ -0,0 +1,58 @@
+import time
+
+from services.cache import EvaluationCache, TTLCache, content_hash, normalize_submission
+
+STUDENT = {"role": "Backend Developer", "skill_level": "intermediate"}
+
+
+def test_reflowed_spacing_hashes_the_same():
+    assert content_hash("SELECT  *\n\nFROM users;  ") == content_hash("SELECT *\nFROM users;")
+
+
+def test_indentation_changes_the_hash():
+    nested = "def f(x):\n    if x:\n        return 1\n    return 2\n"
+    flattened = "def f(x):\n    if x:\n        return 1\n        return 2\n"
+    assert normalize_submission(nested) != normalize_submission(flattened)
+    assert content_hash(nested) != content_hash(flattened)
+
+
+def test_exact_hash_distinguishes_any_whitespace():
+    assert content_hash("print('a  b')") == content_hash("print('a b')")
+    assert content_hash("print('a  b')", exact=True) != content_hash("print('a b')", exact=True)
+
+
+def test_file_order_does_not_matter():
+    files = [{"filename": "b.py", "content": "b = 2"}, {"filename": "a.py", "content": "a = 1"}]
+    assert content_hash("", files) == content_hash("", list(reversed(files)))
+
+
+def test_catalog_change_invalidates_keys_and_entries():
+    cache = EvaluationCache("v1")
+    key = cache.key("s1", STUDENT, "answer", [], "heuristic")
+    cache.set(key, {"status": "completed"})
+    assert cache.get(key) == {"status": "completed"}
+
+    cache.invalidate_catalog()
+    assert cache.get(key) is None
+    assert cache.key("s1", STUDENT, "answer", [], "heuristic") != key
+
+
+def test_key_covers_role_level_and_mode():
+    cache = EvaluationCache("v1")
+    key = cache.key("s1", STUDENT, "answer", [], "heuristic")
+    assert key != cache.key("s1", {**STUDENT, "skill_level": "advanced"}, "answer", [], "heuristic")
+    assert key != cache.key("s1", STUDENT, "answer", [], "cascade")
+    assert cache.key("s1", STUDENT, "x  = 1", [], "heuristic") != cache.key("s1", STUDENT, "x  = 1", [], "heuristic", exact=True)
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
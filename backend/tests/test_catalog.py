@@ -0,0 +1,94 @@
+from services import columnar
+from services.catalog import Catalog
+from services.columnar import ColumnarTable, TableSchema
+
+SCHEMA = TableSchema(categorical=("kind",), strings=("name",), lists=("tags",), flags=("active",))
+
+
+def scenario(title, task, role="Backend Developer", difficulty="beginner"):
+    return {
+        "title": title, "role": role, "difficulty": difficulty, "task": task,
+        "context": "", "requirements": "Use SQL", "deliverables": "Schema", "criteria": "Correct"
+    }
+
+
+def resource(url, title, kind="course"):
+    return {"title": title, "type": kind, "description": "SQL indexing", "url": url, "skills": "sql"}
+
+
+def test_upsert_adds_updates_and_skips_unchanged_rows():
+    catalog = Catalog()
+    delta = catalog.upsert_scenarios([scenario("Orders", "Design tables"), scenario("Users", "Add auth")])
+    assert len(delta["added"]) == 2
+    first = catalog.snapshot
+
+    delta = catalog.upsert_scenarios([scenario("Orders", "Design tables"), scenario("Users", "Add OAuth")])
+    assert (len(delta["added"]), len(delta["updated"]), delta["unchanged"]) == (0, 1, 1)
+    second = catalog.snapshot
+    assert len(second.scenarios) == 2
+    assert second.version == first.version + 1
+    # The previous version is untouched
+    assert first.scenarios[1]["task"] == "Add auth"
+    assert second.scenarios[1]["task"] == "Add OAuth"
+
+    delta = catalog.upsert_scenarios([scenario("Orders", "Design tables")])
+    assert delta["unchanged"] == 1
+    assert catalog.snapshot is second
+
+
+def test_scenario_indexes_follow_updates():
+    catalog = Catalog()
+    catalog.upsert_scenarios([scenario("Orders", "Design tables"), scenario("Dashboards", "Chart it", role="Data Analyst")])
+    old_id = catalog.snapshot.scenarios[0]["id"]
+
+    catalog.upsert_scenarios([scenario("Orders", "Design normalized tables", difficulty="advanced")])
+    snapshot = catalog.snapshot
+    new_id = snapshot.scenarios[0]["id"]
+    assert new_id != old_id
+    assert snapshot.find_scenario(old_id) is None
+    assert snapshot.find_scenario(new_id)["task"] == "Design normalized tables"
+    assert [row["title"] for row in snapshot.candidates("Backend Developer", "advanced")] == ["Orders"]
+    assert snapshot.candidates("Backend Developer", "beginner") == []
+    assert [row["title"] for row in snapshot.candidates("Data Analyst")] == ["Dashboards"]
+
+
+def test_reingesting_a_file_applies_again_after_another_upload_changed_the_catalog():
+    catalog = Catalog()
+    file_a = [resource("https://x/1", "Indexing basics")]
+    file_b = [resource("https://x/1", "Indexing in depth")]
+
+    catalog.upsert_training_resources(file_a)
+    catalog.mark_file_ingested("training_resources", "a")
+    assert catalog.is_file_ingested("training_resources", "a")
+
+    catalog.upsert_training_resources(file_b)
+    catalog.mark_file_ingested("training_resources", "b")
+    assert not catalog.is_file_ingested("training_resources", "a")
+
+    delta = catalog.upsert_training_resources(file_a)
+    assert len(delta["updated"]) == 1
+    assert catalog.snapshot.training_resources[0]["title"] == "Indexing basics"
+
+
+def test_scenario_upload_does_not_reset_resource_file_digests():
+    catalog = Catalog()
+    catalog.upsert_training_resources([resource("https://x/1", "Indexing basics")])
+    catalog.mark_file_ingested("training_resources", "a")
+    catalog.upsert_scenarios([scenario("Orders", "Design tables")])
+    assert catalog.is_file_ingested("training_resources", "a")
+
+
+def test_table_upsert_shares_untouched_chunks(monkeypatch):
+    monkeypatch.setattr(columnar, "CHUNK_ROWS", 4)
+    rows = [{"kind": f"k{i % 3}", "name": f"row {i}", "tags": ["a", "b"], "active": i % 2} for i in range(10)]
+    table = ColumnarTable(SCHEMA, rows)
+    assert [len(chunk) for chunk in table.chunks] == [4, 4, 2]
+
+    updated = table.upsert({5: {**rows[5], "name": "changed"}}, [{"kind": "new", "name": "row 10", "tags": [], "active": 1}] * 3)
+    assert updated.chunks[0] is table.chunks[0]
+    assert updated.chunks[1] is not table.chunks[1]
+    assert [len(chunk) for chunk in updated.chunks] == [4, 4, 4, 1]
+    assert updated[5]["name"] == "changed"
+    assert table[5]["name"] == "row 5"
+    assert updated[12] == {"kind": "new", "name": "row 10", "tags": [], "active": True}
+    assert [row["kind"] for row in updated][:4] == ["k0", "k1", "k2", "k0"]
@@ -0,0 +1,26 @@
+from services.challenge_prefetcher import ChallengePrefetcher
+
+PROFILE = {"skill_level": "beginner", "role": "backend"}
+SCENARIO = {"id": "scn-1", "task": "Build an API"}
+
+
+def fallback(scenario, profile):
+    return {"scenario_id": scenario["id"], "adapted_task": scenario["task"], "adapted": False}
+
+
+def test_failed_adaptation_serves_the_fallback_without_caching_it():
+    def adapter(scenario, profile):
+        raise RuntimeError("provider down")
+
+    prefetcher = ChallengePrefetcher(adapter, fallback)
+    assert prefetcher.get(SCENARIO, PROFILE) == fallback(SCENARIO, PROFILE)
+    assert prefetcher.get_cached("scn-1", PROFILE) is None
+
+
+def test_only_real_adaptations_are_cached():
+    results = iter([fallback(SCENARIO, PROFILE), {"adapted_task": "Adapted", "adapted": True}])
+    prefetcher = ChallengePrefetcher(lambda scenario, profile: next(results), fallback)
+
+    assert prefetcher.get(SCENARIO, PROFILE)["adapted"] is False
+    assert prefetcher.get(SCENARIO, PROFILE)["adapted"] is True
+    assert prefetcher.get_cached("scn-1", PROFILE)["adapted_task"] == "Adapted"
@@ -0,0 +1,38 @@
+import pytest
+
+from services.code_analysis import CodeAnalysisEngine
+
+
+@pytest.fixture
+def engine():
+    engine = CodeAnalysisEngine()
+    engine.timeout = 30.0
+    yield engine
+    engine.shutdown()
+
+
+def test_dead_idle_worker_is_replaced(engine):
+    assert engine.analyze("def first():\n    return 1\n")["functions"] == 1
+    [worker] = engine._idle
+    worker.process.kill()
+    worker.process.join()
+
+    assert engine.analyze("def second():\n    return 2\n")["functions"] == 1
+    assert engine.stats()["worker_restarts"] == 1
+    assert engine._idle[0] is not worker
+
+
+def test_timeout_stops_only_its_worker_and_is_remembered(engine):
+    assert engine.analyze("x = 1\n") is not None
+    [warm] = engine._idle
+
+    slow = "".join(f"def f{index}(a, b):\n    return a if a > b else b\n" for index in range(20000))
+    engine.timeout = 0.001
+    assert engine._submit(engine.key(slow), slow).result(timeout=30) == {"error": "timed out after 0.001s"}
+    assert not warm.process.is_alive()
+    assert engine.stats()["timeouts"] == 1
+    assert engine.cached(slow) is None
+
+    engine.timeout = 30.0
+    assert engine.analyze("y = 2\n") is not None
+    assert engine._idle[0].process.is_alive()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+
+from services.llm_governor import CircuitBreaker, LLMGovernor, LLMUnavailableError, TokenBucket
+
+
+def make_governor(**overrides):
+    options = dict(
+        requests_per_minute=600, tokens_per_minute=100000, max_concurrency=2, max_retries=2,
+        request_deadline=2.0, failure_threshold=2, recovery_timeout=60.0, base_backoff=0.0, max_backoff=0.0
+    )
+    options.update(overrides)
+    return LLMGovernor(**options)
+
+
+def failing(error):
+    def fn():
+        raise error
+    return fn
+
+
+def test_token_bucket_takes_until_empty_then_gives_up_at_deadline():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    deadline = time.monotonic() + 0.1
+    assert bucket.acquire(1, deadline)
+    assert bucket.acquire(1, deadline)
+    # The next token is a second away, past the deadline
+    assert not bucket.acquire(1, deadline)
+
+
+def test_token_bucket_caps_oversized_requests_at_capacity():
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    assert bucket.acquire(50, time.monotonic())
+
+
+def test_token_bucket_async_waits_without_blocking_the_loop():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1)
+
+    async def run():
+        assert await bucket.acquire_async(1, time.monotonic() + 1)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        acquired, _ = await asyncio.gather(bucket.acquire_async(1, time.monotonic() + 1), ticker())
+        return acquired, ticks
+
+    acquired, ticks = asyncio.run(run())
+    assert acquired
+    assert len(ticks) == 5
+
+
+def test_breaker_opens_after_threshold_and_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_retryable_errors_are_retried_then_open_the_breaker():
+    governor = make_governor()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        raise RuntimeError("503 unavailable")
+
+    with pytest.raises(RuntimeError):
+        governor.call(flaky)
+    # The second failure reaches the threshold, so the breaker stops the third attempt
+    assert len(attempts) == 2
+    assert governor.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(LLMUnavailableError):
+        governor.call(lambda: "ok")
+
+
+def test_non_retryable_error_resets_the_failure_streak():
+    governor = make_governor(failure_threshold=3, max_retries=0)
+    with pytest.raises(RuntimeError):
+        governor.call(failing(RuntimeError("503 unavailable")))
+    assert governor.breaker.consecutive_failures == 1
+
+    with pytest.raises(ValueError):
+        governor.call(failing(ValueError("400 invalid argument")))
+    assert governor.breaker.consecutive_failures == 0
+    assert governor.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_async_retries_and_returns_the_result():
+    governor = make_governor()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("429 rate limit")
+        return "ok"
+
+    assert asyncio.run(governor.call_async(flaky)) == "ok"
+    assert len(attempts) == 2
+    assert governor.stats()["retries"] == 1
+    # Both attempts gave their concurrency slot back
+    assert governor.semaphore._value == 2
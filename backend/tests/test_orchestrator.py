@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.llm_governor import LLMGovernor, LLMUnavailableError
+from services.orchestrator import PipelineOrchestrator, Stage
+
+
+def run(stages, deadline=5.0):
+    return asyncio.run(PipelineOrchestrator(max_workers=4).run(stages, deadline=deadline))
+
+
+def test_independent_stages_run_concurrently_and_dependents_see_results():
+    def slow(value):
+        def func(results, context):
+            time.sleep(0.1)
+            return value
+        return func
+
+    outcome = run([
+        Stage("a", slow(1)),
+        Stage("b", slow(2)),
+        Stage("sum", lambda results, context: results["a"] + results["b"], depends_on=["a", "b"])
+    ])
+    assert outcome["results"]["sum"] == 3
+    assert outcome["total_time"] < 0.19
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        run([Stage("a", lambda r, c: 1, depends_on=["b"]), Stage("b", lambda r, c: 1, depends_on=["a"])])
+
+
+def test_timed_out_stage_is_flagged_and_falls_back_off_the_loop():
+    seen = {}
+
+    def stuck(results, context):
+        seen["context"] = context
+        context.cancelled.wait(2)
+
+    def fallback(results):
+        seen["fallback_thread"] = threading.current_thread().name
+        return "basic"
+
+    outcome = run([Stage("slow", stuck, timeout=0.05, fallback=fallback)])
+    assert outcome["stage_status"]["slow"] == "fallback"
+    assert outcome["results"]["slow"] == "basic"
+    assert seen["context"].cancelled.is_set()
+    assert seen["fallback_thread"].startswith("pipeline")
+
+
+def test_deadline_timing_is_measured_from_stage_start():
+    def slow(results, context):
+        time.sleep(0.2)
+        return 1
+
+    def stuck(results, context):
+        context.cancelled.wait(2)
+
+    outcome = run([Stage("first", slow), Stage("second", stuck, depends_on=["first"])], deadline=0.3)
+    assert outcome["stage_status"]["second"] == "deadline_exceeded"
+    assert outcome["stage_timings"]["second"] < 0.2
+
+
+def test_cancelled_stage_stops_making_governed_calls():
+    governor = LLMGovernor(
+        requests_per_minute=600, tokens_per_minute=100000, max_concurrency=2, max_retries=0,
+        request_deadline=5.0, failure_threshold=5, recovery_timeout=60.0
+    )
+    calls = []
+
+    def stage(results, context):
+        context.cancelled.wait(2)
+        try:
+            governor.call(lambda: calls.append(1))
+        except LLMUnavailableError as e:
+            return str(e)
+
+    run([Stage("llm", stage, timeout=0.05)])
+    # The abandoned thread finishes in the background; give it a moment
+    time.sleep(0.1)
+    assert calls == []
+    assert governor.stats()["shed"] == 1
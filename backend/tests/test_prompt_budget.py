@@ -0,0 +1,41 @@
+from services.prompt_budget import prompt_budget
+
+
+def test_text_within_budget_is_unchanged():
+    text, stats = prompt_budget.compact("short answer", 100)
+    assert text == "short answer"
+    assert not stats["truncated"]
+
+
+def test_oversized_text_keeps_head_and_tail_within_budget():
+    text = "".join(f"line {i:04d} of the submission\n" for i in range(2000))
+    compacted, stats = prompt_budget.compact(text, 500, label="response")
+    assert stats["truncated"]
+    assert stats["final_tokens"] <= 500
+    assert compacted.startswith("line 0000")
+    assert compacted.rstrip().endswith("line 1999 of the submission")
+    assert "tokens omitted from response" in compacted
+
+
+def test_budget_smaller_than_the_marker_hard_truncates():
+    text = "x" * 4000
+    compacted, stats = prompt_budget.compact(text, 3, label="a_rather_long_file_name.py")
+    assert compacted == "x" * 12
+    assert stats["final_tokens"] <= 3
+    assert "omitted" not in compacted
+
+
+def test_zero_budget_yields_empty_text():
+    compacted, stats = prompt_budget.compact("some text", 0)
+    assert compacted == ""
+    assert stats["final_tokens"] == 0
+
+
+def test_files_share_the_budget():
+    files = [
+        {"filename": "small.py", "content": "print('hi')\n"},
+        {"filename": "big.py", "content": "x = 1\n" * 5000}
+    ]
+    section, stats = prompt_budget.compact_files(files, 400)
+    assert "print('hi')" in section
+    assert [entry["filename"] for entry in stats["truncated_files"]] == ["big.py"]
@@ -0,0 +1,96 @@
+from services.catalog import RESOURCE_SCHEMA
+from services.columnar import ColumnarTable
+from services.gap_vocabulary import GapVocabulary
+from services.learning_path_planner import LearningPathPlanner, greedy_cover
+from services.relevance_matrix import RelevanceMatrix
+
+
+def resource(title, kind="course", skills="", description=""):
+    return {"title": title, "type": kind, "description": description, "url": f"https://example.com/{title}", "skills": skills}
+
+
+def vocabulary():
+    gaps = GapVocabulary()
+    gaps.register(["SQL", "Testing", "Docker"])
+    return gaps
+
+
+def test_only_registered_gaps_are_interned():
+    gaps = vocabulary()
+    assert gaps.intern("  sql ") == gaps.intern("SQL") == 0
+    assert gaps.intern("quantum computing") is None
+    assert gaps.bits(["testing", "quantum computing"]) == 0b10
+    assert gaps.unknown(["Quantum  computing", "quantum computing", "SQL", ""]) == ["Quantum computing"]
+    assert len(gaps) == 3
+
+
+def test_free_text_follows_known_gaps_without_growing_the_vocabulary():
+    gaps = vocabulary()
+    analysis = {"technical_gaps": ["Kubernetes", "docker", "SQL"], "process_gaps": ["testing"]}
+    lists = gaps.to_lists(gaps.profile_from_analysis(analysis), gaps.free_text(analysis))
+    assert lists == {"technical_gaps": ["SQL", "Docker", "Kubernetes"], "conceptual_gaps": [], "process_gaps": ["Testing"]}
+    assert len(gaps) == 3
+
+
+def test_relevance_ranks_by_field_weight_and_builds_columns_lazily():
+    gaps = vocabulary()
+    table = ColumnarTable(RESOURCE_SCHEMA, [
+        resource("Databases", skills="sql"),
+        resource("SQL in depth"),
+        resource("Query tuning", description="sql plans"),
+        resource("Containers", skills="docker")
+    ])
+    matrix = RelevanceMatrix(table, gaps)
+    assert matrix._gap_columns == {}
+
+    ranked = matrix.recommend(gaps.profile(technical=["SQL"]), "", k=2)
+    assert ranked["immediate"] == [0, 1]
+    assert list(matrix._gap_columns) == [0]
+
+
+def test_cohort_scores_free_text_gaps_without_keeping_columns():
+    gaps = vocabulary()
+    table = ColumnarTable(RESOURCE_SCHEMA, [resource("Kubernetes basics", kind="tutorial"), resource("Docker")])
+    matrix = RelevanceMatrix(table, gaps)
+    students = [("", gaps.profile()), ("", gaps.profile(technical=["docker"]))]
+
+    scores = matrix.cohort_scores(students, [["kubernetes"], []])
+    assert scores[0].tolist() == [2.0, 0.0]
+    assert scores[1].tolist() == [0.0, 2.0]
+    assert list(matrix._gap_columns) == [2]
+
+
+def test_role_columns_are_bounded(monkeypatch):
+    from services import relevance_matrix
+    monkeypatch.setattr(relevance_matrix, "MAX_ROLE_COLUMNS", 2)
+    matrix = RelevanceMatrix(ColumnarTable(RESOURCE_SCHEMA, [resource("Backend APIs")]), vocabulary())
+    for role in ("backend", "frontend", "data", "devops"):
+        matrix.role_column(role)
+    assert len(matrix._role_columns) == 2
+
+
+def test_greedy_cover_prefers_cheap_coverage_and_drops_redundant_picks():
+    options = [(0b011, 10.0, 0), (0b001, 1.0, 1), (0b110, 2.0, 2)]
+    picks, covered = greedy_cover(options)
+    assert covered == 0b111
+    assert sorted(picks) == [1, 2]
+
+
+def test_plan_catalog_and_plan_resources_agree():
+    gaps = vocabulary()
+    resources = [
+        resource("Everything", kind="book", skills="sql testing docker"),
+        resource("SQL", kind="tutorial"),
+        resource("Testing and Docker", kind="documentation")
+    ]
+    planner = LearningPathPlanner(gaps)
+    profile = gaps.profile(technical=["SQL", "Docker"], process=["Testing"])
+
+    plan = planner.plan_catalog(RelevanceMatrix(ColumnarTable(RESOURCE_SCHEMA, resources), gaps), profile)
+    assert sorted(plan["positions"]) == [1, 2]
+    assert plan["estimated_hours"] == 8.0
+    assert plan["uncovered_gaps"] == []
+
+    listed = planner.plan_resources(resources, ["SQL", "Docker", "Testing", "Kubernetes"])
+    assert sorted(listed["positions"]) == [1, 2]
+    assert listed["uncovered_gaps"] == ["Kubernetes"]
@@ -0,0 +1,32 @@
+from services.role_taxonomy import RoleIndex, role_taxonomy
+
+
+def test_markers_match_whole_words():
+    assert role_taxonomy.family("Rapid Prototyping Engineer") == "rapid prototyping engineer"
+    assert role_taxonomy.family("Database Backend Developer") == "backend"
+    assert role_taxonomy.family("REST API Developer") == "backend"
+    assert role_taxonomy.family("Data Analyst") == "data_analyst"
+    assert role_taxonomy.family("Full-Stack Engineer") == "fullstack"
+    assert role_taxonomy.family("Front End Developer") == "frontend"
+
+
+def test_compatibility_follows_the_hierarchy():
+    assert role_taxonomy.is_compatible("backend", "Full Stack Developer")
+    assert role_taxonomy.is_compatible("fullstack", "Backend Developer")
+    assert not role_taxonomy.is_compatible("frontend", "Backend Developer")
+    assert not role_taxonomy.is_compatible("data_analyst", "Backend Developer")
+
+
+def test_index_update_moves_rows_between_buckets():
+    rows = [
+        {"role_family": "backend", "difficulty": "beginner"},
+        {"role_family": "frontend", "difficulty": "beginner"},
+        {"role_family": "backend", "difficulty": "advanced"}
+    ]
+    index = RoleIndex(role_taxonomy, rows)
+    assert index.candidates("Backend Developer") == [0, 2]
+
+    updated = index.updated({1: {"role_family": "backend", "difficulty": "beginner"}}, {1: rows[1]})
+    assert updated.candidates("Backend Developer", "beginner") == [0, 1]
+    assert updated.candidates("Frontend Developer") == []
+    assert index.candidates("Backend Developer") == [0, 2]
@@ -0,0 +1,111 @@
+import json
+import sys
+
+import pytest
+
+from services import sandbox_runner as sandbox_module
+from services.sandbox_runner import BACKEND_DIR, RUNNER, SandboxRunner, parse_tests, sandbox_runner
+
+ADD = "def add(a, b):\n    return a + b\n"
+FORGERY = (
+    "import json, os, sys\n"
+    "cases = [name for name in os.listdir('.') if name != 'submission.py']\n"
+    "open('result.json', 'w').write(json.dumps({'passed': True, 'runtime_ms': 0}))\n"
+    "print(json.dumps({'passed': True, 'found': cases}))\n"
+    "sys.stdout.flush()\n"
+    "os._exit(0)\n"
+)
+ESCAPE = (
+    "import os, socket, sys\n"
+    "def attempt(action):\n"
+    "    try:\n"
+    "        action()\n"
+    "        return 'allowed'\n"
+    "    except OSError:\n"
+    "        return 'denied'\n"
+    f"env = attempt(lambda: open({str(BACKEND_DIR / 'config' / 'settings.py')!r}).read())\n"
+    "net = attempt(lambda: socket.create_connection(('1.1.1.1', 53), timeout=1))\n"
+    "print(env, net, os.getuid())\n"
+)
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    """
+    The shared runner with bubblewrap swapped for a bare interpreter, for checking what the
+    parent makes of the child's output; isolation itself is covered by the bwrap-only test
+    """
+    monkeypatch.setattr(sandbox_runner, "unavailable_reason", None)
+    monkeypatch.setattr(sandbox_runner, "_command", lambda workdir: [sys.executable, "-I", "-S", "-c", RUNNER])
+    return sandbox_runner
+
+
+def test_passing_and_failing_cases(runner):
+    report = runner.run_tests(ADD, [
+        {"name": "adds", "expression": "add(1, 2)", "expected": 3},
+        {"name": "wrong", "expression": "add(1, 1)", "expected": 3},
+        {"name": "missing", "expression": "sub(1, 1)", "expected": 0}
+    ])
+    assert report["total"] == 3 and report["passed"] == 1
+    wrong, missing = report["tests"][1:]
+    assert wrong["actual"] == "2"
+    assert missing["error"].startswith("NameError")
+
+
+def test_io_case_compares_stdout_in_the_parent(runner):
+    source = "n = int(input())\nprint(n * 2)\n"
+    report = runner.run_tests(source, [{"stdin": "21\n", "stdout": "42"}, {"stdin": "1\n", "stdout": "3"}])
+    assert [case["passed"] for case in report["tests"]] == [True, False]
+
+
+def test_submission_cannot_forge_its_verdict_or_see_expected_values(runner):
+    report = runner.run_tests(FORGERY, [
+        {"name": "io", "stdin": "", "stdout": "secret-output"},
+        {"name": "expression", "expression": "1", "expected": 2}
+    ])
+    assert report["passed"] == 0
+    io_case, expression_case = report["tests"]
+    assert json.loads(io_case["actual"])["found"] == []
+    assert "secret-output" not in io_case["actual"]
+    assert expression_case["passed"] is False
+
+
+def test_nothing_runs_without_bubblewrap(monkeypatch):
+    monkeypatch.setattr(sandbox_module.shutil, "which", lambda name: None)
+    runner = SandboxRunner()
+    monkeypatch.setattr(sandbox_module.subprocess, "Popen", lambda *args, **kwargs: pytest.fail("executed without bwrap"))
+
+    report = runner.run_tests(ADD, [{"expression": "add(1, 2)", "expected": 3}])
+    assert report == {"status": "unavailable", "reason": "bubblewrap (bwrap) not found", "total": 1}
+    assert sandbox_runner.apply({"correctness": 5, "scalability": 5}, report) == {"correctness": 5, "scalability": 5}
+
+
+def test_command_unshares_everything_and_hides_the_backend(monkeypatch):
+    monkeypatch.setattr(sandbox_module.shutil, "which", lambda name: "/usr/bin/bwrap")
+    runner = SandboxRunner()
+    assert runner.unavailable_reason is None
+    command = runner._command("/tmp/sandbox-case")
+
+    assert command[0] == "/usr/bin/bwrap"
+    for flag in ("--unshare-all", "--unshare-user", "--die-with-parent", "--clearenv"):
+        assert flag in command
+    assert command[command.index("--uid") + 1] == "65534"
+    assert command[command.index("--bind") + 1:command.index("--bind") + 3] == ["/tmp/sandbox-case", "/sandbox"]
+    mounted = [command[index + 1] for index, flag in enumerate(command) if flag == "--ro-bind"]
+    assert mounted and not any(BACKEND_DIR.is_relative_to(path) for path in mounted)
+
+    monkeypatch.setattr(runner, "read_only_dirs", ["/usr", str(BACKEND_DIR.parent)])
+    assert "contains the backend directory" in runner._unavailable_reason()
+
+
+@pytest.mark.skipif(not sandbox_runner.bwrap, reason="bubblewrap is not installed")
+def test_child_cannot_read_the_backend_or_reach_the_network():
+    report = sandbox_runner.run_tests(ESCAPE, [{"stdin": "", "stdout": "denied denied 65534"}])
+    assert report["status"] == "completed"
+    assert report["passed"] == 1, report["tests"]
+
+
+def test_parse_tests_ignores_malformed_values():
+    assert parse_tests('[{"stdin": "", "stdout": "1"}]') == [{"stdin": "", "stdout": "1"}]
+    assert parse_tests('[{"stdout": "1"}]') == []
+    assert parse_tests("") == [] and parse_tests(None) == []
@@ -0,0 +1,39 @@
+import time
+
+from services.scenario_pool import ScenarioPool
+
+
+def scenario(task):
+    return {"task": task}
+
+
+def wait_for_refills(pool):
+    for _ in range(100):
+        if not pool.stats()["refilling"]:
+            return
+        time.sleep(0.01)
+
+
+def test_refills_keep_levels_apart():
+    calls = []
+
+    def generate(role, skill_level, count):
+        calls.append(skill_level)
+        return [scenario(f"{skill_level} {index}") for index in range(count)]
+
+    pool = ScenarioPool(generate, lambda s: True)
+    pool.warm([("backend", "beginner"), ("backend", "advanced")])
+    wait_for_refills(pool)
+
+    assert all(s["task"].startswith("beginner") for s in pool.take("backend", "beginner", 3))
+    assert all(s["task"].startswith("advanced") for s in pool.take("backend", "advanced", 3))
+    assert set(calls) == {"beginner", "advanced"}
+
+
+def test_no_refill_while_the_provider_is_shedding():
+    calls = []
+    pool = ScenarioPool(lambda role, level, count: calls.append(level) or [], lambda s: True, lambda: False)
+    assert pool.take("backend", "beginner", 3) == []
+    wait_for_refills(pool)
+    assert calls == []
+    assert pool.stats()["refills_skipped"] == 1
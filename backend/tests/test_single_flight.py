@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from services.single_flight import SingleFlight, WaitAbandoned
+
+
+def run_leader(flight, release):
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "shared"
+
+    thread = threading.Thread(target=lambda: flight.do("key", slow))
+    thread.start()
+    started.wait(5)
+    return thread
+
+
+def test_follower_shares_the_leaders_result():
+    flight, release = SingleFlight(), threading.Event()
+    leader = run_leader(flight, release)
+    threading.Timer(0.05, release.set).start()
+    assert flight.do("key", lambda: "own") == "shared"
+    leader.join()
+    assert flight.stats()["coalesced"] == 1
+
+
+def test_follower_stops_at_its_own_deadline():
+    flight, release = SingleFlight(), threading.Event()
+    leader = run_leader(flight, release)
+    start = time.monotonic()
+    with pytest.raises(WaitAbandoned):
+        flight.do("key", lambda: "own", deadline=time.monotonic() + 0.05)
+    assert time.monotonic() - start < 1
+    release.set()
+    leader.join()
+
+
+def test_follower_stops_when_cancelled():
+    flight, release, cancelled = SingleFlight(), threading.Event(), threading.Event()
+    leader = run_leader(flight, release)
+    threading.Timer(0.05, cancelled.set).start()
+    with pytest.raises(WaitAbandoned):
+        flight.do("key", lambda: "own", cancelled=cancelled)
+    release.set()
+    leader.join()
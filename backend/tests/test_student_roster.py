@@ -0,0 +1,27 @@
+from services import student_roster as roster_module
+from services.student_roster import StudentRoster
+
+
+def test_import_and_construction_touch_no_files(tmp_path):
+    roster = StudentRoster(str(tmp_path / "nested" / "students.db"))
+    assert not (tmp_path / "nested").exists()
+    assert roster.get("s1") is None
+    assert (tmp_path / "nested" / "students.db").exists()
+
+
+def test_relative_paths_resolve_against_the_backend_directory():
+    roster = StudentRoster("data/students.db")
+    assert roster.db_path == roster_module.BACKEND_DIR / "data" / "students.db"
+
+
+def test_roster_persists_and_reindexes_email(tmp_path):
+    path = str(tmp_path / "students.db")
+    roster = StudentRoster(path)
+    delta = roster.upsert([{"id": "s1", "name": "Ana", "role": "Backend", "skill_level": "beginner", "email": "A@x.io"}])
+    assert delta == {"added": 1, "updated": 0, "unchanged": 0}
+    roster.upsert([{"id": "s1", "name": "Ana", "role": "Backend", "skill_level": "advanced", "email": "b@x.io"}])
+
+    reopened = StudentRoster(path)
+    assert reopened.get("s1")["skill_level"] == "advanced"
+    assert reopened.get_by_email("a@x.io") is None
+    assert reopened.get_by_email("B@x.io")["id"] == "s1"
@@ -0,0 +1,91 @@
+import json
+
+import pandas as pd
+import pytest
+
+from services.csv_processor import CSVProcessor, PARQUET_BATCH_ROWS
+from services.validation import SCENARIO_SPEC, TRAINING_RESOURCE_SPEC, ColumnSpec, validate_frame
+
+GOOD_TESTS = json.dumps([{"expression": "add(1, 2)", "expected": 3}, {"stdin": "2\n", "stdout": "4"}])
+
+
+def scenario(title, **fields):
+    return {"role": "Backend Developer", "title": title, "task": "Write it", **fields}
+
+
+def test_rows_are_cleaned_and_bad_rows_reported():
+    df = pd.DataFrame([
+        {"title": " Intro ", "type": "Course"},
+        {"title": "", "type": "course"},
+        {"title": "Talk", "type": "podcast"},
+        {"title": "Docs", "type": None}
+    ])
+    records, report = validate_frame(df, TRAINING_RESOURCE_SPEC)
+
+    assert [record["title"] for record in records] == ["Intro", "Docs"]
+    assert records[0]["type"] == "course" and records[1]["type"] == "course"
+    assert (report["accepted"], report["rejected"]) == (2, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert report["errors"][0]["errors"] == {"title": "missing value"}
+    assert "expected one of" in report["errors"][1]["errors"]["type"]
+
+
+def test_missing_required_columns_reject_every_row():
+    records, report = validate_frame(pd.DataFrame([{"title": "Only a title"}]), SCENARIO_SPEC)
+    assert records == []
+    assert report["missing_columns"] == ["role", "task"]
+
+
+def test_first_failing_check_wins_per_column():
+    spec = (
+        ColumnSpec("level", required=True, allowed=("low", "high")),
+        ColumnSpec("code", required=True, check=lambda value: "" if value.isdigit() else "not a number")
+    )
+    df = pd.DataFrame([{"level": "", "code": ""}, {"level": "mid", "code": "x1"}, {"level": "low", "code": "7"}])
+    records, report = validate_frame(df, spec)
+
+    assert records == [{"level": "low", "code": "7"}]
+    assert report["errors"][0]["errors"] == {"level": "missing value", "code": "missing value"}
+    assert report["errors"][1]["errors"] == {"level": "expected one of low, high", "code": "not a number"}
+
+
+@pytest.mark.parametrize("tests, message", [
+    ("not json", "invalid JSON"),
+    (json.dumps({"expression": "f()"}), "expected a JSON list of test cases"),
+    (json.dumps(["f()"]), "test 1 is not an object"),
+    (json.dumps([{"expression": "f()", "expected": 1}, {"stdout": "1"}]), "test 2 needs expression and expected"),
+])
+def test_malformed_tests_reject_their_row(tests, message):
+    df = pd.DataFrame([scenario("Good", tests=GOOD_TESTS), scenario("Bad", tests=tests), scenario("None")])
+    records, report = validate_frame(df, SCENARIO_SPEC)
+
+    assert [record["title"] for record in records] == ["Good", "None"]
+    assert report["errors"][0]["row"] == 2
+    assert report["errors"][0]["errors"]["tests"].startswith(message)
+
+
+def test_csv_and_parquet_uploads_report_the_same_rows(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame([scenario("Good", tests=GOOD_TESTS), scenario("Bad", tests="[1]"), scenario("", tests="")])
+    df.to_csv(tmp_path / "scenarios.csv", index=False)
+    df.to_parquet(tmp_path / "scenarios.parquet", index=False)
+
+    processor = CSVProcessor()
+    csv_records, csv_report = processor.load_file("scenarios", str(tmp_path / "scenarios.csv"))
+    parquet_records, parquet_report = processor.load_file("scenarios", str(tmp_path / "scenarios.parquet"))
+
+    assert csv_report == parquet_report
+    assert csv_report["rejected"] == 2
+    assert [record["id"] for record in csv_records] == [record["id"] for record in parquet_records]
+    assert json.loads(csv_records[0]["tests"]) == json.loads(GOOD_TESTS)
+
+
+def test_parquet_row_numbers_continue_across_batches(tmp_path):
+    pytest.importorskip("pyarrow")
+    rows = [{"title": f"Resource {index}", "type": "course"} for index in range(PARQUET_BATCH_ROWS + 5)]
+    rows[-1]["type"] = "podcast"
+    pd.DataFrame(rows).to_parquet(tmp_path / "resources.parquet", index=False, row_group_size=PARQUET_BATCH_ROWS)
+
+    records, report = CSVProcessor().load_file("training_resources", str(tmp_path / "resources.parquet"))
+    assert len(records) == PARQUET_BATCH_ROWS + 4
+    assert report["errors"] == [{"row": PARQUET_BATCH_ROWS + 5, "errors": {"type": "expected one of course, tutorial, documentation, project, practice, exercise, book"}}]
@@ -116,14 +116,14 @@ const FileUpload = ({ onUploadSuccess }) => {
             ) : (
               <AlertCircle className="w-4 h-4" />
             )}
-            <span className="text-sm">{uploadStatus}</span>
+            <span className="text-sm whitespace-pre-line">{uploadStatus}</span>
           </div>
         )}
 
         {error && (
           <div className="flex items-center gap-2 p-3 bg-red-50 text-red-700 border border-red-200 rounded-lg">
             <AlertCircle className="w-4 h-4" />
-            <span className="text-sm">{error}</span>
+            <span className="text-sm whitespace-pre-line">{error}</span>
           </div>
         )}
       </CardContent>
@@ -1,5 +1,32 @@
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
+// Upload rejections carry { message, validation } instead of a plain string
+function errorFromResponse(errorData, fallback) {
+  const detail = errorData.detail;
+  if (!detail || typeof detail === 'string') {
+    return new Error(detail || fallback);
+  }
+
+  const validation = detail.validation;
+  const lines = [detail.message || fallback];
+  if (validation) {
+    if (validation.missing_columns?.length) {
+      lines.push(`Missing columns: ${validation.missing_columns.join(', ')}`);
+    }
+    (validation.errors || []).slice(0, 5).forEach(({ row, errors }) => {
+      const fields = Object.entries(errors).map(([name, message]) => `${name}: ${message}`);
+      lines.push(`Row ${row}: ${fields.join('; ')}`);
+    });
+    if (validation.errors?.length > 5 || validation.errors_truncated) {
+      lines.push(`...and more (${validation.rejected} rows rejected)`);
+    }
+  }
+
+  const error = new Error(lines.join('\n'));
+  error.validation = validation;
+  return error;
+}
+
 class ApiClient {
   constructor() {
     this.baseURL = API_BASE_URL;
@@ -21,7 +48,7 @@ class ApiClient {
       
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
-        throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+        throw errorFromResponse(errorData, `HTTP error! status: ${response.status}`);
       }
 
       return await response.json();
@@ -43,7 +70,7 @@ class ApiClient {
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({ detail: 'Upload failed' }));
-        throw new Error(errorData.detail || `Upload failed: ${response.status}`);
+        throw errorFromResponse(errorData, `Upload failed: ${response.status}`);
       }
 
       return await response.json();